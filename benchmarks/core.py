@@ -0,0 +1,350 @@
+"""
+Benchmark suite for the conversion core, runs without a display
+
+Run from the repository root, saving the results as a baseline:
+
+    python benchmarks/core.py -o baseline.json
+
+and later compare against it, failing if any benchmark got slower than the tolerance allows:
+
+    python benchmarks/core.py --baseline baseline.json --tolerance 0.2
+
+Results are JSON, each benchmark giving the best time of one call and, for lists of numbers, the time per number.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+sys.path.insert(0, src_dir)
+
+import numpy as np  # noqa: E402
+
+import handlers  # noqa: E402
+from number_list import NumberList  # noqa: E402
+from universal_format import UniversalFormat  # noqa: E402
+
+# Number of tokens in the NumberList and handlers benchmarks
+default_sizes = (1, 100, 10000, 1000000)
+
+# Minimum time of one measurement in seconds, and number of measurements of which the best is kept
+default_min_time = 0.1
+default_repeat = 3
+
+# Slowdown allowed before a benchmark counts as a regression, 0.2 is 20% slower than the baseline
+default_tolerance = 0.2
+
+# Widths timed for each value type
+_WIDTHS = {"unsigned": (8, 16, 32, 64, 128), "signed": (8, 16, 32, 64, 128), "floating": (16, 32, 64),
+           "bfloat16": (16,)}
+
+# NumPy types of the IEEE floating point widths
+_FLOAT_DTYPES = {16: np.float16, 32: np.float32, 64: np.float64}
+
+# Number of values converted per call in the UniversalFormat benchmarks
+_VALUES_PER_CALL = 100
+
+
+def random_values(value_type, bits, count, seed=0):
+    """
+    Get reproducible random values that fit a width
+    :param value_type: Type of the values (unsigned, signed, floating, bfloat16)
+    :param bits: Width of the values in bits
+    :param count: Number of values
+    :param seed: Random seed
+    :return: List of int or float values
+    """
+    rng = random.Random(seed)
+    if value_type == "unsigned":
+        return [rng.getrandbits(bits) for _ in range(count)]
+    if value_type == "signed":
+        return [rng.getrandbits(bits) - (1 << (bits - 1)) for _ in range(count)]
+    if value_type == "bfloat16":
+        # Keep the top 16 bits of a float32
+        singles = np.array([rng.uniform(-1e6, 1e6) for _ in range(count)], dtype=np.float32)
+        return (singles.view(np.uint32) & np.uint32(0xFFFF0000)).view(np.float32).astype(np.float64).tolist()
+    return np.array([rng.uniform(-1e4, 1e4) for _ in range(count)], dtype=_FLOAT_DTYPES[bits]).astype(
+        np.float64).tolist()
+
+
+def format_value(value, value_type, bits, number_format):
+    """
+    Format a value as a big endian token of its full width
+    :param value: Value to format
+    :param value_type: Type of the value (unsigned, signed, floating, bfloat16)
+    :param bits: Width of the value in bits
+    :param number_format: Format of the token (hex, dec, bin)
+    :return: Token string
+    """
+    if number_format == "dec":
+        return repr(value)
+    if value_type == "bfloat16":
+        pattern = int(np.float32(value).view(np.uint32)) >> 16
+    elif value_type == "floating":
+        pattern = int(np.array(value, dtype=_FLOAT_DTYPES[bits]).view(f'u{bits // 8}'))
+    else:
+        pattern = value % (1 << bits)
+    if number_format == "hex":
+        return format(pattern, f'0{bits // 4}x')
+    return format(pattern, f'0{bits}b')
+
+
+def time_call(function, min_time=default_min_time, repeat=default_repeat):
+    """
+    Time a function, calling it enough times per measurement to last at least min_time
+    :param function: Function taking no arguments
+    :param min_time: Minimum time of one measurement in seconds
+    :param repeat: Number of measurements
+    :return: Best time of one call in seconds
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def universal_format_cases():
+    """
+    Get the UniversalFormat benchmarks, converting from and to every format for each value type, width and
+    endianness. Each call converts _VALUES_PER_CALL values.
+    :return: List of (name, setup, number of values per call), setup returns the function to time
+    """
+    cases = []
+    for value_type, widths in _WIDTHS.items():
+        for bits in widths:
+            for endianness in ("big", "little"):
+                for number_format in ("hex", "dec", "bin"):
+                    # Decimal is read and written the same for both endiannesses
+                    if number_format == "dec" and endianness == "little":
+                        continue
+                    name = f"universal_format/{value_type}/{bits}/{endianness}"
+                    options = (value_type, bits, endianness, number_format)
+                    cases.append((f"{name}/from_{number_format}_string",
+                                  lambda options=options: _universal_format_case(*options, False), _VALUES_PER_CALL))
+                    cases.append((f"{name}/to_{number_format}_string",
+                                  lambda options=options: _universal_format_case(*options, True), _VALUES_PER_CALL))
+    return cases
+
+
+def _universal_format_case(value_type, bits, endianness, number_format, render):
+    """
+    Set up a UniversalFormat benchmark
+    :param value_type: Type of the values (unsigned, signed, floating)
+    :param bits: Width of the values in bits
+    :param endianness: Endianness of the values (big, little)
+    :param number_format: Format converted from or to (hex, dec, bin)
+    :param render: True to time converting to the format, False to time converting from it
+    :return: Function to time
+    """
+    tokens = [format_value(value, value_type, bits, number_format)
+              for value in random_values(value_type, bits, _VALUES_PER_CALL)]
+    numbers = []
+    for token in tokens:
+        number = UniversalFormat()
+        number.set_type(value_type)
+        number.set_endianness(endianness)
+        getattr(number, f"from_{number_format}_string")(token)
+        numbers.append(number)
+
+    if not render:
+        parse = getattr(numbers[0], f"from_{number_format}_string")
+
+        def from_string():
+            for token in tokens:
+                parse(token)
+        return from_string
+
+    if number_format == "dec":
+        def to_string():
+            for number in numbers:
+                number.to_dec_string()
+        return to_string
+
+    # Hex strings can only be padded up to 64 bits
+    method = f"to_{number_format}_string"
+    pad = bits <= 64
+
+    def to_string():
+        for number in numbers:
+            getattr(number, method)(pad, True)
+    return to_string
+
+
+def number_list_cases(sizes):
+    """
+    Get the NumberList benchmarks, parsing each format and value type and rendering each format, for every size
+    :param sizes: Numbers of tokens
+    :return: List of (name, setup, number of tokens per call), setup returns the function to time
+    """
+    cases = []
+    for size in sizes:
+        for value_type in ("unsigned", "signed", "floating"):
+            for number_format in ("hex", "dec", "bin"):
+                cases.append((f"number_list/parse_numbers/{number_format}/{value_type}/{size}",
+                              lambda options=(size, number_format, value_type): _parse_case(*options), size))
+        for number_format in ("hex", "dec", "bin"):
+            cases.append((f"number_list/to_{number_format}_string/{size}",
+                          lambda options=(size, number_format): _render_case(*options), size))
+    return cases
+
+
+def _parse_case(size, number_format, value_type):
+    """
+    Set up a NumberList.parse_numbers benchmark on 32 bit values
+    :param size: Number of tokens
+    :param number_format: Format of the tokens (hex, dec, bin)
+    :param value_type: Type of the values (unsigned, signed, floating)
+    :return: Function to time
+    """
+    text = ' '.join(format_value(value, value_type, 32, number_format)
+                    for value in random_values(value_type, 32, size))
+    return lambda: NumberList().parse_numbers(text, number_format, value_type)
+
+
+def _render_case(size, number_format):
+    """
+    Set up a NumberList.to_*_string benchmark on unsigned 32 bit values parsed from hex
+    :param size: Number of tokens
+    :param number_format: Format rendered (hex, dec, bin)
+    :return: Function to time
+    """
+    number_list = NumberList()
+    number_list.parse_numbers(' '.join(format_value(value, "unsigned", 32, "hex")
+                                       for value in random_values("unsigned", 32, size)), "hex", "unsigned")
+    if number_format == "dec":
+        return number_list.to_dec_string
+    render = getattr(number_list, f"to_{number_format}_string")
+    return lambda: render(True, True)
+
+
+def handlers_cases(sizes):
+    """
+    Get the end to end benchmarks, converting text from each format to the others, for every size
+    :param sizes: Numbers of tokens
+    :return: List of (name, setup, number of tokens per call), setup returns the function to time
+    """
+    cases = []
+    for size in sizes:
+        for number_format in ("hex", "dec", "bin"):
+            cases.append((f"handlers/{number_format}_to_other/{size}",
+                          lambda options=(size, number_format): _handlers_case(*options), size))
+    return cases
+
+
+def _handlers_case(size, number_format):
+    """
+    Set up a handlers.*_to_other benchmark on unsigned 32 bit values, one per line
+    :param size: Number of tokens
+    :param number_format: Format converted from (hex, dec, bin)
+    :return: Function to time
+    """
+    text = '\n'.join(format_value(value, "unsigned", 32, number_format)
+                     for value in random_values("unsigned", 32, size))
+    convert = getattr(handlers, f"{number_format}_to_other")
+    return lambda: convert(text, pad=True, show_prefix=True)
+
+
+def run(cases, min_time=default_min_time, repeat=default_repeat, log=None):
+    """
+    Time benchmarks, setting each up only when it runs
+    :param cases: List of (name, setup, number of items per call)
+    :param min_time: Minimum time of one measurement in seconds
+    :param repeat: Number of measurements
+    :param log: Stream to report progress to, None for no progress
+    :return: Dict of {name: {"seconds": best time per call, "items": items per call, "per_item": seconds per item}}
+    """
+    results = {}
+    for name, setup, items in cases:
+        seconds = time_call(setup(), min_time, repeat)
+        results[name] = {"seconds": seconds, "items": items, "per_item": seconds / items}
+        if log is not None:
+            print(f"{name}: {seconds * 1e3:.3f} ms ({seconds / items * 1e9:.0f} ns per item)", file=log)
+    return results
+
+
+def compare(results, baseline, tolerance=default_tolerance):
+    """
+    Compare results against a baseline
+    :param results: Dict of results as returned by run
+    :param baseline: Dict of baseline results, benchmarks missing from either are skipped
+    :param tolerance: Slowdown allowed, as a fraction of the baseline time
+    :return: List of (name, baseline seconds, seconds, ratio) for every benchmark slower than allowed
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result["seconds"] / baseline[name]["seconds"]
+        if ratio > 1 + tolerance:
+            regressions.append((name, baseline[name]["seconds"], result["seconds"], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the conversion core.")
+    parser.add_argument('-o', '--output', help="write the results as JSON to this file instead of stdout")
+    parser.add_argument('--baseline', help="JSON results to compare against, exits with 1 on a regression")
+    parser.add_argument('--tolerance', type=float, default=default_tolerance,
+                        help=f"slowdown allowed against the baseline (default {default_tolerance})")
+    parser.add_argument('--sizes', default=','.join(map(str, default_sizes)),
+                        help="comma separated numbers of tokens for the list benchmarks")
+    parser.add_argument('--filter', default='', help="only run benchmarks whose name contains this text")
+    parser.add_argument('--min-time', type=float, default=default_min_time,
+                        help=f"minimum time of one measurement in seconds (default {default_min_time})")
+    parser.add_argument('--repeat', type=int, default=default_repeat,
+                        help=f"number of measurements, the best is kept (default {default_repeat})")
+    parser.add_argument('-q', '--quiet', action='store_true', help="do not report progress on stderr")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    cases = universal_format_cases() + number_list_cases(sizes) + handlers_cases(sizes)
+    cases = [case for case in cases if args.filter in case[0]]
+
+    report = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "results": run(cases, args.min_time, args.repeat, None if args.quiet else sys.stderr),
+    }
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(report["results"], baseline, args.tolerance)
+        for name, baseline_seconds, seconds, ratio in regressions:
+            print(f"regression: {name}: {baseline_seconds * 1e3:.3f} ms -> {seconds * 1e3:.3f} ms ({ratio:.2f}x)",
+                  file=sys.stderr)
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
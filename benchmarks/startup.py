@@ -0,0 +1,90 @@
+"""
+Startup benchmark, timing how long the GUI takes from launch until its window first paints
+
+Run from the repository root:
+
+    python benchmarks/startup.py --runs 10 --target 0.5
+
+Exits with code 1 if the median startup time is over the target, or if NumPy was loaded before the window painted.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Startup time target in seconds
+default_target = 0.5
+
+src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+# Run in a fresh interpreter, printing whether NumPy is loaded once the window painted
+_CHILD = """
+import sys
+sys.path.insert(0, sys.argv[1])
+from PySide6.QtCore import QEvent, QObject, QTimer
+from PySide6.QtWidgets import QApplication
+from ui import Hex2DecQt
+
+
+class FirstPaint(QObject):
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Type.Paint:
+            print('numpy' in sys.modules, flush=True)
+            QTimer.singleShot(0, app.quit)
+            watched.removeEventFilter(self)
+        return False
+
+
+app = QApplication(sys.argv[:1])
+window = Hex2DecQt(version="benchmark")
+first_paint = FirstPaint()
+window.installEventFilter(first_paint)
+window.show()
+app.exec()
+"""
+
+
+def time_startup():
+    """
+    Launch the GUI once
+    :return: Tuple of (seconds until the first paint, whether NumPy was loaded by then)
+    """
+    start = time.perf_counter()
+    child = subprocess.Popen([sys.executable, '-c', _CHILD, src_dir], stdout=subprocess.PIPE, text=True)
+    line = child.stdout.readline()
+    elapsed = time.perf_counter() - start
+    child.wait()
+    if not line:
+        raise RuntimeError("GUI exited before painting its window")
+    return elapsed, line.strip() == 'True'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time how long the GUI takes to show its window.")
+    parser.add_argument('--runs', type=int, default=5, help="number of launches to time")
+    parser.add_argument('--target', type=float, default=default_target,
+                        help=f"median startup time to stay under, in seconds (default {default_target})")
+    args = parser.parse_args(argv)
+
+    # The first launch warms the disk cache and is not counted
+    time_startup()
+    times = []
+    numpy_loaded = False
+    for _ in range(args.runs):
+        elapsed, loaded = time_startup()
+        times.append(elapsed)
+        numpy_loaded = numpy_loaded or loaded
+
+    median = statistics.median(times)
+    print(f"startup: median {median:.3f} s, min {min(times):.3f} s, max {max(times):.3f} s over {args.runs} runs, "
+          f"target {args.target:.3f} s")
+    if numpy_loaded:
+        print("NumPy was loaded before the window painted", file=sys.stderr)
+    return 1 if median > args.target or numpy_loaded else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
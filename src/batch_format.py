@@ -0,0 +1,607 @@
+"""
+Vectorized batch engine for converting whole lists of numbers at once
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+from tokenizer import text_codes
+import universal_format
+from universal_format import UniversalFormat, default_float_bits, float_types
+
+# Padding and floating point widths as arrays
+pad_nibble_values = np.array(universal_format.pad_nibble_values)
+pad_bit_values = np.array(universal_format.pad_bit_values)
+float_bit_values = np.array(universal_format.float_bit_values)
+
+# ASCII codes for every byte rendered as two hex digits
+_HEX_PAIRS = np.frombuffer(''.join(universal_format.byte_hex).encode('ascii'),
+                           dtype=np.uint8).reshape(256, 2)
+
+# Digit value for every ASCII code, 255 for characters that are not hex digits
+_DIGIT_VALUES = np.full(256, 255, dtype=np.uint8)
+_DIGIT_VALUES[np.frombuffer(b'0123456789', dtype=np.uint8)] = np.arange(10)
+_DIGIT_VALUES[np.frombuffer(b'abcdef', dtype=np.uint8)] = np.arange(10, 16)
+_DIGIT_VALUES[np.frombuffer(b'ABCDEF', dtype=np.uint8)] = np.arange(10, 16)
+
+# Number of significant bits in every byte value
+_BIT_LENGTHS = np.array([value.bit_length() for value in range(256)], dtype=np.int64)
+
+# Widths of the signed representations, checked from narrowest to widest
+_SIGNED_WIDTHS = (8, 16, 32, 64)
+
+_ASCII_ZERO = ord('0')
+
+
+@lru_cache(maxsize=None)
+def _little_endian_order(width, chunk):
+    """
+    Column order that reverses the chunks of a string, as done for little endian
+    :param width: Length of the string
+    :param chunk: Number of characters per chunk (2 for hex, 8 for binary)
+    :return: Index array reordering the columns
+    """
+    starts = range(0, width, chunk)
+    return np.concatenate([np.arange(start, min(start + chunk, width)) for start in reversed(starts)])
+
+
+class BatchFormat:
+    """
+    Vectorized counterpart of UniversalFormat holding a whole list of numbers in typed arrays.
+
+    Values are stored as uint64 (unsigned), int64 (signed) or float64 (floating and bfloat16, encoded as IEEE
+    16, 32 or 64-bit or bfloat16), alongside the minimum bit width of each number as uint8 (0 when the input did
+    not fix one). Floating point values are encoded in the width of their input, 32 bits for decimal input
+    (16 bits for bfloat16). Numbers wider than 64 bits are kept as UniversalFormat objects and converted one at
+    a time.
+    """
+    __slots__ = ('value_type', 'endianness', 'values', 'min_bits', 'wide')
+
+    def __init__(self, value_type, endianness='big'):
+        """
+        Initialize the BatchFormat object
+        :param value_type: Type of the numbers (signed, unsigned, floating, bfloat16)
+        :param endianness: Endianness of the numbers (big, little)
+        """
+        if value_type not in ['unsigned', 'signed', 'floating', 'bfloat16']:
+            raise ValueError("Type must be 'unsigned', 'signed', 'floating' or 'bfloat16'")
+        if endianness not in ['big', 'little']:
+            raise ValueError("Endianness must be 'big' or 'little'")
+
+        self.value_type = value_type
+        self.endianness = endianness
+        self.values = np.zeros(0, dtype=self._value_dtype())
+        self.min_bits = np.zeros(0, dtype=np.uint8)
+        self.wide = {}
+
+    def __len__(self):
+        return len(self.values)
+
+    def take(self, rows):
+        """
+        Get a BatchFormat holding some of the numbers.
+        :param rows: Indices of the numbers to keep, in order
+        :return: New BatchFormat object
+        """
+        batch = BatchFormat(self.value_type, self.endianness)
+        rows = np.asarray(rows, dtype=np.int64)
+        batch.values = self.values[rows]
+        batch.min_bits = self.min_bits[rows]
+        if self.wide:
+            batch.wide = {new_row: self.wide[row] for new_row, row in enumerate(rows.tolist()) if row in self.wide}
+        return batch
+
+    @staticmethod
+    def concatenate(batches):
+        """
+        Join BatchFormat objects of the same type and endianness into one.
+        :param batches: Non-empty list of BatchFormat objects
+        :return: New BatchFormat object holding the numbers of each batch in turn
+        """
+        batch = BatchFormat(batches[0].value_type, batches[0].endianness)
+        batch.values = np.concatenate([part.values for part in batches])
+        batch.min_bits = np.concatenate([part.min_bits for part in batches])
+        offset = 0
+        for part in batches:
+            batch.wide.update({row + offset: value for row, value in part.wide.items()})
+            offset += len(part)
+        return batch
+
+    def from_hex_strings(self, hex_strings):
+        """
+        Parse a list of hexadecimal strings, without prefixes.
+        :param hex_strings: List of hexadecimal strings
+        :return: List of (index, ValueError) for strings that could not be parsed, these are dropped
+        """
+        codes, starts, ends = self._join_strings(hex_strings)
+        return self.from_hex_spans(codes, starts, ends)
+
+    def from_hex_spans(self, codes, starts, ends):
+        """
+        Parse hexadecimal digits located by spans over an array of character codes.
+        :param codes: Array of character codes, see tokenizer.text_codes
+        :param starts: Start position of the digits of each number, after any prefix
+        :param ends: End position of each number
+        :return: List of (index, ValueError) for spans that could not be parsed, these are dropped
+        """
+        return self._from_digit_spans(codes, starts, ends, 4, 2, self._new_wide('from_hex_string'))
+
+    def from_bin_strings(self, bin_strings):
+        """
+        Parse a list of binary strings, without prefixes.
+        :param bin_strings: List of binary strings
+        :return: List of (index, ValueError) for strings that could not be parsed, these are dropped
+        """
+        codes, starts, ends = self._join_strings(bin_strings)
+        return self.from_bin_spans(codes, starts, ends)
+
+    def from_bin_spans(self, codes, starts, ends):
+        """
+        Parse binary digits located by spans over an array of character codes.
+        :param codes: Array of character codes, see tokenizer.text_codes
+        :param starts: Start position of the digits of each number, after any prefix
+        :param ends: End position of each number
+        :return: List of (index, ValueError) for spans that could not be parsed, these are dropped
+        """
+        return self._from_digit_spans(codes, starts, ends, 1, 8, self._new_wide('from_bin_string'))
+
+    def from_dec_strings(self, dec_strings):
+        """
+        Parse a list of decimal strings.
+        :param dec_strings: List of decimal strings
+        :return: List of (index, ValueError) for strings that could not be parsed, these are dropped
+        """
+        count = len(dec_strings)
+        errors = []
+        valid = np.ones(count, dtype=bool)
+
+        try:
+            floats = np.array(dec_strings, dtype=np.str_).astype(np.float64)
+        except ValueError:
+            # Locate the offending strings one at a time
+            floats = np.zeros(count, dtype=np.float64)
+            for i, dec_string in enumerate(dec_strings):
+                try:
+                    floats[i] = float(dec_string)
+                except ValueError as error:
+                    # Kept as a new exception, the traceback and context of the raised one hold the frames of the
+                    # callers and with them their views of the text, such as a memory mapped file
+                    errors.append((i, ValueError(*error.args)))
+                    valid[i] = False
+
+        wide = {}
+        if self.value_type in float_types:
+            values = floats
+            with np.errstate(over='ignore'):
+                overflow = np.isfinite(floats) & np.isinf(floats.astype(np.float32))
+            for i in np.flatnonzero(overflow & valid).tolist():
+                errors.append((i, ValueError("float too large to pack with f format")))
+            valid &= ~overflow
+        else:
+            finite = np.isfinite(floats)
+            for i in np.flatnonzero(~finite & valid).tolist():
+                reason = "cannot convert float NaN to integer" if np.isnan(floats[i]) \
+                    else "cannot convert float infinity to integer"
+                errors.append((i, ValueError(reason)))
+            valid &= finite
+
+            truncated = np.trunc(np.where(finite, floats, 0))
+            if self.value_type == "unsigned":
+                truncated = np.abs(truncated)
+                too_wide = truncated >= 2.0 ** 64
+                values = np.where(too_wide, 0, truncated).astype(np.uint64)
+            else:
+                too_wide = (truncated < -2.0 ** 63) | (truncated >= 2.0 ** 63)
+                values = np.where(too_wide, 0, truncated).astype(np.int64)
+
+            new_wide = self._new_wide('from_dec_string')
+            for i in np.flatnonzero(too_wide & valid).tolist():
+                wide[i] = new_wide(dec_strings[i])
+
+        errors.sort(key=lambda item: item[0])
+        self._store(values, np.zeros(count, dtype=np.uint8), wide, valid)
+        return errors
+
+    def from_words(self, words):
+        """
+        Take values from an array of unsigned words, as if each word had been parsed from a hex string of its
+        full width. The words are only copied into the value array, never formatted as text.
+        :param words: Array of unsigned integers of 8, 16, 32 or 64 bits, such as a memory mapped file
+        """
+        bits = words.dtype.itemsize * 8
+        if words.dtype.kind != 'u' or bits > 64:
+            raise ValueError("Words must be unsigned integers of at most 64 bits")
+        if self.value_type in float_types and bits not in float_bit_values:
+            raise ValueError("Unsupported length for floating point value")
+
+        count = len(words)
+        total_bits = np.full(count, bits, dtype=np.int64)
+        valid = np.ones(count, dtype=bool)
+        self._store(self._values_from_bits(words.astype(np.uint64), total_bits, valid), total_bits, {}, valid)
+
+    def to_hex_strings(self, pad=False, show_0x=False):
+        """
+        Convert all values to hexadecimal string representations.
+        :param pad: Whether to pad the hex strings to a power of 2
+        :param show_0x: Whether to show the '0x' prefix
+        :return: List of hex strings
+        """
+        strings = self._hex_strings(self._render_fields(), pad, show_0x)
+        for i, number in self.wide.items():
+            strings[i] = number.to_hex_string(pad=pad, show_0x=show_0x)
+        return strings.tolist()
+
+    def to_dec_strings(self):
+        """
+        Convert all values to decimal string representations.
+        :return: List of decimal strings
+        """
+        strings = self._dec_strings()
+        for i, number in self.wide.items():
+            strings[i] = number.to_dec_string()
+        return strings.tolist()
+
+    def to_bin_strings(self, pad=False, show_0b=False):
+        """
+        Convert all values to binary string representations.
+        :param pad: Whether to pad the binary strings to a power of 2
+        :param show_0b: Whether to show the '0b' prefix
+        :return: List of binary strings
+        """
+        strings = self._bin_strings(self._render_fields(), pad, show_0b)
+        for i, number in self.wide.items():
+            strings[i] = number.to_bin_string(pad=pad, show_0b=show_0b)
+        return strings.tolist()
+
+    def to_strings(self, pad=False, show_prefix=False):
+        """
+        Convert all values to hexadecimal, decimal and binary strings in one pass, sharing the
+        bit patterns, signs and widths between the three outputs.
+        :param pad: Whether to pad the hex and binary strings to a power of 2
+        :param show_prefix: Whether to show the '0x' and '0b' prefixes
+        :return: Tuple of (hex strings, decimal strings, binary strings) lists
+        """
+        fields = self._render_fields()
+        hex_strings = self._hex_strings(fields, pad, show_prefix)
+        dec_strings = self._dec_strings()
+        bin_strings = self._bin_strings(fields, pad, show_prefix)
+
+        for i, number in self.wide.items():
+            hex_strings[i] = number.to_hex_string(pad=pad, show_0x=show_prefix)
+            dec_strings[i] = number.to_dec_string()
+            bin_strings[i] = number.to_bin_string(pad=pad, show_0b=show_prefix)
+
+        return hex_strings.tolist(), dec_strings.tolist(), bin_strings.tolist()
+
+    def _value_dtype(self):
+        """
+        Get the array type used to store values of this type
+        :return: NumPy dtype
+        """
+        return {"unsigned": np.uint64, "signed": np.int64, "floating": np.float64,
+                "bfloat16": np.float64}[self.value_type]
+
+    def _float_bits(self):
+        """
+        Get the width of each floating point value, that of its input if it had one
+        :return: Array of bit widths
+        """
+        return np.where(np.isin(self.min_bits, float_bit_values), self.min_bits,
+                        default_float_bits(self.value_type)).astype(np.int64)
+
+    def _values_from_bits(self, pattern, total_bits, valid):
+        """
+        Convert bit patterns to the underlying values
+        :param pattern: Array of uint64 bit patterns
+        :param total_bits: Width of each pattern
+        :param valid: Boolean mask of patterns to convert, floating point values of other rows are left at 0
+        :return: Array of values
+        """
+        if self.value_type == "unsigned":
+            return pattern
+        if self.value_type == "signed":
+            sign = (np.right_shift(pattern, np.maximum(total_bits - 1, 0).astype(np.uint64)) & 1).astype(bool)
+            high_bits = np.left_shift(np.uint64(0xFFFFFFFFFFFFFFFF), np.minimum(total_bits, 63).astype(np.uint64))
+            return np.where(sign & (total_bits < 64), pattern | high_bits, pattern).view(np.int64)
+
+        values = np.zeros(len(pattern), dtype=np.float64)
+        for bits in float_bit_values.tolist():
+            rows = valid & (total_bits == bits)
+            values[rows] = self._floats_from_bits(pattern[rows], bits)
+        return values
+
+    def _floats_from_bits(self, pattern, bits):
+        """
+        Decode floating point values of one width from their bits with a view cast
+        :param pattern: Array of uint64 bit patterns
+        :param bits: Width of the values, one of float_bit_values
+        :return: Array of float64 values
+        """
+        if bits == 16 and self.value_type == "bfloat16":
+            return np.left_shift(pattern.astype(np.uint32), np.uint32(16)).view(np.float32).astype(np.float64)
+        if bits == 16:
+            return pattern.astype(np.uint16).view(np.float16).astype(np.float64)
+        if bits == 32:
+            return pattern.astype(np.uint32).view(np.float32).astype(np.float64)
+        return pattern.view(np.float64).copy()
+
+    def _floats_to_bits(self, values, bits):
+        """
+        Encode floating point values in one width with a view cast, rounding to the nearest value of the width
+        :param values: Array of float64 values
+        :param bits: Width of the values, one of float_bit_values
+        :return: Array of uint64 bit patterns
+        """
+        if bits == 64:
+            return values.view(np.uint64).copy()
+        with np.errstate(over='ignore'):
+            if bits == 16 and self.value_type != "bfloat16":
+                return values.astype(np.float16).view(np.uint16).astype(np.uint64)
+            single = values.astype(np.float32).view(np.uint32).astype(np.uint64)
+        if bits == 32:
+            return single
+
+        # Round to nearest even bfloat16, keeping NaN a NaN when its payload is in the dropped bits
+        rounded = np.right_shift(single + np.uint64(0x7FFF) + (np.right_shift(single, np.uint64(16)) & np.uint64(1)),
+                                 np.uint64(16))
+        return np.where(np.isnan(values), np.right_shift(single, np.uint64(16)) | np.uint64(0x40), rounded)
+
+    def _new_wide(self, parse_method):
+        """
+        Get a function that parses a single string into a UniversalFormat object
+        :param parse_method: Name of the UniversalFormat parse method
+        :return: Function taking a string and returning a UniversalFormat object
+        """
+        def new_wide(string):
+            number = UniversalFormat()
+            number.set_type(self.value_type)
+            number.set_endianness(self.endianness)
+            getattr(number, parse_method)(string)
+            return number
+
+        return new_wide
+
+    def _store(self, values, min_bits, wide, valid):
+        """
+        Keep the valid rows of freshly parsed arrays
+        :param values: Parsed values
+        :param min_bits: Minimum bit width of each value
+        :param wide: Dictionary of row index to UniversalFormat object for values wider than 64 bits
+        :param valid: Boolean mask of rows that were parsed successfully
+        """
+        new_index = np.cumsum(valid) - 1
+        self.values = values[valid].astype(self._value_dtype())
+        self.min_bits = min_bits[valid].astype(np.uint8)
+        self.wide = {int(new_index[i]): number for i, number in wide.items() if valid[i]}
+
+    @staticmethod
+    def _join_strings(strings):
+        """
+        Join strings into a single array of character codes
+        :param strings: List of strings
+        :return: Tuple of (codes, starts, ends) locating each string in the codes
+        """
+        lengths = np.fromiter(map(len, strings), dtype=np.int64, count=len(strings))
+        ends = np.cumsum(lengths)
+        return text_codes(''.join(strings)), ends - lengths, ends
+
+    @staticmethod
+    def _span_string(codes, start, end):
+        """
+        Get the text of a single span
+        :param codes: Array of character codes
+        :param start: Start position
+        :param end: End position
+        :return: String
+        """
+        return codes[start:end].astype(np.uint32).tobytes().decode('utf-32-le')
+
+    def _from_digit_spans(self, codes, starts, ends, bits_per_digit, chunk, new_wide):
+        """
+        Parse hexadecimal or binary digit spans in one pass over all their characters
+        :param codes: Array of character codes
+        :param starts: Start position of the digits of each number
+        :param ends: End position of each number
+        :param bits_per_digit: Bits represented by one digit (4 for hex, 1 for binary)
+        :param chunk: Digits per byte, used for little endian re-ordering
+        :param new_wide: Function creating a UniversalFormat object for values wider than 64 bits
+        :return: List of (index, ValueError) for spans that could not be parsed
+        """
+        count = len(starts)
+        base = 1 << bits_per_digit
+        starts = np.asarray(starts, dtype=np.int64)
+        lengths = np.asarray(ends, dtype=np.int64) - starts
+
+        # Each character's row and position within its row
+        row_of_char = np.repeat(np.arange(count), lengths)
+        row_offsets = np.cumsum(lengths) - lengths
+        position = np.arange(len(row_of_char)) - row_offsets[row_of_char]
+        chars = codes[starts[row_of_char] + position]
+        digits = _DIGIT_VALUES[np.minimum(chars, 255) if chars.dtype != np.uint8 else chars]
+
+        bad_chars = digits >= base
+        valid = (lengths > 0) & ~np.bincount(row_of_char[bad_chars], minlength=count).astype(bool)
+        errors = [(i, ValueError(f"invalid literal for int() with base {base}: "
+                                 f"{self._span_string(codes, starts[i], starts[i] + lengths[i])!r}"))
+                  for i in np.flatnonzero(~valid).tolist()]
+
+        total_bits = lengths * bits_per_digit
+        too_wide = total_bits > 64
+        if self.value_type in float_types:
+            bad_length = valid & ~np.isin(total_bits, float_bit_values)
+            errors += [(i, ValueError("Unsupported length for floating point value"))
+                       for i in np.flatnonzero(bad_length).tolist()]
+            valid &= ~bad_length
+
+        # Re-order bytes if endianness is little
+        if self.endianness == 'little':
+            row_length = lengths[row_of_char]
+            chunk_start = position - position % chunk
+            chunk_length = np.minimum(chunk, row_length - chunk_start)
+            position = row_length - chunk_start - chunk_length + position % chunk
+
+        # Accumulate the digits of every narrow row into a 64-bit pattern
+        narrow = valid & ~too_wide
+        use_char = narrow[row_of_char]
+        shifts = (lengths[row_of_char] - 1 - position)[use_char] * bits_per_digit
+        shifted = np.left_shift(digits[use_char].astype(np.uint64), shifts.astype(np.uint64))
+        pattern = np.zeros(count, dtype=np.uint64)
+        if len(shifted):
+            narrow_lengths = lengths[narrow]
+            pattern[narrow] = np.bitwise_or.reduceat(shifted, np.cumsum(narrow_lengths) - narrow_lengths)
+
+        values = self._values_from_bits(pattern, total_bits, narrow)
+
+        wide = {}
+        for i in np.flatnonzero(valid & too_wide).tolist():
+            try:
+                wide[i] = new_wide(self._span_string(codes, starts[i], starts[i] + lengths[i]))
+            except ValueError as error:
+                errors.append((i, ValueError(*error.args)))
+                valid[i] = False
+
+        errors.sort(key=lambda item: item[0])
+        self._store(values, np.where(too_wide, 0, total_bits), wide, valid)
+        return errors
+
+    def _render_fields(self):
+        """
+        Get the bits to render for each value, with the sign and minimum width shared by hex and binary output
+        :return: Tuple of (big endian bytes, significant bit counts, boolean negative mask, minimum bit widths)
+        """
+        if self.value_type == "unsigned":
+            pattern = self.values
+            negative = np.zeros(len(self.values), dtype=bool)
+            min_bits = self.min_bits
+        elif self.value_type in float_types:
+            pattern = np.zeros(len(self.values), dtype=np.uint64)
+            float_bits = self._float_bits()
+            for bits in float_bit_values.tolist():
+                rows = float_bits == bits
+                pattern[rows] = self._floats_to_bits(self.values[rows], bits)
+            negative = ~(self.values >= 0)
+            min_bits = self.min_bits
+        else:
+            # Smallest signed width holding each value
+            values = self.values
+            signed_bits = np.full(len(values), _SIGNED_WIDTHS[-1], dtype=np.int64)
+            for bits in reversed(_SIGNED_WIDTHS[:-1]):
+                fits = (values >= -(1 << (bits - 1))) & (values < (1 << (bits - 1)))
+                signed_bits[fits] = bits
+
+            # Negative values are shown in two's complement of the signed width
+            negative = values < 0
+            masks = np.left_shift(np.uint64(1), signed_bits.astype(np.uint64)) - np.uint64(1)
+            masks[signed_bits == 64] = np.uint64(0xFFFFFFFFFFFFFFFF)
+            pattern = np.where(negative, values.view(np.uint64) & masks, values.view(np.uint64))
+            min_bits = np.where(negative, self.min_bits, np.maximum(self.min_bits, signed_bits))
+
+        # Number of significant bits, from the first non-zero byte
+        pattern_bytes = pattern.astype('>u8').view(np.uint8).reshape(len(pattern), 8)
+        nonzero = pattern_bytes != 0
+        first_byte = nonzero.argmax(axis=1)
+        leading_byte = pattern_bytes[np.arange(len(pattern)), first_byte]
+        bit_lengths = np.where(nonzero.any(axis=1), (7 - first_byte) * 8 + _BIT_LENGTHS[leading_byte], 0)
+
+        return pattern_bytes, bit_lengths, negative, min_bits
+
+    def _hex_strings(self, fields, pad, show_0x):
+        """
+        Render hexadecimal strings from shared render fields
+        :param fields: Render fields, see _render_fields
+        :param pad: Whether to pad the hex strings to a power of 2
+        :param show_0x: Whether to show the '0x' prefix
+        :return: Object array of hex strings
+        """
+        pattern_bytes, bit_lengths, negative, min_bits = fields
+
+        digits = _HEX_PAIRS[pattern_bytes].reshape(len(pattern_bytes), 16)
+        num_digits = np.maximum((bit_lengths + 3) // 4, 1)
+
+        widths = np.maximum(num_digits, min_bits // 4)
+        if pad:
+            widths = pad_nibble_values[np.searchsorted(pad_nibble_values, widths)]
+        self._fill_sign(digits, num_digits, widths, negative, ord('f'))
+
+        return self._join_columns(digits, widths, 2, b'0x' if show_0x else b'')
+
+    def _dec_strings(self):
+        """
+        Render decimal strings
+        :return: Object array of decimal strings
+        """
+        return self.values.astype(np.str_).astype(object)
+
+    def _bin_strings(self, fields, pad, show_0b):
+        """
+        Render binary strings from shared render fields
+        :param fields: Render fields, see _render_fields
+        :param pad: Whether to pad the binary strings to a power of 2
+        :param show_0b: Whether to show the '0b' prefix
+        :return: Object array of binary strings
+        """
+        pattern_bytes, bit_lengths, negative, min_bits = fields
+
+        bits = np.unpackbits(pattern_bytes, axis=1)
+        bits += _ASCII_ZERO
+        num_bits = np.maximum(bit_lengths, 1)
+        if self.value_type in float_types:
+            num_bits = np.maximum(num_bits, self._float_bits())
+
+        widths = np.maximum(num_bits, min_bits)
+        if pad:
+            widths = pad_bit_values[np.searchsorted(pad_bit_values, widths)]
+        self._fill_sign(bits, num_bits, widths, negative, ord('1'))
+
+        return self._join_columns(bits, widths, 8, b'0b' if show_0b else b'')
+
+    @staticmethod
+    def _fill_sign(chars, num_significant, widths, negative, fill_char):
+        """
+        Replace leading zeros of negative values with the sign fill character, in place
+        :param chars: Character codes, right aligned, one row per value
+        :param num_significant: Number of significant characters per row
+        :param widths: Final width per row
+        :param negative: Boolean mask of rows to fill
+        :param fill_char: Character code to fill with
+        """
+        rows = np.flatnonzero(negative & (widths > num_significant))
+        if not len(rows):
+            return
+
+        columns = np.arange(chars.shape[1])
+        total = chars.shape[1]
+        fill = (columns >= (total - widths[rows])[:, None]) & (columns < (total - num_significant[rows])[:, None])
+        block = chars[rows]
+        block[fill] = fill_char
+        chars[rows] = block
+
+    def _join_columns(self, chars, widths, chunk, prefix):
+        """
+        Turn right aligned character codes into strings of each row's width
+        :param chars: Character codes, one row per value
+        :param widths: Width of the string for each row
+        :param chunk: Characters per byte, used for little endian re-ordering
+        :param prefix: Prefix to add to every string
+        :return: Object array of strings
+        """
+        strings = np.empty(len(widths), dtype=object)
+        total = chars.shape[1]
+        prefix_codes = np.frombuffer(prefix, dtype=np.uint8)
+
+        for width in np.unique(widths).tolist():
+            rows = np.flatnonzero(widths == width)
+            block = chars[rows, total - width:]
+
+            # Re-order bytes if endianness is little
+            if self.endianness == 'little':
+                block = block[:, _little_endian_order(width, chunk)]
+
+            if len(prefix_codes):
+                block = np.hstack([np.broadcast_to(prefix_codes, (len(rows), len(prefix_codes))), block])
+
+            block = np.ascontiguousarray(block)
+            strings[rows] = block.view(f'S{block.shape[1]}').ravel().astype(np.str_).tolist()
+
+        return strings
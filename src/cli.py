@@ -0,0 +1,199 @@
+"""
+Command line entry point converting files or pipes without the GUI
+"""
+
+import argparse
+import io
+import os
+import sys
+
+from records import convert_records, record_dtype
+from stage_timer import StageTimer
+from streaming import convert_file, convert_stream, is_ascii_compatible
+from token_cache import TokenCache
+
+
+def parse_args(argv=None):
+    """
+    Parse command line arguments
+    :param argv: List of arguments, defaults to sys.argv
+    :return: Parsed arguments
+    """
+    parser = argparse.ArgumentParser(
+        prog="hex2dec",
+        description="Convert numbers between hexadecimal, decimal and binary, preserving the surrounding text.")
+    parser.add_argument("files", nargs="*", help="Files to convert, standard input if none are given")
+    parser.add_argument("--from", dest="from_format", choices=["hex", "dec", "bin", "auto"], required=True,
+                        help="Format of the input numbers. auto detects the format of each number: 0x and $ "
+                             "prefixes or a hex letter mean hex, 0b and %% prefixes mean binary and bare digits "
+                             "mean decimal")
+    parser.add_argument("--to", dest="to_format", choices=["hex", "dec", "bin"], required=True,
+                        help="Format to convert to")
+    parser.add_argument("--type", dest="value_type", choices=["unsigned", "signed", "floating", "bfloat16"],
+                        default="unsigned",
+                        help="Type of the numbers. Floating point widths of 16, 32 and 64 bits follow the length of "
+                             "hex and binary numbers, bfloat16 reads 16-bit numbers as bfloat16 instead of half "
+                             "precision. Decimal numbers are converted to 32 bits, 16 for bfloat16 "
+                             "(default: unsigned)")
+    parser.add_argument("--endian", choices=["big", "little"], default="big",
+                        help="Endianness of the numbers (default: big)")
+    parser.add_argument("--record", metavar="SCHEMA",
+                        help="Decode the hex or binary input as packed records, with a struct format such as '<HhIf' "
+                             "or a NumPy dtype such as 'u2,i2,f4'. Each record is written on a line, each field "
+                             "converted by its own type and byte order, so --type and --endian are not used")
+    parser.add_argument("--pad", action="store_true", help="Pad hex and binary output to a power of 2")
+    parser.add_argument("--prefix", action="store_true", help="Show the 0x and 0b prefixes")
+    parser.add_argument("-o", "--output",
+                        help="File to write instead of standard output. With a single input file, the input is "
+                             "memory mapped rather than read as text when the encoding is ASCII compatible, such as "
+                             "utf-8 or latin-1")
+    parser.add_argument("--encoding", default="utf-8", help="Text encoding of input and output (default: utf-8)")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Number of processes converting in parallel, 0 for one per CPU (default: 1)")
+    parser.add_argument("--cache", type=int, default=0, metavar="SIZE",
+                        help="Convert repeated tokens once, keeping up to SIZE recent tokens, and report cache hits "
+                             "and misses on standard error. Not combined with --jobs (default: 0, off)")
+    parser.add_argument("--timings", action="store_true",
+                        help="Report the time spent tokenizing, parsing, rendering, joining and writing on standard "
+                             "error. Not combined with --jobs")
+    parser.add_argument("--timings-file", metavar="PATH",
+                        help="Append the timings to PATH as one line of JSON. Not combined with --jobs")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    Convert the given files, or standard input, to standard output
+    :param argv: List of arguments, defaults to sys.argv
+    :return: Exit code, 1 if any number could not be converted
+    """
+    args = parse_args(argv)
+    workers = args.jobs if args.jobs > 0 else os.cpu_count() or 1
+    if args.cache > 0 and workers > 1:
+        print("Conversion Error: --cache cannot be combined with --jobs", file=sys.stderr)
+        return 2
+    if (args.timings or args.timings_file) and workers > 1:
+        print("Conversion Error: --timings cannot be combined with --jobs", file=sys.stderr)
+        return 2
+    cache = TokenCache(args.cache) if args.cache > 0 else None
+
+    if args.timings or args.timings_file:
+        with StageTimer() as timer:
+            exit_code = convert(args, workers, cache)
+        timer.stop()
+        if args.timings:
+            print(f"Timings: {timer.summary()}", file=sys.stderr)
+        if args.timings_file:
+            timer.write_json_line(args.timings_file, source=args.from_format, target=args.to_format,
+                                  files=args.files or ["-"])
+    else:
+        exit_code = convert(args, workers, cache)
+
+    if cache is not None:
+        print(f"Token cache: {cache.hits} hits, {cache.misses} misses", file=sys.stderr)
+    return exit_code
+
+
+def convert(args, workers=1, cache=None):
+    """
+    Convert the files or standard input given by parsed arguments
+    :param args: Parsed arguments, see parse_args
+    :param workers: Number of processes converting in parallel
+    :param cache: TokenCache used to convert repeated tokens once, None to convert every number
+    :return: Exit code, 1 if any number could not be converted
+    """
+    def report(offset, token, error):
+        print(f"{name}:{offset}: Invalid Value: {token}: {error}", file=sys.stderr)
+
+    if args.record is not None:
+        return convert_record_files(args)
+
+    # Convert a single file straight from a memory map, files in other encodings are read as text below
+    if args.output is not None and len(args.files) == 1 and args.files[0] != "-" and \
+            is_ascii_compatible(args.encoding):
+        name = args.files[0]
+        try:
+            error_count = convert_file(name, args.output, args.from_format, args.to_format, args.value_type,
+                                       args.endian, args.pad, args.prefix, on_error=report, workers=workers,
+                                       cache=cache, encoding=args.encoding)
+        except Exception as error:
+            # Invalid options, unreadable files and failures of the worker processes alike
+            print(f"Conversion Error: {error}", file=sys.stderr)
+            return 1
+        return 1 if error_count else 0
+
+    # Keep line endings and undecodable bytes exactly as they are
+    if args.output is not None:
+        output = open(args.output, "w", encoding=args.encoding, errors="surrogateescape", newline="")
+    else:
+        output = io.TextIOWrapper(sys.stdout.buffer, encoding=args.encoding, errors="surrogateescape",
+                                  newline="", write_through=False)
+
+    error_count = 0
+    try:
+        for name in args.files or ["-"]:
+            if name == "-":
+                source = io.TextIOWrapper(sys.stdin.buffer, encoding=args.encoding, errors="surrogateescape",
+                                          newline="")
+            else:
+                source = open(name, "r", encoding=args.encoding, errors="surrogateescape", newline="")
+
+            with source:
+                error_count += convert_stream(source, output, args.from_format, args.to_format, args.value_type,
+                                              args.endian, args.pad, args.prefix, on_error=report, workers=workers,
+                                              cache=cache)
+    except Exception as error:
+        # Invalid options, unreadable files and failures of the worker processes alike
+        print(f"Conversion Error: {error}", file=sys.stderr)
+        return 1
+    finally:
+        if args.output is not None:
+            output.close()
+        else:
+            output.flush()
+            output.detach()
+
+    return 1 if error_count else 0
+
+
+def convert_record_files(args):
+    """
+    Decode the records of the files or standard input given by parsed arguments
+    :param args: Parsed arguments, see parse_args
+    :return: Exit code
+    """
+    output = None
+    error_count = 0
+    try:
+        record_dtype(args.record)
+        if args.output is not None:
+            output = open(args.output, "w", encoding=args.encoding, newline="")
+        else:
+            output = io.TextIOWrapper(sys.stdout.buffer, encoding=args.encoding, newline="", write_through=False)
+
+        for name in args.files or ["-"]:
+            if name == "-":
+                text_string = sys.stdin.buffer.read().decode(args.encoding, errors="surrogateescape")
+            else:
+                with open(name, "r", encoding=args.encoding, errors="surrogateescape") as source:
+                    text_string = source.read()
+            texts, errors = convert_records(text_string, args.record, args.from_format, args.pad, args.prefix)
+            text = texts[("hex", "dec", "bin").index(args.to_format)]
+            output.write(text + "\n" if text else text)
+            for offset, token, error in errors:
+                print(f"{name}:{offset}: Invalid Value: {token}: {error}", file=sys.stderr)
+            error_count += len(errors)
+    except ValueError as error:
+        print(f"Conversion Error: {error}", file=sys.stderr)
+        return 1
+    finally:
+        if output is not None and args.output is not None:
+            output.close()
+        elif output is not None:
+            output.flush()
+            output.detach()
+    return 1 if error_count else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""
+Worker threads converting text and raw binary files off the GUI thread, with progress and cancellation
+"""
+
+import io
+from contextlib import nullcontext
+
+from PySide6.QtCore import QThread, Signal
+
+from converted_text import ConvertedText
+from raw_import import iter_raw, render_words, trailing_bytes
+from streaming import iter_chunks
+
+# Number of characters converted between progress updates and cancellation checks
+chunk_size = 1 << 18
+
+
+class ConversionWorker(QThread):
+    """
+    Thread converting text in one format to hex, dec and bin. The text is converted in chunks ending on a
+    delimiter, so progress can be reported and cancellation checked between chunks.
+    """
+    # Percentage of the text converted
+    progress = Signal(int)
+    # Tuple of (hex string, decimal string, binary string, ConvertedText), the ConvertedText holds the errors
+    converted = Signal(object)
+    # Error message when the conversion could not be done at all
+    failed = Signal(str)
+
+    def __init__(self, text_string, number_format, value_type, endianness='big', pad=False, show_prefix=False,
+                 detect=False, cache=None, timer=None, parent=None):
+        """
+        Initialize the worker, call start() to run the conversion
+        :param text_string: Text string to convert
+        :param number_format: Format of the numbers in the text (hex, dec, bin)
+        :param value_type: Type of the numbers (unsigned, signed, floating)
+        :param endianness: Endianness of the numbers (big, little)
+        :param pad: Whether to pad the hex and binary strings to a power of 2
+        :param show_prefix: Whether to show the '0x' and '0b' prefixes
+        :param detect: Whether to detect the format of each number instead of reading all as number_format
+        :param cache: TokenCache shared between conversions, None to convert every number
+        :param timer: StageTimer timing the stages of the conversion, None to not time them
+        :param parent: Parent QObject
+        """
+        super().__init__(parent)
+        self.text_string = text_string
+        self.number_format = number_format
+        self.value_type = value_type
+        self.endianness = endianness
+        self.pad = pad
+        self.show_prefix = show_prefix
+        self.detect = detect
+        self.cache = cache
+        self.timer = timer
+
+    def run(self):
+        """
+        Convert the text, emitting converted when done unless interrupted first
+        """
+        with self.timer or nullcontext():
+            self.convert()
+
+    def convert(self):
+        """
+        Convert the text in chunks, run on the worker thread
+        """
+        hex_parts, dec_parts, bin_parts = [], [], []
+        length = max(len(self.text_string), 1)
+        converted_text = ConvertedText(self.number_format, self.value_type, self.endianness, self.pad,
+                                       self.show_prefix, self.detect, self.cache)
+
+        try:
+            for offset, text, convert in iter_chunks(io.StringIO(self.text_string), chunk_size):
+                if self.isInterruptionRequested():
+                    return
+
+                converted, _ = converted_text.append(text, convert)
+                hex_parts.append(converted["hex"])
+                dec_parts.append(converted["dec"])
+                bin_parts.append(converted["bin"])
+
+                self.progress.emit(100 * (offset + len(text)) // length)
+        except ValueError as error:
+            if not self.isInterruptionRequested():
+                self.failed.emit(str(error))
+            return
+
+        if not self.isInterruptionRequested():
+            self.converted.emit((''.join(hex_parts), ''.join(dec_parts), ''.join(bin_parts), converted_text))
+
+
+class RawImportWorker(QThread):
+    """
+    Thread converting the words of a raw binary file to hex, dec and bin text. The file is memory mapped and
+    converted a chunk of words at a time, so progress can be reported and cancellation checked between chunks.
+    """
+    # Percentage of the file converted
+    progress = Signal(int)
+    # Tuple of (hex string, decimal string, binary string, None)
+    converted = Signal(object)
+    # Error message when the file could not be imported
+    failed = Signal(str)
+    # Warning message when part of the file was left out, emitted before converted
+    warned = Signal(str)
+
+    # Format reported with the timings
+    number_format = "raw"
+
+    def __init__(self, path, word_bits, value_type, endianness='big', pad=False, show_prefix=False, timer=None,
+                 parent=None):
+        """
+        Initialize the worker, call start() to run the import
+        :param path: Path of the file
+        :param word_bits: Size of a word in bits, see raw_import.word_bit_values
+        :param value_type: Type of the words (unsigned, signed, floating, bfloat16)
+        :param endianness: Byte order of the words in the file (big, little)
+        :param pad: Whether to pad the hex and binary strings to a power of 2
+        :param show_prefix: Whether to show the '0x' and '0b' prefixes
+        :param timer: StageTimer timing the stages of the import, None to not time them
+        :param parent: Parent QObject
+        """
+        super().__init__(parent)
+        self.path = path
+        self.word_bits = word_bits
+        self.value_type = value_type
+        self.endianness = endianness
+        self.pad = pad
+        self.show_prefix = show_prefix
+        self.timer = timer
+
+    def run(self):
+        """
+        Import the file, emitting converted when done unless interrupted first
+        """
+        with self.timer or nullcontext():
+            self.convert()
+
+    def convert(self):
+        """
+        Convert the file in chunks, run on the worker thread
+        """
+        hex_parts, dec_parts, bin_parts = [], [], []
+
+        try:
+            for start, count, batch in iter_raw(self.path, self.word_bits, self.value_type, self.endianness):
+                if self.isInterruptionRequested():
+                    return
+
+                hex_text, dec_text, bin_text = render_words(batch, self.pad, self.show_prefix)
+                hex_parts.append(hex_text)
+                dec_parts.append(dec_text)
+                bin_parts.append(bin_text)
+
+                self.progress.emit(100 * (start + len(batch)) // count)
+            trailing = trailing_bytes(self.path, self.word_bits)
+        except (OSError, ValueError) as error:
+            if not self.isInterruptionRequested():
+                self.failed.emit(str(error))
+            return
+
+        if self.isInterruptionRequested():
+            return
+        if trailing:
+            self.warned.emit(f"Bytes after the last whole {self.word_bits} bit word were not imported: "
+                             f"{trailing.hex(' ')}")
+        self.converted.emit(('\n'.join(hex_parts), '\n'.join(dec_parts), '\n'.join(bin_parts), None))
@@ -0,0 +1,187 @@
+"""
+Class file to track where converted numbers are in the hex, dec and bin texts, so an edited region of the
+source text can be converted on its own
+"""
+
+import numpy as np
+
+from number_list import NumberList
+from stage_timer import stage
+
+number_formats = ("hex", "dec", "bin")
+
+
+class ConvertedText:
+    """
+    Class to store the positions of every converted number in the hex, dec and bin texts produced from one
+    source text, and of every number that could not be converted. The text between numbers is the same in all
+    three texts.
+    """
+    def __init__(self, number_format, value_type, endianness='big', pad=False, show_prefix=False, detect=False,
+                 cache=None):
+        """
+        Initialize the ConvertedText object with empty texts
+        :param number_format: Format of the source text (hex, dec, bin)
+        :param value_type: Type of the numbers (unsigned, signed, floating)
+        :param endianness: Endianness of the numbers (big, little)
+        :param pad: Whether to pad the hex and binary strings to a power of 2
+        :param show_prefix: Whether to show the '0x' and '0b' prefixes
+        :param detect: Whether to detect the format of each number instead of reading all as number_format
+        :param cache: TokenCache used to convert repeated tokens once, None to convert every number
+        """
+        self.number_format = number_format
+        self.options = (value_type, endianness, pad, show_prefix, detect)
+        self.cache = cache
+        self.starts = {number_format: np.zeros(0, dtype=np.int64) for number_format in number_formats}
+        self.ends = {number_format: np.zeros(0, dtype=np.int64) for number_format in number_formats}
+        self.lengths = {number_format: 0 for number_format in number_formats}
+
+        # List of (position, token, ValueError) for numbers that could not be converted, positions index the
+        # converted source text
+        self.errors = []
+
+        # Spans of appended text, joined to the others only when needed so appending stays linear
+        self._appended_starts = {number_format: [] for number_format in number_formats}
+        self._appended_ends = {number_format: [] for number_format in number_formats}
+
+    def append(self, text_string, convert=True):
+        """
+        Convert text added to the end of the source text.
+        :param text_string: Text to convert
+        :param convert: False to add the text to all three texts as is
+        :return: Tuple of (dict of converted text for each format, list of (position, token, ValueError) for the
+            numbers of this text)
+        """
+        rendered, errors = self._convert(text_string, convert)
+        errors = [(position + self.lengths[self.number_format], token, error) for position, token, error in errors]
+        self.errors.extend(errors)
+
+        converted = {}
+        for number_format, (converted_text, starts, ends) in rendered.items():
+            self._appended_starts[number_format].append(starts + self.lengths[number_format])
+            self._appended_ends[number_format].append(ends + self.lengths[number_format])
+            self.lengths[number_format] += len(converted_text)
+            converted[number_format] = converted_text
+        return converted, errors
+
+    def replace(self, text_string, start, end, convert=True):
+        """
+        Convert text replacing a region of the source text. The region must start after a delimiter or at the
+        start of the text, and end before a delimiter or at the end of the text, so no number crosses its bounds.
+        :param text_string: Text replacing the region
+        :param start: Start of the region in the source text as last converted
+        :param end: End of the region in the source text as last converted
+        :param convert: False to put the text into all three texts as is
+        :return: Tuple of (dict of (start, end, replacement) for each format, giving the region of the converted
+            text to replace, list of (position, token, ValueError) for the numbers of the region)
+        """
+        self._join_appended()
+        source_starts = self.starts[self.number_format]
+        first = int(np.searchsorted(source_starts, start))
+        last = int(np.searchsorted(source_starts, end))
+
+        rendered, errors = self._convert(text_string, convert)
+        errors = [(position + start, token, error) for position, token, error in errors]
+
+        # Locate the region in every text before any spans are updated
+        regions = {number_format: (start + self._offset(number_format, first),
+                                   end + self._offset(number_format, last))
+                   for number_format in number_formats}
+
+        replacements = {}
+        for number_format in number_formats:
+            region_start, region_end = regions[number_format]
+            replacement, starts, ends = rendered[number_format]
+            growth = len(replacement) - (region_end - region_start)
+
+            self.starts[number_format] = np.concatenate((self.starts[number_format][:first], starts + region_start,
+                                                         self.starts[number_format][last:] + growth))
+            self.ends[number_format] = np.concatenate((self.ends[number_format][:first], ends + region_start,
+                                                       self.ends[number_format][last:] + growth))
+            self.lengths[number_format] += growth
+            replacements[number_format] = (region_start, region_end, replacement)
+
+        # Replace the errors of the region and shift the ones after it
+        growth = len(rendered[self.number_format][0]) - (end - start)
+        self.errors = [entry for entry in self.errors if entry[0] < start] + errors + \
+                      [(position + growth, token, error) for position, token, error in self.errors if position >= end]
+
+        return replacements, errors
+
+    def _convert(self, text_string, convert):
+        """
+        Convert text to all formats, locating each converted number.
+        :param text_string: Text to convert
+        :param convert: False to keep the text as is in all formats
+        :return: Tuple of (dict of (converted text, number starts, number ends) for each format,
+            list of (position, token, ValueError) with positions in the converted source text)
+        """
+        if not convert:
+            empty = np.zeros(0, dtype=np.int64)
+            return {number_format: (text_string, empty, empty) for number_format in number_formats}, []
+
+        number_list = NumberList(self.cache)
+        number_list.parse_numbers(text_string, "auto" if self.options[4] else self.number_format, self.options[0],
+                                  self.options[1])
+        rendered = self._render(number_list)
+        if not number_list.errors or not len(number_list.numbers):
+            return rendered, number_list.errors
+
+        # Shift each error by how much the converted numbers before it grew
+        input_ends = number_list.positions + number_list.input_number_lengths
+        growth = np.concatenate(([0], rendered[self.number_format][2] - input_ends))
+        positions = np.array([position for position, _, _ in number_list.errors], dtype=np.int64)
+        positions += growth[np.searchsorted(input_ends, positions, 'right')]
+        return rendered, [(position, token, error) for position, (_, token, error) in
+                          zip(positions.tolist(), number_list.errors)]
+
+    def _join_appended(self):
+        """
+        Join the spans of appended text to the others
+        """
+        for number_format in number_formats:
+            if self._appended_starts[number_format]:
+                self.starts[number_format] = np.concatenate([self.starts[number_format]] +
+                                                            self._appended_starts[number_format])
+                self.ends[number_format] = np.concatenate([self.ends[number_format]] +
+                                                          self._appended_ends[number_format])
+                self._appended_starts[number_format] = []
+                self._appended_ends[number_format] = []
+
+    def _offset(self, number_format, index):
+        """
+        Get how far text before a number is shifted in one format relative to the source text.
+        :param number_format: Format of the text (hex, dec, bin)
+        :param index: Index of the number
+        :return: Position in the converted text minus position in the source text
+        """
+        if index == 0:
+            return 0
+        return int(self.ends[number_format][index - 1] - self.ends[self.number_format][index - 1])
+
+    def _render(self, number_list):
+        """
+        Convert the numbers of a NumberList to all formats, locating each converted number.
+        :param number_list: NumberList holding parsed numbers
+        :return: Dict of (converted text, number starts, number ends) for each format
+        """
+        input_starts = number_list.positions
+        input_lengths = number_list.input_number_lengths.astype(np.int64)
+
+        if not len(number_list.numbers):
+            return {number_format: (number_list.input_string, input_starts, input_starts)
+                    for number_format in number_formats}
+
+        pad, show_prefix = self.options[2], self.options[3]
+        template = number_list.template
+        rendered = {}
+        for number_format, strings in zip(number_formats, number_list.number_strings(pad=pad,
+                                                                                     show_prefix=show_prefix)):
+            with stage("join"):
+                segments = template.copy()
+                segments[1::2] = strings
+                lengths = np.fromiter(map(len, strings), dtype=np.int64, count=len(strings))
+                growth = lengths - input_lengths
+                starts = input_starts + np.cumsum(growth) - growth
+                rendered[number_format] = (''.join(segments), starts, starts + lengths)
+        return rendered
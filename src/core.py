@@ -0,0 +1,153 @@
+"""
+Conversion functions without any GUI, for scripts and services embedding the converter. Nothing here imports Qt.
+
+    from core import convert
+
+    result = convert("ff 0x10 zz", "hex", "dec")
+    result.text      # '255 16 zz'
+    result.errors    # [] - zz is not a number, so it is kept as text
+
+    for result in convert(log_lines, "hex", "dec", value_type="signed"):
+        ...
+"""
+
+from bisect import bisect_right
+from itertools import islice
+from typing import NamedTuple
+
+from number_list import NumberList
+
+number_formats = ("hex", "dec", "bin")
+value_types = ("unsigned", "signed", "floating", "bfloat16")
+
+# Number of characters of an iterable source converted together
+batch_size = 1 << 20
+
+
+class TokenError(NamedTuple):
+    """
+    Number that could not be converted, it is left as is in the converted text
+    """
+    position: int
+    token: str
+    message: str
+
+
+class Converted(NamedTuple):
+    """
+    Text with every number replaced, and the numbers that could not be converted
+    """
+    text: str
+    errors: list
+
+
+def convert(source, src, dst, value_type="unsigned", endianness="big", pad=False, prefix=False, cache=None):
+    """
+    Convert the numbers in a text, or in each text of an iterable, from one format to another. The text around
+    the numbers is kept as is.
+    :param source: Text string, or iterable of text strings such as the lines of a log
+    :param src: Format of the numbers in the source (hex, dec, bin), or auto to detect the format of each number
+    :param dst: Format to convert to (hex, dec, bin)
+    :param value_type: Type of the numbers (unsigned, signed, floating, bfloat16)
+    :param endianness: Endianness of the numbers (big, little)
+    :param pad: Whether to pad hex and binary numbers to a power of 2
+    :param prefix: Whether to show the '0x' and '0b' prefixes
+    :param cache: TokenCache used to convert repeated tokens once, None to convert every number
+    :return: Converted for a text string. For an iterable, an iterator of Converted for each text, in order, with
+        error positions in that text
+    """
+    _check_options(src, dst, value_type, endianness)
+    if isinstance(source, str):
+        return _convert_text(source, src, dst, value_type, endianness, pad, prefix, cache)
+    return _convert_texts(source, src, dst, value_type, endianness, pad, prefix, cache)
+
+
+def convert_all(text_string, src, value_type="unsigned", endianness="big", pad=False, prefix=False, cache=None):
+    """
+    Convert the numbers in a text to hex, dec and bin at once
+    :param text_string: Text to convert
+    :param src: Format of the numbers in the text (hex, dec, bin), or auto to detect the format of each number
+    :param value_type: Type of the numbers (unsigned, signed, floating, bfloat16)
+    :param endianness: Endianness of the numbers (big, little)
+    :param pad: Whether to pad hex and binary numbers to a power of 2
+    :param prefix: Whether to show the '0x' and '0b' prefixes
+    :param cache: TokenCache used to convert repeated tokens once, None to convert every number
+    :return: Tuple of (hex text, decimal text, binary text, list of TokenError)
+    """
+    _check_options(src, "hex", value_type, endianness)
+    number_list = NumberList(cache)
+    number_list.parse_numbers(text_string, src, value_type, endianness)
+    return number_list.to_strings(pad=pad, show_prefix=prefix) + (_token_errors(number_list.errors),)
+
+
+def _check_options(src, dst, value_type, endianness):
+    # Checked up front, so an iterable source fails on the call rather than on the first item
+    if src not in number_formats + ("auto",):
+        raise ValueError("Source format must be 'hex', 'dec', 'bin' or 'auto'")
+    if dst not in number_formats:
+        raise ValueError("Format must be 'hex', 'dec' or 'bin'")
+    if value_type not in value_types:
+        raise ValueError("Type must be 'unsigned', 'signed', 'floating' or 'bfloat16'")
+    if endianness not in ("big", "little"):
+        raise ValueError("Endianness must be 'big' or 'little'")
+
+
+def _token_errors(errors, offset=0):
+    return [TokenError(position - offset, token, str(error)) for position, token, error in errors]
+
+
+def _render(number_list, dst, pad, prefix):
+    # Only the target format is rendered
+    if dst == "hex":
+        return number_list.to_hex_string(pad=pad, show_0x=prefix)
+    if dst == "dec":
+        return number_list.to_dec_string()
+    return number_list.to_bin_string(pad=pad, show_0b=prefix)
+
+
+def _convert_text(text_string, src, dst, value_type, endianness, pad, prefix, cache):
+    number_list = NumberList(cache)
+    number_list.parse_numbers(text_string, src, value_type, endianness)
+    return Converted(_render(number_list, dst, pad, prefix), _token_errors(number_list.errors))
+
+
+def _convert_texts(texts, src, dst, value_type, endianness, pad, prefix, cache):
+    # Texts are joined with newlines and converted a batch at a time. Converting keeps every newline and never
+    # adds one, so the converted batch is split back into texts by their number of lines.
+    batch = []
+    length = 0
+    for text_string in texts:
+        batch.append(text_string)
+        length += len(text_string) + 1
+        if length >= batch_size:
+            yield from _convert_batch(batch, src, dst, value_type, endianness, pad, prefix, cache)
+            batch = []
+            length = 0
+    if batch:
+        yield from _convert_batch(batch, src, dst, value_type, endianness, pad, prefix, cache)
+
+
+def _convert_batch(texts, src, dst, value_type, endianness, pad, prefix, cache):
+    try:
+        converted = _convert_text('\n'.join(texts), src, dst, value_type, endianness, pad, prefix, cache)
+    except ValueError:
+        # A number that cannot be rendered fails the whole batch, the texts are then converted one at a time so
+        # only the text holding it fails, as when converting that text alone
+        for text_string in texts:
+            yield _convert_text(text_string, src, dst, value_type, endianness, pad, prefix, cache)
+        return
+
+    # Start of each text in the joined text, to give errors positions in their own text
+    starts = []
+    start = 0
+    for text_string in texts:
+        starts.append(start)
+        start += len(text_string) + 1
+    errors = [[] for _ in texts]
+    for error in converted.errors:
+        index = bisect_right(starts, error.position) - 1
+        errors[index].append(error._replace(position=error.position - starts[index]))
+
+    lines = iter(converted.text.split('\n'))
+    for text_string, text_errors in zip(texts, errors):
+        yield Converted('\n'.join(islice(lines, text_string.count('\n') + 1)), text_errors)
@@ -0,0 +1,75 @@
+"""
+Non-modal panel listing the numbers that could not be converted
+"""
+
+from PySide6.QtCore import Qt, Signal
+from PySide6.QtWidgets import QHBoxLayout, QLabel, QListWidget, QPushButton, QVBoxLayout, QWidget
+
+# Number of errors listed, the rest are only counted
+max_entries = 1000
+
+
+class DiagnosticsPanel(QWidget):
+    """
+    Panel listing the numbers that could not be converted, with their position, token and reason.
+    Selecting an entry emits error_selected so the token can be shown in its text edit.
+    """
+    # Start and end position of the selected token
+    error_selected = Signal(int, int)
+
+    def __init__(self, parent=None):
+        """
+        Initialize the panel, hidden until there are errors to show
+        :param parent: Parent widget
+        """
+        super().__init__(parent)
+        self.spans = []
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        header_layout = QHBoxLayout()
+        self.summary_label = QLabel()
+        self.hide_button = QPushButton("Hide")
+        self.hide_button.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.hide_button.clicked.connect(self.hide)
+        header_layout.addWidget(self.summary_label, 1)
+        header_layout.addWidget(self.hide_button)
+        layout.addLayout(header_layout)
+
+        self.error_list = QListWidget()
+        self.error_list.setMaximumHeight(120)
+        self.error_list.setStyleSheet("font-family: 'Roboto Mono', 'Courier New', monospace; font-size: 9pt;")
+        self.error_list.itemClicked.connect(self.select_item)
+        self.error_list.itemActivated.connect(self.select_item)
+        layout.addWidget(self.error_list)
+
+        self.hide()
+
+    def show_errors(self, errors):
+        """
+        Replace the listed errors, hiding the panel when there are none
+        :param errors: List of (position, token, ValueError)
+        """
+        self.error_list.clear()
+        shown = errors[:max_entries]
+        self.spans = [(position, position + len(token)) for position, token, _ in shown]
+
+        if not errors:
+            self.hide()
+            return
+
+        self.error_list.addItems([f"{position}: {token}: {error}" for position, token, error in shown])
+        if len(errors) > len(shown):
+            self.summary_label.setText(f"{len(errors)} invalid values, showing the first {len(shown)}")
+        else:
+            self.summary_label.setText(f"{len(errors)} invalid value{'s' if len(errors) > 1 else ''}")
+        self.show()
+
+    def select_item(self, item):
+        """
+        Emit the span of the token of a list item
+        :param item: Selected QListWidgetItem
+        """
+        start, end = self.spans[self.error_list.row(item)]
+        self.error_selected.emit(start, end)
@@ -1,108 +1,80 @@
 """
-Functions to handle ui events
+Functions to handle ui events, converting through the core module and showing its errors in message boxes
 """
 
 from PySide6.QtWidgets import QMessageBox
-from number_list import NumberList
 
 
 def hex_to_other(hex_string, pad=False, show_prefix=False, little_endian=False,
-                 is_unsigned=True, is_signed=False, is_float=False):
+                 is_unsigned=True, is_signed=False, is_float=False, is_bfloat16=False):
     """Convert hexadecimal to other formats"""
+    return convert_to_all(hex_string, "hex", "Invalid Hexadecimal Value", pad, show_prefix, little_endian,
+                          is_unsigned, is_signed, is_float, is_bfloat16)
 
-    # Determine number type
-    if is_unsigned:
-        number_type = "unsigned"
-    elif is_signed:
-        number_type = "signed"
-    elif is_float:
-        number_type = "floating"
-    else:
-        number_type = "unsigned"  # default
 
-    # Create a NumberList object to handle the conversion
-    number_list = NumberList()
+def dec_to_other(dec_string, pad=False, show_prefix=False, little_endian=False,
+                 is_unsigned=True, is_signed=False, is_float=False, is_bfloat16=False):
+    """Convert decimal to other formats"""
+    return convert_to_all(dec_string, "dec", "Invalid Decimal Value", pad, show_prefix, little_endian,
+                          is_unsigned, is_signed, is_float, is_bfloat16)
 
-    try:
-        if little_endian:
-            number_list.parse_numbers(hex_string, "hex", number_type, endianness='little')
-        else:
-            number_list.parse_numbers(hex_string, "hex", number_type, endianness='big')
-
-        hex_result = number_list.to_hex_string(pad=pad, show_0x=show_prefix)
-        dec_result = number_list.to_dec_string()
-        bin_result = number_list.to_bin_string(pad=pad, show_0b=show_prefix)
-    except ValueError as error:
-        QMessageBox.critical(None, "Conversion Error",
-                             f"Invalid Hexadecimal Value\n{error}")
-        return None, None, None
 
-    return hex_result, dec_result, bin_result
+def bin_to_other(bin_string, pad=False, show_prefix=False, little_endian=False,
+                 is_unsigned=True, is_signed=False, is_float=False, is_bfloat16=False):
+    """Convert binary to other formats"""
+    return convert_to_all(bin_string, "bin", "Invalid Binary Value", pad, show_prefix, little_endian,
+                          is_unsigned, is_signed, is_float, is_bfloat16)
 
 
-def dec_to_other(dec_string, pad=False, show_prefix=False, little_endian=False,
-                 is_unsigned=True, is_signed=False, is_float=False):
-    """Convert decimal to other formats"""
+def convert_to_all(text_string, number_format, error_title, pad=False, show_prefix=False, little_endian=False,
+                   is_unsigned=True, is_signed=False, is_float=False, is_bfloat16=False):
+    """Convert numbers in one format to hex, dec and bin in a single pass over the numbers"""
 
-    # Determine number type
-    if is_unsigned:
-        number_type = "unsigned"
-    elif is_signed:
-        number_type = "signed"
-    elif is_float:
-        number_type = "floating"
-    else:
-        number_type = "unsigned"  # default
+    from core import convert_all
 
-    # Create a NumberList object to handle the conversion
-    number_list = NumberList()
+    number_type = value_type_name(is_unsigned, is_signed, is_float, is_bfloat16)
 
     try:
-        if little_endian:
-            number_list.parse_numbers(dec_string, "dec", number_type, endianness='little')
-        else:
-            number_list.parse_numbers(dec_string, "dec", number_type, endianness='big')
-
-        hex_result = number_list.to_hex_string(pad=pad, show_0x=show_prefix)
-        dec_result = number_list.to_dec_string()
-        bin_result = number_list.to_bin_string(pad=pad, show_0b=show_prefix)
+        hex_result, dec_result, bin_result, errors = convert_all(text_string, number_format, number_type,
+                                                                 "little" if little_endian else "big", pad,
+                                                                 show_prefix)
     except ValueError as error:
-        QMessageBox.critical(None, "Conversion Error",
-                             f"Invalid Decimal Value\n{error}")
+        show_conversion_error(error_title, error)
         return None, None, None
 
+    show_value_errors(errors)
     return hex_result, dec_result, bin_result
 
 
-def bin_to_other(bin_string, pad=False, show_prefix=False, little_endian=False,
-                 is_unsigned=True, is_signed=False, is_float=False):
-    """Convert binary to other formats"""
-
-    # Determine number type
+def value_type_name(is_unsigned=True, is_signed=False, is_float=False, is_bfloat16=False):
+    """Get the value type name from the state of the type radio buttons"""
     if is_unsigned:
-        number_type = "unsigned"
+        return "unsigned"
     elif is_signed:
-        number_type = "signed"
+        return "signed"
     elif is_float:
-        number_type = "floating"
-    else:
-        number_type = "unsigned"  # default
+        return "floating"
+    elif is_bfloat16:
+        return "bfloat16"
+    return "unsigned"  # default
 
-    # Create a NumberList object to handle the conversion
-    number_list = NumberList()
 
-    try:
-        if little_endian:
-            number_list.parse_numbers(bin_string, "bin", number_type, endianness='little')
-        else:
-            number_list.parse_numbers(bin_string, "bin", number_type, endianness='big')
-
-        hex_result = number_list.to_hex_string(pad=pad, show_0x=show_prefix)
-        dec_result = number_list.to_dec_string()
-        bin_result = number_list.to_bin_string(pad=pad, show_0b=show_prefix)
-    except ValueError as error:
-        QMessageBox.critical(None, "Conversion Error",
-                             f"Invalid Binary Value\n{error}")
-        return None, None, None
+def show_value_errors(errors, max_listed=20):
+    """Show one message listing the numbers that could not be converted"""
+    if not errors:
+        return
+    lines = [f"Invalid Value: {token}\n{error}" for _, token, error in errors[:max_listed]]
+    if len(errors) > max_listed:
+        lines.append(f"... and {len(errors) - max_listed} more")
+    QMessageBox.critical(None, "Conversion Error", "\n".join(lines))
+
+
+def show_conversion_error(error_title, error):
+    """Show a message for a conversion that could not be done at all"""
+    QMessageBox.critical(None, "Conversion Error",
+                         f"{error_title}\n{error}")
+
 
-    return hex_result, dec_result, bin_result
\ No newline at end of file
+def show_conversion_warning(warning_title, warning):
+    """Show a message for a conversion that left part of its input out"""
+    QMessageBox.warning(None, "Conversion Warning", f"{warning_title}\n{warning}")
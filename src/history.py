@@ -0,0 +1,183 @@
+"""
+Undo history of the quick options and the hex, dec and bin texts, storing only the part of each text that changed
+"""
+
+import sys
+from typing import NamedTuple
+
+# Default memory the stored text changes may take, in bytes
+default_budget = 64 << 20
+
+# Number of characters compared at a time when looking for the changed part of a text
+_BLOCK = 1 << 16
+
+
+class QuickOptions(NamedTuple):
+    """
+    Quick options of one state of the history
+    """
+    pad: bool
+    prefix: bool
+    endianness: str
+    value_type: str
+    detect: bool = False
+
+
+class _Change(NamedTuple):
+    # Text removed at start and the text added in its place, going from one state to the next
+    start: int
+    removed: str
+    added: str
+
+
+def _common_prefix(a, b):
+    """
+    Get the length of the common start of two strings, comparing a block at a time
+    :return: Number of equal characters at the start
+    """
+    length = min(len(a), len(b))
+    start = 0
+    while start < length and a[start:start + _BLOCK] == b[start:start + _BLOCK]:
+        start += _BLOCK
+    end = min(start + _BLOCK, length)
+    while start < end and a[start] == b[start]:
+        start += 1
+    return min(start, length)
+
+
+def _common_suffix(a, b, limit):
+    """
+    Get the length of the common end of two strings, comparing a block at a time
+    :param limit: Maximum length, so the suffix does not overlap the common prefix
+    :return: Number of equal characters at the end
+    """
+    length = 0
+    while length + _BLOCK <= limit and a[len(a) - length - _BLOCK:len(a) - length] == \
+            b[len(b) - length - _BLOCK:len(b) - length]:
+        length += _BLOCK
+    while length < limit and a[len(a) - length - 1] == b[len(b) - length - 1]:
+        length += 1
+    return length
+
+
+def diff_texts(old, new):
+    """
+    Find the one region that differs between two texts
+    :param old: Text before the change
+    :param new: Text after the change
+    :return: _Change turning old into new. A whole text is kept as the same string rather than a copy
+    """
+    if old is new or old == new:
+        return _Change(0, "", "")
+    prefix = _common_prefix(old, new)
+    suffix = _common_suffix(old, new, min(len(old), len(new)) - prefix)
+    if prefix == 0 and suffix == 0:
+        return _Change(0, old, new)
+    return _Change(prefix, old[prefix:len(old) - suffix], new[prefix:len(new) - suffix])
+
+
+class History:
+    """
+    Class to store the states of the converter for undo and redo. Each state after the first is stored as the
+    changes to the texts of the previous state, so converting part of a text only stores that part. The oldest
+    states are dropped once the changes take more than the memory budget.
+    """
+    def __init__(self, options, texts, budget=default_budget):
+        """
+        Initialize the history with its first state
+        :param options: QuickOptions of the first state
+        :param texts: Tuple of (hex text, dec text, bin text) of the first state
+        :param budget: Memory the stored changes may take, in bytes
+        """
+        self.budget = budget
+        self.texts = tuple(texts)
+        # QuickOptions of each state, the changes from the previous state to each state and the memory they take
+        self.options = [options]
+        self.changes = [_no_changes(self.texts)]
+        self.sizes = [0]
+        self.index = 0
+        self.size = 0
+
+    def __len__(self):
+        return len(self.options)
+
+    def push(self, options, texts):
+        """
+        Add a state after the current one, dropping the states that could be redone
+        :param options: QuickOptions of the state
+        :param texts: Tuple of (hex text, dec text, bin text) of the state
+        """
+        self.size -= sum(self.sizes[self.index + 1:])
+        del self.options[self.index + 1:]
+        del self.changes[self.index + 1:]
+        del self.sizes[self.index + 1:]
+
+        changes = tuple(diff_texts(old, new) for old, new in zip(self.texts, texts))
+        self.options.append(options)
+        self.changes.append(changes)
+        self.sizes.append(_changes_size(changes, self.changes[-2]))
+        self.size += self.sizes[-1]
+        self.texts = tuple(texts)
+        self.index = len(self.options) - 1
+
+        # Drop the oldest states until the changes fit, the first state needs no changes
+        while self.size > self.budget and len(self.options) > 1:
+            self.size -= self.sizes[1]
+            del self.options[0]
+            del self.changes[0]
+            del self.sizes[0]
+            self.changes[0] = _no_changes(self.texts)
+            self.sizes[0] = 0
+            self.index -= 1
+
+            # Text the next state shared with the dropped changes is now only held by the next state
+            if len(self.options) > 1:
+                self.size -= self.sizes[1]
+                self.sizes[1] = _changes_size(self.changes[1], self.changes[0])
+                self.size += self.sizes[1]
+
+    def undo(self):
+        """
+        Go back to the previous state
+        :return: Tuple of (QuickOptions, texts) of the previous state, None if there is none
+        """
+        if self.index == 0:
+            return None
+        self.texts = tuple(_apply(text, change.start, change.added, change.removed)
+                           for text, change in zip(self.texts, self.changes[self.index]))
+        self.index -= 1
+        return self.options[self.index], self.texts
+
+    def redo(self):
+        """
+        Go forward to the next state
+        :return: Tuple of (QuickOptions, texts) of the next state, None if there is none
+        """
+        if self.index == len(self.options) - 1:
+            return None
+        self.index += 1
+        self.texts = tuple(_apply(text, change.start, change.removed, change.added)
+                           for text, change in zip(self.texts, self.changes[self.index]))
+        return self.options[self.index], self.texts
+
+
+def _no_changes(texts):
+    return tuple(_Change(0, "", "") for _ in texts)
+
+
+def _apply(text_string, start, old, new):
+    # Replace old at start with new, a whole text is replaced without copying
+    if start == 0 and len(old) == len(text_string):
+        return new
+    return text_string[:start] + new + text_string[start + len(old):]
+
+
+def _changes_size(changes, previous):
+    # A whole text removed is the same string as the whole text added by the previous state, so it is only
+    # counted there
+    size = 0
+    for change, previous_change in zip(changes, previous):
+        size += sys.getsizeof(change.added)
+        if change.removed is not previous_change.added:
+            size += sys.getsizeof(change.removed)
+    return size
@@ -2,121 +2,144 @@
 Class file to store list of numbers and their positions in a text string
 """
 
-from PySide6.QtWidgets import QMessageBox
+import numpy as np
+
+from batch_format import BatchFormat
+from stage_timer import count_tokens, stage
+from token_cache import number_formats
+from tokenizer import detect_format, detect_formats, select_format, span_strings, text_codes, tokenize_codes
+
+
+def parse_codes(codes, number_format, value_type, endianness='big'):
+    """
+    Locate and parse all numbers of one format in an array of character codes.
+    :param codes: Array of character codes, see tokenizer.text_codes
+    :param number_format: Format of the numbers (hex, dec, bin), or auto to detect the format of each number
+    :param value_type: Type of the numbers (unsigned, signed, floating)
+    :param endianness: Endianness of the numbers (big, little)
+    :return: Tuple of (BatchFormat, starts, ends, errors), starts and ends locate the parsed numbers,
+        errors is a list of (position, token, ValueError) for numbers that could not be parsed
+    """
+    with stage("tokenize"):
+        if number_format == "auto":
+            starts, digit_starts, ends, formats = detect_format(*tokenize_codes(codes))
+        else:
+            starts, digit_starts, ends = select_format(*tokenize_codes(codes), number_format)
+    count_tokens(len(starts))
+
+    # Parse all numbers at once
+    with stage("parse"):
+        if number_format == "auto":
+            batch, errors = _parse_detected(codes, digit_starts, ends, formats, value_type, endianness)
+        else:
+            batch = BatchFormat(value_type, endianness)
+            errors = _parse_spans(batch, codes, digit_starts, ends, number_format)
+
+    failed = [index for index, _ in errors]
+    tokens = span_strings(codes, starts[failed], ends[failed])
+    errors = [(int(starts[index]), token, error) for (index, error), token in zip(errors, tokens)]
+
+    # Keep the numbers that parsed successfully
+    parsed = np.ones(len(starts), dtype=bool)
+    parsed[failed] = False
+    return batch, starts[parsed], ends[parsed], errors
+
+
+def _parse_spans(batch, codes, digit_starts, ends, number_format):
+    """
+    Parse the digits of numbers of one format into a batch.
+    :return: List of (index, ValueError) for numbers that could not be parsed
+    """
+    if number_format == "hex":
+        return batch.from_hex_spans(codes, digit_starts, ends)
+    if number_format == "dec":
+        return batch.from_dec_strings(span_strings(codes, digit_starts, ends))
+    return batch.from_bin_spans(codes, digit_starts, ends)
+
+
+def _parse_detected(codes, digit_starts, ends, formats, value_type, endianness):
+    """
+    Parse numbers of mixed formats, each format in one pass, and put them back in the order of the text.
+    :param formats: Index into tokenizer.detect_formats of the format of each number
+    :return: Tuple of (BatchFormat, errors), errors is a list of (index, ValueError) in the order of the text
+    """
+    batches = []
+    rows = []
+    errors = []
+    for format_index, number_format in enumerate(detect_formats):
+        indices = np.flatnonzero(formats == format_index)
+        if len(indices) == 0:
+            continue
+        batch = BatchFormat(value_type, endianness)
+        format_errors = _parse_spans(batch, codes, digit_starts[indices], ends[indices], number_format)
+        parsed = np.ones(len(indices), dtype=bool)
+        parsed[[index for index, _ in format_errors]] = False
+        errors.extend((int(indices[index]), error) for index, error in format_errors)
+        batches.append(batch)
+        rows.append(indices[parsed])
+
+    errors.sort(key=lambda error: error[0])
+    if not batches:
+        return BatchFormat(value_type, endianness), errors
+    if len(batches) == 1:
+        return batches[0], errors
+    return BatchFormat.concatenate(batches).take(np.argsort(np.concatenate(rows), kind='stable')), errors
 
-from universal_format import UniversalFormat
 
 class NumberList:
     """
-    Class to store a list of numbers and their positions in a text string
+    Class to store a list of numbers and their positions in a text string.
+
+    Numbers are kept as struct of arrays: values in a BatchFormat, start positions as int64 and lengths as
+    uint32, about 21 bytes per number. The text between numbers is sliced from the input string when needed.
     """
-    def __init__(self):
+    __slots__ = ('input_string', 'number_format', 'numbers', 'positions', 'input_number_lengths', 'errors', 'cache')
+
+    def __init__(self, cache=None):
         """
         Initialize the NumberList object
+        :param cache: TokenCache used to convert repeated tokens once, None to convert every number
         """
+        self.cache = cache
         self.input_string = ""
-        self.numbers = []
-        self.positions = []
-        self.input_number_lengths = []
+        self.number_format = "hex"
+        self.numbers = BatchFormat("unsigned")
+        self.positions = np.zeros(0, dtype=np.int64)
+        self.input_number_lengths = np.zeros(0, dtype=np.uint32)
+        self.errors = []
 
     def parse_numbers(self, text_string, number_format, value_type, endianness='big'):
         """
         Parse numbers from the text string.
         :param text_string: Text string to parse
-        :param number_format: Format of the numbers (hex, dec, bin)
+        :param number_format: Format of the numbers (hex, dec, bin), or auto to detect the format of each number
         :param value_type: Type of the numbers (unsigned, signed, floating)
         :param endianness: Endianness of the numbers (big, little)
-        :return: List of UniversalFormat objects
+        :return: BatchFormat holding the parsed numbers
         """
         self.input_string = text_string
+        self.number_format = number_format
 
-        numbers = []
-        positions = []
-        input_number_lengths = []
-
-        delimiters = [' ', ',', '\n', '\r', '\t', ';', ':', '[', ']', '{', '}', '(', ')']
-        allowed_hex = ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9', 'a', 'b', 'c', 'd', 'e', 'f', 'A', 'B', 'C', 'D', 'E', 'F']
-        allowed_bin = ['0', '1']
-        allowed_dec = ['-', '.', '0', '1', '2', '3', '4', '5', '6', '7', '8', '9']
-
-        allowed_hex_start = ['0x', '0X', '$']
-        allowed_bin_start = ['0b', '0B', '%']
-
-        # Set appropriate allowed characters based on number format
-        if number_format == "hex":
-            allowed_chars = allowed_hex
-        elif number_format == "dec":
-            allowed_chars = allowed_dec
-        elif number_format == "bin":
-            allowed_chars = allowed_bin
-        else:
-            raise ValueError("Invalid number format")
-
-        # Replace delimiters with spaces for easier splitting
-        for delimiter in delimiters:
-            text_string = text_string.replace(delimiter, ' ')
-
-        # Split the string into words
-        word_pos = 0
-        words = text_string.split(' ')
-        for word in words:
-            # Skip empty strings
-            if not word:
-                word_pos += len(word) + 1  # +1 for delimiter
-                continue
-
-            try:
-                # Check if the word has a valid prefix
-                if number_format == "hex" and any(word.startswith(prefix) for prefix in allowed_hex_start):
-                    word_without_prefix = word[2:] if word.startswith(('0x', '0X')) else word[1:] if word.startswith('$') else word
-                    if not all(char in allowed_chars for char in word_without_prefix):
-                        word_pos += len(word) + 1
-                        continue
-                elif number_format == "bin" and any(word.startswith(prefix) for prefix in allowed_bin_start):
-                    word_without_prefix = word[2:] if word.startswith(('0b', '0B')) else word[1:] if word.startswith('%') else word
-                    if not all(char in allowed_chars for char in word_without_prefix):
-                        word_pos += len(word) + 1
-                        continue
-                # If no prefix, check if all characters are allowed
-                elif not all(char in allowed_chars for char in word):
-                    word_pos += len(word) + 1
-                    continue
-
-                # Create a UniversalFormat object
-                uf = UniversalFormat()
-                uf.set_type(value_type)
-                uf.set_endianness(endianness)
-
-                # Parse based on format
-                if number_format == "hex":
-                    uf.from_hex_string(word)
-                elif number_format == "dec":
-                    uf.from_dec_string(word)
-                elif number_format == "bin":
-                    uf.from_bin_string(word)
-                else:
-                    # Try to autodetect
-                    if word.lower().startswith(('0x', '$')):
-                        uf.from_hex_string(word)
-                    elif word.lower().startswith(('0b', '%')):
-                        uf.from_bin_string(word)
-                    else:
-                        uf.from_dec_string(word)
-
-                numbers.append(uf)
-                positions.append(word_pos)
-                input_number_lengths.append(len(word))
-
-            except ValueError as error:
-                QMessageBox.critical(None, "Conversion Error",
-                                     f"Invalid Value: {word}\n{error}")
-
-            # Update position for next word
-            word_pos += len(word) + 1  # +1 for space
-
-        self.numbers = numbers
-        self.positions = positions
-        self.input_number_lengths = input_number_lengths
+        batch, starts, ends, self.errors = parse_codes(text_codes(text_string), number_format, value_type,
+                                                       endianness)
+
+        self.numbers = batch
+        self.positions = starts.astype(np.int64)
+        self.input_number_lengths = (ends - starts).astype(np.uint32)
+
+        return batch
+
+    @property
+    def template(self):
+        """
+        List of the text between numbers at the even slots, with the odd slots left for the converted numbers
+        """
+        starts = self.positions.tolist()
+        ends = (self.positions + self.input_number_lengths).tolist()
+        template = [None] * (2 * len(starts) + 1)
+        template[0::2] = [self.input_string[gap_start:gap_end] for gap_start, gap_end in
+                          zip([0] + ends, starts + [len(self.input_string)])]
+        return template
 
     def to_hex_string(self, pad=False, show_0x=False):
         """
@@ -129,22 +152,14 @@ class NumberList:
         if not self.input_string:
             return ""
 
-        if not self.numbers:
+        if not len(self.numbers):
             return self.input_string
 
-        # Make a copy of the input string
-        result = self.input_string
-
-        # Process numbers in reverse order to avoid position shifts
-        for i in range(len(self.numbers) - 1, -1, -1):
-            hex_str = self.numbers[i].to_hex_string(pad=pad, show_0x=show_0x)
-            pos = self.positions[i]
-            length = self.input_number_lengths[i]
-
-            # Replace the original number with the hex string
-            result = result[:pos] + hex_str + result[pos + length:]
-
-        return result
+        if self.cache is not None:
+            return self._fill_template(self.number_strings(pad=pad, show_prefix=show_0x, formats=("hex",))[0])
+        with stage("render"):
+            hex_strings = self.numbers.to_hex_strings(pad=pad, show_0x=show_0x)
+        return self._fill_template(hex_strings)
 
     def to_dec_string(self):
         """
@@ -155,22 +170,14 @@ class NumberList:
         if not self.input_string:
             return ""
 
-        if not self.numbers:
+        if not len(self.numbers):
             return self.input_string
 
-        # Make a copy of the input string
-        result = self.input_string
-
-        # Process numbers in reverse order to avoid position shifts
-        for i in range(len(self.numbers) - 1, -1, -1):
-            dec_str = self.numbers[i].to_dec_string()
-            pos = self.positions[i]
-            length = self.input_number_lengths[i]
-
-            # Replace the original number with the decimal string
-            result = result[:pos] + dec_str + result[pos + length:]
-
-        return result
+        if self.cache is not None:
+            return self._fill_template(self.number_strings(formats=("dec",))[0])
+        with stage("render"):
+            dec_strings = self.numbers.to_dec_strings()
+        return self._fill_template(dec_strings)
 
     def to_bin_string(self, pad=False, show_0b=False):
         """
@@ -182,19 +189,65 @@ class NumberList:
         if not self.input_string:
             return ""
 
-        if not self.numbers:
+        if not len(self.numbers):
             return self.input_string
 
-        # Make a copy of the input string
-        result = self.input_string
+        if self.cache is not None:
+            return self._fill_template(self.number_strings(pad=pad, show_prefix=show_0b, formats=("bin",))[0])
+        with stage("render"):
+            bin_strings = self.numbers.to_bin_strings(pad=pad, show_0b=show_0b)
+        return self._fill_template(bin_strings)
 
-        # Process numbers in reverse order to avoid position shifts
-        for i in range(len(self.numbers) - 1, -1, -1):
-            bin_str = self.numbers[i].to_bin_string(pad=pad, show_0b=show_0b)
-            pos = self.positions[i]
-            length = self.input_number_lengths[i]
+    def to_strings(self, pad=False, show_prefix=False):
+        """
+        Replace all numbers in the input string with their hexadecimal, decimal and binary
+        representations in one pass over the numbers.
+        :param pad: Whether to pad the hex and binary strings to a power of 2
+        :param show_prefix: Whether to show the '0x' and '0b' prefixes
+        :return: Tuple of (hex string, decimal string, binary string)
+        """
+        if not self.input_string:
+            return "", "", ""
+
+        if not len(self.numbers):
+            return self.input_string, self.input_string, self.input_string
 
-            # Replace the original number with the binary string
-            result = result[:pos] + bin_str + result[pos + length:]
+        hex_strings, dec_strings, bin_strings = self.number_strings(pad=pad, show_prefix=show_prefix)
+        template = self.template
+        return (self._fill_template(hex_strings, template), self._fill_template(dec_strings, template),
+                self._fill_template(bin_strings, template))
+
+    def tokens(self):
+        """
+        Get the text of each parsed number as it appears in the input string.
+        :return: List of token strings
+        """
+        return [self.input_string[start:end] for start, end in
+                zip(self.positions.tolist(), (self.positions + self.input_number_lengths).tolist())]
 
-        return result
\ No newline at end of file
+    def number_strings(self, pad=False, show_prefix=False, formats=number_formats):
+        """
+        Convert each number to hexadecimal, decimal and binary, through the token cache if there is one.
+        :param pad: Whether to pad the hex and binary strings to a power of 2
+        :param show_prefix: Whether to show the '0x' and '0b' prefixes
+        :param formats: Formats to convert to, the cache only converts these
+        :return: Tuple of lists of strings, one for each format of formats
+        """
+        with stage("render"):
+            if self.cache is None:
+                strings = self.numbers.to_strings(pad=pad, show_prefix=show_prefix)
+                return tuple(strings[number_formats.index(number_format)] for number_format in formats)
+            return self.cache.to_strings(self.tokens(), self.numbers, self.number_format, pad=pad,
+                                         show_prefix=show_prefix, formats=formats)
+
+    def _fill_template(self, number_strings, template=None):
+        """
+        Join the text between numbers with the converted numbers.
+        :param number_strings: Converted string for each number
+        :param template: Template to fill, see template, built if not given
+        :return: The input string with numbers replaced
+        """
+        with stage("join"):
+            segments = self.template if template is None else template.copy()
+            segments[1::2] = number_strings
+            return ''.join(segments)
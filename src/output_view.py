@@ -0,0 +1,229 @@
+"""
+Read-only view of very large converted texts, drawing only the visible lines so texts of millions of numbers do not
+need a text document
+"""
+
+import numpy as np
+from PySide6.QtCore import Qt, Signal
+from PySide6.QtGui import QGuiApplication, QPainter
+from PySide6.QtWidgets import QAbstractScrollArea
+
+# Lines longer than this are shown as several rows of this many characters
+max_row_length = 1000
+
+# Characters drawn differently from the text, tabs keep one column so positions match columns
+_ROW_TEXT = str.maketrans({'\t': ' ', '\r': None})
+
+
+class LineIndex:
+    """
+    Class to store where each line of a text starts and ends, and the rows lines longer than max_row_length are
+    split into
+    """
+    def __init__(self, text_string, row_length=max_row_length):
+        """
+        Index the lines of a text
+        :param text_string: Text to index
+        :param row_length: Maximum number of characters in a row
+        """
+        # Positions of the code points, which match the string positions once encoded to a fixed width
+        if text_string.isascii():
+            codes = np.frombuffer(text_string.encode('ascii'), dtype=np.uint8)
+        else:
+            codes = np.frombuffer(text_string.encode('utf-32-le'), dtype=np.uint32)
+        newlines = np.flatnonzero(codes == 10)
+        del codes
+
+        line_starts = np.concatenate(([0], newlines + 1))
+        line_ends = np.concatenate((newlines, [len(text_string)]))
+        lengths = line_ends - line_starts
+
+        # Split long lines into rows, the first row of each line is found by searching first_rows
+        rows_per_line = np.maximum((lengths + row_length - 1) // row_length, 1)
+        if (rows_per_line == 1).all():
+            self.row_starts = line_starts
+            self.row_ends = line_ends
+            self.first_rows = np.arange(len(line_starts), dtype=np.int64)
+        else:
+            self.first_rows = np.cumsum(rows_per_line) - rows_per_line
+            line_of_row = np.repeat(np.arange(len(line_starts)), rows_per_line)
+            row_in_line = np.arange(len(line_of_row)) - self.first_rows[line_of_row]
+            self.row_starts = line_starts[line_of_row] + row_in_line * row_length
+            self.row_ends = np.minimum(self.row_starts + row_length, line_ends[line_of_row])
+        self.max_length = int((self.row_ends - self.row_starts).max())
+
+    def row_count(self):
+        """
+        Get the number of rows
+        :return: Number of rows, at least 1
+        """
+        return len(self.row_starts)
+
+    def line_count(self):
+        """
+        Get the number of lines
+        :return: Number of lines, at least 1
+        """
+        return len(self.first_rows)
+
+    def line_of_row(self, row):
+        """
+        Get the line a row belongs to
+        :param row: Index of the row
+        :return: Index of the line
+        """
+        return int(np.searchsorted(self.first_rows, row, side='right')) - 1
+
+    def row_of_position(self, position):
+        """
+        Get the row holding a position of the text
+        :param position: Position in the text
+        :return: Index of the row
+        """
+        return max(int(np.searchsorted(self.row_starts, position, side='right')) - 1, 0)
+
+
+class OutputView(QAbstractScrollArea):
+    """
+    Read-only view of a text that draws only the rows on screen. Scrolling emits top_line_changed with the line
+    at the top of the view, so views of texts with the same lines can be kept in step with scroll_to_line().
+    Ctrl+C copies the whole text.
+    """
+    # Index of the line at the top of the view
+    top_line_changed = Signal(int)
+
+    def __init__(self, parent=None):
+        """
+        Initialize an empty view
+        :param parent: Parent widget
+        """
+        super().__init__(parent)
+        self.text_string = ""
+        self.index = LineIndex("")
+        self.selection = None
+        self.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
+        self.verticalScrollBar().valueChanged.connect(self._scrolled)
+        self.horizontalScrollBar().valueChanged.connect(self.viewport().update)
+
+    def set_text(self, text_string):
+        """
+        Show a text, scrolled to the top
+        :param text_string: Text to show
+        """
+        self.text_string = text_string
+        self.index = LineIndex(text_string)
+        self.selection = None
+        self._update_scroll_bars()
+        self.verticalScrollBar().setValue(0)
+        self.horizontalScrollBar().setValue(0)
+        self.viewport().update()
+
+    def toPlainText(self):
+        """
+        Get the text shown, named like QTextEdit.toPlainText
+        :return: Text string
+        """
+        return self.text_string
+
+    def top_line(self):
+        """
+        Get the line at the top of the view
+        :return: Index of the line
+        """
+        return self.index.line_of_row(self.verticalScrollBar().value())
+
+    def scroll_to_line(self, line):
+        """
+        Scroll so a line is at the top of the view, if it is not already
+        :param line: Index of the line
+        """
+        line = min(max(line, 0), self.index.line_count() - 1)
+        if self.top_line() != line:
+            self.verticalScrollBar().setValue(int(self.index.first_rows[line]))
+
+    def select(self, start, end):
+        """
+        Highlight a span of the text and scroll to it
+        :param start: Position of the first character
+        :param end: Position after the last character
+        """
+        self.selection = (start, end)
+        row = self.index.row_of_position(start)
+        scroll_bar = self.verticalScrollBar()
+        if not scroll_bar.value() <= row < scroll_bar.value() + self._visible_rows() - 1:
+            scroll_bar.setValue(max(row - self._visible_rows() // 2, 0))
+
+        # Scroll sideways to the start of the span within its row
+        column = start - int(self.index.row_starts[row])
+        char_width = self.fontMetrics().horizontalAdvance('0')
+        if not self.horizontalScrollBar().value() <= column * char_width < \
+                self.horizontalScrollBar().value() + self.viewport().width():
+            self.horizontalScrollBar().setValue(column * char_width)
+        self.viewport().update()
+
+    def _visible_rows(self):
+        return max(self.viewport().height() // self.fontMetrics().lineSpacing(), 1)
+
+    def _update_scroll_bars(self):
+        rows = self._visible_rows()
+        self.verticalScrollBar().setRange(0, max(self.index.row_count() - rows, 0))
+        self.verticalScrollBar().setPageStep(rows)
+        self.verticalScrollBar().setSingleStep(1)
+
+        char_width = self.fontMetrics().horizontalAdvance('0')
+        width = self.viewport().width()
+        self.horizontalScrollBar().setRange(0, max(self.index.max_length * char_width - width, 0))
+        self.horizontalScrollBar().setPageStep(width)
+        self.horizontalScrollBar().setSingleStep(char_width)
+
+    def _scrolled(self):
+        self.viewport().update()
+        self.top_line_changed.emit(self.top_line())
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._update_scroll_bars()
+
+    def changeEvent(self, event):
+        # Fonts set by style sheets change the row height and character width
+        super().changeEvent(event)
+        if event.type() == event.Type.FontChange:
+            self._update_scroll_bars()
+
+    def keyPressEvent(self, event):
+        if event.matches(event.StandardKey.Copy):
+            QGuiApplication.clipboard().setText(self.text_string)
+            return
+        scroll_bar = self.verticalScrollBar()
+        if event.key() == Qt.Key.Key_Home and event.modifiers() == Qt.KeyboardModifier.ControlModifier:
+            scroll_bar.setValue(scroll_bar.minimum())
+        elif event.key() == Qt.Key.Key_End and event.modifiers() == Qt.KeyboardModifier.ControlModifier:
+            scroll_bar.setValue(scroll_bar.maximum())
+        else:
+            super().keyPressEvent(event)
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        painter.fillRect(self.viewport().rect(), self.palette().base())
+        metrics = self.fontMetrics()
+        line_height = metrics.lineSpacing()
+        char_width = metrics.horizontalAdvance('0')
+        x = -self.horizontalScrollBar().value()
+
+        first_row = self.verticalScrollBar().value()
+        last_row = min(first_row + self._visible_rows() + 1, self.index.row_count())
+        for y, row in enumerate(range(first_row, last_row)):
+            row_start = int(self.index.row_starts[row])
+            row_end = int(self.index.row_ends[row])
+
+            # Highlight the part of the selection on this row
+            if self.selection is not None:
+                start = max(self.selection[0], row_start)
+                end = min(self.selection[1], row_end)
+                if start < end:
+                    painter.fillRect(x + (start - row_start) * char_width, y * line_height,
+                                     (end - start) * char_width, line_height, self.palette().highlight())
+
+            row_text = self.text_string[row_start:row_end].translate(_ROW_TEXT)
+            painter.drawText(x, y * line_height + metrics.ascent(), row_text)
+        painter.end()
@@ -0,0 +1,136 @@
+"""
+Import of raw binary files such as firmware or memory images, converting fixed size words straight from a memory
+map of the file
+"""
+
+import os
+
+import numpy as np
+
+from batch_format import BatchFormat
+from stage_timer import count_tokens, stage
+
+# Word sizes that can be imported, in bits
+word_bit_values = (8, 16, 32, 64)
+
+# Number of words on each line of converted text
+words_per_line = 8
+
+# Number of words converted at a time, a multiple of words_per_line so chunks end on a line
+chunk_words = 1 << 16
+
+
+def map_words(path, word_bits, endianness='big', offset=0):
+    """
+    Memory map a file as an array of unsigned words. Bytes after the last whole word are left out, see trailing_bytes.
+    :param path: Path of the file
+    :param word_bits: Size of a word in bits, one of word_bit_values
+    :param endianness: Byte order of the words in the file (big, little)
+    :param offset: Number of bytes to skip at the start of the file
+    :return: Read-only array of unsigned words, backed by the file
+    """
+    if word_bits not in word_bit_values:
+        raise ValueError(f"Word size must be one of {', '.join(map(str, word_bit_values))} bits")
+    if endianness not in ['big', 'little']:
+        raise ValueError("Endianness must be 'big' or 'little'")
+
+    dtype = np.dtype(f"{'>' if endianness == 'big' else '<'}u{word_bits // 8}")
+    count = max(os.path.getsize(path) - offset, 0) // dtype.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(count,))
+
+
+def trailing_bytes(path, word_bits, offset=0):
+    """
+    Read the bytes after the last whole word of a file, which are not imported
+    :param path: Path of the file
+    :param word_bits: Size of a word in bits, one of word_bit_values
+    :param offset: Number of bytes to skip at the start of the file
+    :return: The bytes after the last whole word, empty if the file holds whole words
+    """
+    if word_bits not in word_bit_values:
+        raise ValueError(f"Word size must be one of {', '.join(map(str, word_bit_values))} bits")
+
+    length = max(os.path.getsize(path) - offset, 0)
+    count = length % (word_bits // 8)
+    if count == 0:
+        return b''
+    with open(path, 'rb') as file:
+        file.seek(offset + length - count)
+        return file.read(count)
+
+
+def read_raw(path, word_bits, value_type, endianness='big', offset=0):
+    """
+    Read all words of a raw binary file
+    :param path: Path of the file
+    :param word_bits: Size of a word in bits, one of word_bit_values
+    :param value_type: Type of the words (unsigned, signed, floating, bfloat16)
+    :param endianness: Byte order of the words in the file (big, little)
+    :param offset: Number of bytes to skip at the start of the file
+    :return: Tuple of (BatchFormat holding one number per word, bytes after the last whole word)
+    """
+    batch = BatchFormat(value_type, endianness)
+    batch.from_words(map_words(path, word_bits, endianness, offset))
+    return batch, trailing_bytes(path, word_bits, offset)
+
+
+def iter_raw(path, word_bits, value_type, endianness='big', offset=0, size=chunk_words):
+    """
+    Read the words of a raw binary file a chunk at a time, so only one chunk of values is held in memory
+    :param path: Path of the file
+    :param word_bits: Size of a word in bits, one of word_bit_values
+    :param value_type: Type of the words (unsigned, signed, floating, bfloat16)
+    :param endianness: Byte order of the words in the file (big, little)
+    :param offset: Number of bytes to skip at the start of the file
+    :param size: Number of words per chunk
+    :return: Iterator of (index of the first word, total number of words, BatchFormat)
+    """
+    words = map_words(path, word_bits, endianness, offset)
+    for start in range(0, len(words), size):
+        batch = BatchFormat(value_type, endianness)
+        with stage("parse"):
+            batch.from_words(words[start:start + size])
+        count_tokens(len(batch))
+        yield start, len(words), batch
+
+
+def render_words(batch, pad=False, show_prefix=False, line_length=words_per_line):
+    """
+    Convert the numbers of a BatchFormat to lines of hexadecimal, decimal and binary text
+    :param batch: BatchFormat holding the numbers
+    :param pad: Whether to pad the hex and binary strings to a power of 2
+    :param show_prefix: Whether to show the '0x' and '0b' prefixes
+    :param line_length: Number of numbers per line, separated by spaces
+    :return: Tuple of (hex text, decimal text, binary text), without a trailing newline
+    """
+    with stage("render"):
+        columns = batch.to_strings(pad=pad, show_prefix=show_prefix)
+
+    with stage("join"):
+        return tuple('\n'.join([' '.join(strings[start:start + line_length])
+                                for start in range(0, len(strings), line_length)]) for strings in columns)
+
+
+def convert_raw(path, word_bits, value_type, endianness='big', pad=False, show_prefix=False, offset=0,
+                line_length=words_per_line):
+    """
+    Convert all words of a raw binary file to hexadecimal, decimal and binary text, as if each word had been
+    typed as a hex string of its full width
+    :param path: Path of the file
+    :param word_bits: Size of a word in bits, one of word_bit_values
+    :param value_type: Type of the words (unsigned, signed, floating, bfloat16)
+    :param endianness: Byte order of the words in the file (big, little)
+    :param pad: Whether to pad the hex and binary strings to a power of 2
+    :param show_prefix: Whether to show the '0x' and '0b' prefixes
+    :param offset: Number of bytes to skip at the start of the file
+    :param line_length: Number of numbers per line, separated by spaces
+    :return: Tuple of (hex text, decimal text, binary text, bytes after the last whole word)
+    """
+    parts = ([], [], [])
+    size = chunk_words - chunk_words % line_length or line_length
+    for _, _, batch in iter_raw(path, word_bits, value_type, endianness, offset, size):
+        for part, text in zip(parts, render_words(batch, pad, show_prefix, line_length)):
+            part.append(text)
+    return (*('\n'.join(part) for part in parts), trailing_bytes(path, word_bits, offset))
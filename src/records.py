@@ -0,0 +1,229 @@
+"""
+Decoding of packed records, such as the structs of a protocol capture or a memory image, given a schema in the
+notation of the struct module ('<HhIf') or as a NumPy structured dtype. Records are mapped onto a structured array
+in one pass, and each field is converted for all records at once.
+"""
+
+import os
+import re
+import struct
+
+import numpy as np
+
+from batch_format import BatchFormat
+from stage_timer import count_tokens, stage
+from tokenizer import delimiters, select_format, span_strings, text_codes, tokenize_codes
+
+# NumPy kind of each struct format character holding a number, padding ('x') has no field
+struct_kinds = {
+    'b': 'i', 'B': 'u', 'h': 'i', 'H': 'u', 'i': 'i', 'I': 'u', 'l': 'i', 'L': 'u', 'q': 'i', 'Q': 'u',
+    'n': 'i', 'N': 'u', 'e': 'f', 'f': 'f', 'd': 'f', '?': 'u', 'c': 'u',
+}
+
+# Byte order characters of the struct module, mapped to NumPy byte orders
+_BYTE_ORDERS = {'@': '=', '=': '=', '<': '<', '>': '>', '!': '>'}
+
+# One repeat count and format character of a struct format
+_STRUCT_ITEM = re.compile(r'\s*(\d*)([xcbB?hHiIlLqQnNefdspP])\s*')
+
+# Value type each NumPy kind of field is converted as
+_VALUE_TYPES = {'u': "unsigned", 'b': "unsigned", 'i': "signed", 'f': "floating"}
+
+
+def record_dtype(schema):
+    """
+    Get the structured dtype of a record schema
+    :param schema: struct format string such as '<HhIf', or anything np.dtype accepts such as
+        [('id', '<u2'), ('value', '<f4')] or 'u2,i2,f4'. Fields of struct formats are named f0, f1, ...
+    :return: Structured np.dtype, with at least one field
+    """
+    if isinstance(schema, str) and _is_struct_format(schema):
+        dtype = _struct_dtype(schema)
+    else:
+        try:
+            dtype = np.dtype(schema)
+        except (TypeError, ValueError) as error:
+            raise ValueError(f"Invalid record schema: {error}") from None
+        if dtype.names is None:
+            dtype = np.dtype([('f0', dtype)])
+
+    for name in dtype.names:
+        field = dtype.fields[name][0]
+        if field.kind not in _VALUE_TYPES or field.shape:
+            raise ValueError(f"Field {name} must be an integer or floating point number, not {field}")
+        if field.kind == 'f' and field.itemsize not in (2, 4, 8):
+            raise ValueError(f"Field {name} must be a floating point number of 16, 32 or 64 bits")
+    return dtype
+
+
+def _is_struct_format(schema):
+    # Strings the struct module accepts are read as struct formats, others such as 'u2,i2' by NumPy
+    try:
+        struct.calcsize(schema)
+    except struct.error:
+        return False
+    return True
+
+
+def _struct_dtype(schema):
+    """
+    Convert a struct format to a structured dtype with the same field offsets and record size, including the
+    padding the native byte order ('@' or none) adds to align fields
+    """
+    schema = schema.strip()
+    prefix = schema[0] if schema[:1] in _BYTE_ORDERS else '@'
+    byte_order = _BYTE_ORDERS[prefix]
+    itemsize = struct.calcsize(schema)
+
+    names, formats, offsets = [], [], []
+    items = ""
+    for count, char in _STRUCT_ITEM.findall(schema.lstrip('@=<>!')):
+        if char in 'spP':
+            raise ValueError(f"Record fields of type '{char}' are not numbers")
+        for _ in range(int(count or 1)) if char != 'x' else ():
+            size = struct.calcsize(prefix + char)
+            offsets.append(struct.calcsize(prefix + items + char) - size)
+            names.append(f"f{len(names)}")
+            formats.append(f"{byte_order}{struct_kinds[char]}{size}")
+            items += char
+        if char == 'x':
+            items += count + char
+    if not names:
+        raise ValueError("Record schema has no fields")
+    return np.dtype({'names': names, 'formats': formats, 'offsets': offsets, 'itemsize': itemsize})
+
+
+def decode_records(text_string, schema, number_format='hex'):
+    """
+    Decode the records of a hex or binary dump. The digits of all numbers in the text are read as one contiguous
+    stream of bytes, so records may span numbers and lines. Every number must hold whole bytes, 2 hex or 8 binary
+    digits each.
+    :param text_string: Text holding the dump, numbers may have prefixes and be separated by any delimiters
+    :param schema: Record schema, see record_dtype
+    :param number_format: Format of the numbers (hex, bin)
+    :return: Tuple of (structured array with one element per record, errors), errors is a list of
+        (position, token, ValueError) for tokens that are not numbers of the format or not whole bytes, and for
+        bytes after the last whole record. Such tokens are left out of the stream of bytes
+    """
+    if number_format not in ("hex", "bin"):
+        raise ValueError("Records can only be decoded from 'hex' or 'bin' numbers")
+    dtype = record_dtype(schema)
+    codes = text_codes(text_string)
+    digits_per_byte = 2 if number_format == "hex" else 8
+
+    with stage("tokenize"):
+        starts, digit_starts, ends = select_format(*tokenize_codes(codes), number_format)
+        token_starts, token_ends = _token_spans(codes)
+
+    with stage("parse"):
+        # Every token must be a number of the format holding whole bytes, or the following bytes would shift
+        lengths = ends - digit_starts
+        whole = lengths % digits_per_byte == 0
+        invalid = ~np.isin(token_starts, starts)
+        name = "hex" if number_format == "hex" else "binary"
+        failed = [(int(start), f"Not a {name} number") for start in token_starts[invalid]]
+        failed += [(int(start), f"Not a whole number of bytes, a byte is {digits_per_byte} {name} digits")
+                   for start in starts[~whole]]
+        starts, digit_starts, ends, lengths = starts[whole], digit_starts[whole], ends[whole], lengths[whole]
+
+        # Positions of every digit of every number, in order
+        firsts = np.cumsum(lengths) - lengths
+        positions = np.repeat(digit_starts - firsts, lengths) + np.arange(int(lengths.sum()), dtype=np.int64)
+        digits = codes[positions].astype(np.uint8)
+
+        if number_format == "hex":
+            digits = np.where(digits <= ord('9'), digits - ord('0'), (digits | 0x20) - (ord('a') - 10))
+            data = (digits[0::2] << 4) | digits[1::2]
+        else:
+            data = np.packbits(digits - ord('0'))
+        count = len(data) // dtype.itemsize
+        records = np.frombuffer(data.astype(np.uint8).tobytes(), dtype=dtype, count=count)
+
+        # Bytes after the last whole record are reported at the number holding the first of them
+        trailing = len(data) - count * dtype.itemsize
+        if trailing:
+            index = np.searchsorted(np.cumsum(lengths // digits_per_byte), count * dtype.itemsize, 'right')
+            failed.append((int(starts[index]), f"Last record is incomplete, {trailing} of {dtype.itemsize} bytes"))
+
+    failed.sort(key=lambda error: error[0])
+    positions = np.array([position for position, _ in failed], dtype=np.int64)
+    tokens = span_strings(codes, positions, token_ends[np.searchsorted(token_starts, positions)])
+    errors = [(position, token, ValueError(message)) for (position, message), token in zip(failed, tokens)]
+    count_tokens(len(records) * len(dtype.names))
+    return records, errors
+
+
+def _token_spans(codes):
+    """
+    Locate every run of characters that are not delimiters, whether or not it is a number
+    :return: Tuple of (starts, ends) arrays
+    """
+    is_delimiter = np.isin(codes, [ord(char) for char in delimiters])
+    edges = np.diff(np.concatenate(([True], is_delimiter, [True])).view(np.int8))
+    return np.flatnonzero(edges == -1), np.flatnonzero(edges == 1)
+
+
+def map_records(path, schema, offset=0):
+    """
+    Memory map the records of a raw binary file. Bytes after the last whole record are left out.
+    :param path: Path of the file
+    :param schema: Record schema, see record_dtype
+    :param offset: Number of bytes to skip at the start of the file
+    :return: Read-only structured array with one element per record, backed by the file
+    """
+    dtype = record_dtype(schema)
+    count = max(os.path.getsize(path) - offset, 0) // dtype.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(count,))
+
+
+def field_batches(records):
+    """
+    Convert each field of the records, for all records at once, with the type and byte order of the field
+    :param records: Structured array of records, see decode_records
+    :return: Dictionary of field name to BatchFormat holding the field of every record
+    """
+    batches = {}
+    for name in records.dtype.names:
+        field = records.dtype.fields[name][0]
+        byte_order = field.byteorder if field.byteorder in '<>' else '='
+        if byte_order == '=':
+            byte_order = '<' if np.little_endian else '>'
+        batch = BatchFormat(_VALUE_TYPES[field.kind], 'little' if byte_order == '<' else 'big')
+        # The bits of the field as unsigned words of its width
+        words = np.ascontiguousarray(records[name]).view(f"{byte_order}u{field.itemsize}")
+        batch.from_words(words.astype(f"=u{field.itemsize}"))
+        batches[name] = batch
+    return batches
+
+
+def render_records(records, pad=False, show_prefix=False):
+    """
+    Convert records to lines of hexadecimal, decimal and binary text, one record per line with its fields
+    separated by spaces
+    :param records: Structured array of records, see decode_records
+    :param pad: Whether to pad the hex and binary strings to a power of 2
+    :param show_prefix: Whether to show the '0x' and '0b' prefixes
+    :return: Tuple of (hex text, decimal text, binary text), without a trailing newline
+    """
+    with stage("render"):
+        columns = [batch.to_strings(pad=pad, show_prefix=show_prefix) for batch in field_batches(records).values()]
+
+    with stage("join"):
+        return tuple('\n'.join(map(' '.join, zip(*(column[index] for column in columns)))) for index in range(3))
+
+
+def convert_records(text_string, schema, number_format='hex', pad=False, show_prefix=False):
+    """
+    Decode the records of a hex or binary dump and convert each field by its type
+    :param text_string: Text holding the dump, see decode_records
+    :param schema: Record schema, see record_dtype
+    :param number_format: Format of the numbers (hex, bin)
+    :param pad: Whether to pad the hex and binary strings to a power of 2
+    :param show_prefix: Whether to show the '0x' and '0b' prefixes
+    :return: Tuple of ((hex text, decimal text, binary text), errors), one record per line, see decode_records
+        for the errors
+    """
+    records, errors = decode_records(text_string, schema, number_format)
+    return render_records(records, pad, show_prefix), errors
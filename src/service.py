@@ -0,0 +1,322 @@
+"""
+Local conversion service keeping the converter loaded for tools that would otherwise start a new interpreter for
+every conversion, and a client for it. Requests and responses are single lines of JSON over a Unix socket or a
+localhost TCP port:
+
+    {"id": 1, "text": "ff 10", "src": "hex", "dst": "dec", "type": "unsigned", "endian": "big",
+     "pad": false, "prefix": false}
+    {"id": 1, "text": "255 16", "errors": []}
+
+Only "text", "src" and "dst" are required. Responses on a connection come back in the order of its requests, each
+as soon as it is converted. Requests waiting while a conversion runs are converted together in one pass.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from core import Converted, TokenError, batch_size, convert
+from token_cache import TokenCache
+
+# Default TCP port, on 127.0.0.1 only
+default_port = 8737
+
+# Longest request line accepted, in bytes
+max_request = 64 << 20
+
+
+class ConversionService:
+    """
+    Class to convert requests from any number of connections, batching the requests that arrive while a
+    conversion runs. Conversions run one batch at a time on a worker thread, so the event loop keeps reading
+    requests and writing responses.
+    """
+    def __init__(self, cache_size=0):
+        """
+        Initialize the service, call start() from the event loop before converting
+        :param cache_size: Number of tokens kept in a token cache shared by all requests, 0 for none. Only worth
+            it for requests repeating the same few values
+        """
+        self.cache = TokenCache(cache_size) if cache_size > 0 else None
+        self.queue = None
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self._batcher = None
+        # Number of batches converted and requests in them
+        self.batches = 0
+        self.requests = 0
+
+    def start(self):
+        """
+        Start converting queued requests
+        """
+        self.queue = asyncio.Queue()
+        self._batcher = asyncio.get_running_loop().create_task(self._convert_batches())
+
+    async def stop(self):
+        """
+        Stop converting, requests still queued are not answered
+        """
+        self._batcher.cancel()
+        try:
+            await self._batcher
+        except asyncio.CancelledError:
+            pass
+        self.executor.shutdown(wait=True)
+
+    def submit(self, request):
+        """
+        Queue a request for the next batch
+        :param request: Request dictionary, see the module docstring
+        :return: Future of the response dictionary
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((request, future))
+        return future
+
+    async def handle_connection(self, reader, writer):
+        """
+        Answer the requests of one connection in order, until it is closed
+        """
+        responses = asyncio.Queue()
+        sender = asyncio.get_running_loop().create_task(self._send_responses(responses, writer))
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    # Request longer than max_request, or the client went away
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("Request must be a JSON object")
+                except ValueError as error:
+                    future = asyncio.get_running_loop().create_future()
+                    future.set_result({"id": None, "error": f"Invalid request: {error}"})
+                    responses.put_nowait(future)
+                    continue
+                responses.put_nowait(self.submit(request))
+        finally:
+            responses.put_nowait(None)
+            await sender
+
+    async def _send_responses(self, responses, writer):
+        try:
+            while True:
+                future = await responses.get()
+                if future is None:
+                    break
+                writer.write(json.dumps(await future).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _convert_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            length = len(str(batch[0][0].get("text", "")))
+            while length < batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                length += len(str(batch[-1][0].get("text", "")))
+
+            try:
+                responses = await loop.run_in_executor(self.executor, self.convert_batch,
+                                                       [request for request, _ in batch])
+            except Exception as error:
+                # Keep serving other requests whatever went wrong with this batch
+                responses = [{"id": request.get("id"), "error": f"Conversion failed: {error}"}
+                             for request, _ in batch]
+            for (_, future), response in zip(batch, responses):
+                if not future.cancelled():
+                    future.set_result(response)
+
+    def convert_batch(self, requests):
+        """
+        Convert requests, those with the same options in one pass
+        :param requests: List of request dictionaries
+        :return: List of response dictionaries, in the order of the requests
+        """
+        self.batches += 1
+        self.requests += len(requests)
+        responses = [None] * len(requests)
+
+        # Group the requests by their options
+        groups = {}
+        for index, request in enumerate(requests):
+            try:
+                text_string = request["text"]
+                options = (str(request["src"]), str(request["dst"]), str(request.get("type", "unsigned")),
+                           str(request.get("endian", "big")), bool(request.get("pad", False)),
+                           bool(request.get("prefix", False)))
+                if not isinstance(text_string, str):
+                    raise ValueError("Text must be a string")
+            except KeyError as error:
+                responses[index] = {"id": request.get("id"), "error": f"Missing field {error}"}
+                continue
+            except ValueError as error:
+                responses[index] = {"id": request.get("id"), "error": str(error)}
+                continue
+            groups.setdefault(options, []).append(index)
+
+        for options, indexes in groups.items():
+            try:
+                results = list(convert([requests[index]["text"] for index in indexes], *options, cache=self.cache))
+            except ValueError:
+                # A request that cannot be converted fails its group, so each is converted alone for the others
+                results = [self._convert_one(requests[index]["text"], options) for index in indexes]
+            for index, result in zip(indexes, results):
+                if isinstance(result, ValueError):
+                    responses[index] = {"id": requests[index].get("id"), "error": str(result)}
+                else:
+                    responses[index] = {"id": requests[index].get("id"), "text": result.text,
+                                        "errors": [list(error) for error in result.errors]}
+        return responses
+
+    def _convert_one(self, text_string, options):
+        """
+        Convert the text of one request
+        :param text_string: Text to convert
+        :param options: Tuple of (src, dst, type, endian, pad, prefix)
+        :return: Converted result, or the ValueError raised converting it
+        """
+        try:
+            return convert(text_string, *options, cache=self.cache)
+        except ValueError as error:
+            return error
+
+
+async def serve(path=None, port=default_port, cache_size=0, ready=None):
+    """
+    Run the service until cancelled
+    :param path: Path of the Unix socket to listen on, None to listen on a localhost TCP port
+    :param port: TCP port to listen on when no path is given
+    :param cache_size: Number of tokens kept in the token cache, 0 for none
+    :param ready: Function called with the listening server once requests are accepted
+    """
+    service = ConversionService(cache_size)
+    service.start()
+    if path is not None:
+        if os.path.exists(path):
+            os.remove(path)
+        server = await asyncio.start_unix_server(service.handle_connection, path, limit=max_request)
+    else:
+        server = await asyncio.start_server(service.handle_connection, '127.0.0.1', port, limit=max_request)
+
+    try:
+        async with server:
+            if ready is not None:
+                ready(server)
+            await server.serve_forever()
+    finally:
+        await service.stop()
+        if path is not None and os.path.exists(path):
+            os.remove(path)
+
+
+class Client:
+    """
+    Blocking client of the conversion service, for tools and scripts:
+
+        with Client(path="/tmp/hex2dec.sock") as client:
+            client.convert("ff 10", "hex", "dec").text
+    """
+    def __init__(self, path=None, port=default_port, timeout=None):
+        """
+        Connect to the service
+        :param path: Path of the service's Unix socket, None to connect to its localhost TCP port
+        :param port: TCP port of the service when no path is given
+        :param timeout: Seconds to wait for a response, None to wait as long as it takes
+        """
+        if path is not None:
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.connect(path)
+        else:
+            self.socket = socket.create_connection(('127.0.0.1', port))
+        self.socket.settimeout(timeout)
+        self.file = self.socket.makefile('rwb')
+        self.next_id = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Close the connection
+        """
+        self.file.close()
+        self.socket.close()
+
+    def convert(self, text_string, src, dst, value_type="unsigned", endianness="big", pad=False, prefix=False):
+        """
+        Convert the numbers in a text, see core.convert
+        :return: Converted text and errors
+        """
+        return next(self.convert_many([text_string], src, dst, value_type, endianness, pad, prefix))
+
+    def convert_many(self, texts, src, dst, value_type="unsigned", endianness="big", pad=False, prefix=False):
+        """
+        Convert the numbers in several texts, sending all requests before reading the responses so the service
+        can convert them together
+        :return: Iterator of Converted for each text, in order
+        """
+        count = 0
+        for text_string in texts:
+            request = {"id": self.next_id, "text": text_string, "src": src, "dst": dst, "type": value_type,
+                       "endian": endianness, "pad": pad, "prefix": prefix}
+            self.file.write(json.dumps(request).encode() + b'\n')
+            self.next_id += 1
+            count += 1
+        self.file.flush()
+
+        for _ in range(count):
+            line = self.file.readline()
+            if not line:
+                raise ConnectionError("Conversion service closed the connection")
+            response = json.loads(line)
+            if "error" in response:
+                raise ValueError(response["error"])
+            yield Converted(response["text"], [TokenError(*error) for error in response["errors"]])
+
+
+def main(argv=None):
+    """
+    Run the service from the command line until interrupted
+    :param argv: List of arguments, defaults to sys.argv
+    :return: Exit code
+    """
+    parser = argparse.ArgumentParser(prog="hex2dec-service",
+                                     description="Serve conversions as JSON lines on a Unix socket or localhost port.")
+    parser.add_argument("--socket", dest="path", help="Unix socket to listen on, instead of a TCP port")
+    parser.add_argument("--port", type=int, default=default_port,
+                        help=f"Port to listen on at 127.0.0.1 (default: {default_port})")
+    parser.add_argument("--cache", type=int, default=0, metavar="SIZE",
+                        help="Number of recent tokens to keep converted, for requests repeating the same few "
+                             "values (default: 0, off)")
+    args = parser.parse_args(argv)
+
+    def ready(server):
+        print(f"Listening on {args.path or f'127.0.0.1:{args.port}'}", file=sys.stderr)
+
+    try:
+        asyncio.run(serve(args.path, args.port, args.cache, ready))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
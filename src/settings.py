@@ -3,10 +3,31 @@ Class file for loading and saving settings
 """
 
 import os
+import sys
 import json
+import tempfile
+import threading
 from typing import Dict, Any
 
-settings_file = os.path.join(os.getenv('LOCALAPPDATA'), 'Programs', 'Hex2Dec', 'settings.json')
+# Seconds to wait after the last change before writing the settings file
+save_delay = 1.0
+
+
+def settings_path() -> str:
+    """
+    Get the path of the settings file for this platform
+    :return: Path of settings.json, its directory may not exist yet
+    """
+    if sys.platform == 'win32':
+        base = os.getenv('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), 'AppData', 'Local')
+        return os.path.join(base, 'Programs', 'Hex2Dec', 'settings.json')
+    if sys.platform == 'darwin':
+        return os.path.join(os.path.expanduser('~'), 'Library', 'Application Support', 'Hex2Dec', 'settings.json')
+    base = os.getenv('XDG_CONFIG_HOME') or os.path.join(os.path.expanduser('~'), '.config')
+    return os.path.join(base, 'hex2dec', 'settings.json')
+
+
+settings_file = settings_path()
 
 factory_settings = {
     "showQuickOptions": True,
@@ -14,23 +35,80 @@ factory_settings = {
         "pad": False,
         "prefix": False,
         "endianness": "big",
-        "defaultType": "unsigned"
+        "defaultType": "unsigned",
+        "autoDetect": False
     },
     "screenSize": {
         "width": 800,
         "height": 600
+    },
+    "timings": {
+        "show": False,
+        "file": ""
+    },
+    "tokenCache": {
+        "size": 0
     }
 }
 
+
+def _get(json_settings: Dict[str, Any], keys: list[str]) -> Any:
+    # Look up a setting by a list of keys representing the hierarchy
+    setting = json_settings
+    for key in keys:
+        if isinstance(setting, str):
+            break
+        setting = setting.get(key, None)
+        if setting is None:
+            return None
+
+    # Try to convert numeric strings to integers
+    if isinstance(setting, str) and setting.isdigit():
+        return int(setting)
+
+    return setting
+
+
+class SettingsSnapshot:
+    """
+    Read-only copy of the settings at one moment. Settings never changes a dictionary in place, so a snapshot
+    shares all of them with the settings instead of copying.
+    """
+    __slots__ = ('_json_settings',)
+
+    def __init__(self, json_settings: Dict[str, Any]):
+        self._json_settings = json_settings
+
+    def get_setting(self, keys: list[str]) -> Any:
+        """
+        Get a setting by a list of keys representing the hierarchy
+        """
+        return _get(self._json_settings, keys)
+
+    def to_json(self) -> str:
+        """
+        Get the settings as the JSON written to the settings file
+        """
+        return json.dumps(self._json_settings, indent=4)
+
+
 class Settings:
     """
-    Class for loading and saving settings
+    Class for loading and saving settings. Settings are kept in memory, saving writes them to the settings file
+    on a background thread once they have not changed for save_delay seconds.
     """
 
-    def __init__(self):
-        self.settings_file = settings_file
-        os.makedirs(os.path.dirname(self.settings_file), exist_ok=True)
+    def __init__(self, path: str = None):
+        """
+        Load the settings
+        :param path: Path of the settings file, defaults to settings_file
+        """
+        self.settings_file = path or settings_file
         self.json_settings = {}
+        self.save_error = None
+        self._lock = threading.Lock()
+        self._save_timer = None
+        self._unsaved = False
         self.load_settings()
 
     def load_settings(self):
@@ -48,34 +126,77 @@ class Settings:
 
     def save_settings(self):
         """
-        Save settings to a JSON file
+        Save settings to a JSON file, after save_delay seconds without another save
         """
-        with open(self.settings_file, 'w') as f:
-            json.dump(self.json_settings, f, indent=4)
+        with self._lock:
+            self._unsaved = True
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+            self._save_timer = threading.Timer(save_delay, self._write)
+            self._save_timer.start()
 
-    def get_setting(self, keys: list[str]) -> Any:
+    def flush(self):
         """
-        Get a setting by a list of keys representing the hierarchy
+        Write settings that are waiting to be saved now
         """
-        setting = self.json_settings
-        for key in keys:
-            if isinstance(setting, str):
-                break
-            setting = setting.get(key, None)
-            if setting is None:
-                return None
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+        self._write(raise_errors=True)
 
-        # Try to convert numeric strings to integers
-        if isinstance(setting, str) and setting.isdigit():
-            return int(setting)
+    def snapshot(self) -> SettingsSnapshot:
+        """
+        Get a read-only copy of the current settings, without copying them
+        """
+        return SettingsSnapshot(self.json_settings)
 
-        return setting
+    def get_setting(self, keys: list[str]) -> Any:
+        """
+        Get a setting by a list of keys representing the hierarchy
+        """
+        return _get(self.json_settings, keys)
 
     def set_setting(self, keys: list[str], value: Any):
         """
         Set a setting by a list of keys representing the hierarchy
         """
-        setting = self.json_settings
+        # Copy the dictionaries along the path, so snapshots keep the values they were taken with
+        json_settings = dict(self.json_settings)
+        setting = json_settings
         for key in keys[:-1]:
-            setting = setting.setdefault(key, {})
-        setting[keys[-1]] = value
\ No newline at end of file
+            child = setting.get(key)
+            setting[key] = dict(child) if isinstance(child, dict) else {}
+            setting = setting[key]
+        setting[keys[-1]] = value
+        self.json_settings = json_settings
+
+    def _write(self, raise_errors=False):
+        # Write the settings to a temporary file first, so the settings file is never left half written
+        with self._lock:
+            if not self._unsaved:
+                return
+            self._unsaved = False
+            text = self.snapshot().to_json()
+
+            directory = os.path.dirname(self.settings_file)
+            temp_path = None
+            try:
+                os.makedirs(directory, exist_ok=True)
+                with tempfile.NamedTemporaryFile('w', dir=directory, prefix='.settings-', suffix='.tmp',
+                                                 delete=False) as f:
+                    temp_path = f.name
+                    f.write(text)
+                # Temporary files are only readable by their owner, keep the permissions of the settings file
+                mode = os.stat(self.settings_file).st_mode & 0o777 if os.path.exists(self.settings_file) else 0o644
+                os.chmod(temp_path, mode)
+                os.replace(temp_path, self.settings_file)
+                self.save_error = None
+            except OSError as error:
+                # Saved again with the next change or flush
+                self._unsaved = True
+                self.save_error = error
+                if temp_path is not None and os.path.exists(temp_path):
+                    os.remove(temp_path)
+                if raise_errors:
+                    raise
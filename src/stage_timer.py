@@ -0,0 +1,144 @@
+"""
+Timers for the stages of a conversion (tokenize, parse, render, join, display), off unless a StageTimer is
+active on the thread doing the work
+"""
+
+import json
+import threading
+import time
+
+# Timer active on each thread, see StageTimer.__enter__
+_local = threading.local()
+
+
+class StageTimer:
+    """
+    Class to add up the time spent in each stage of one conversion, and count the numbers converted.
+    Stages are timed with stage() while the timer is active on the current thread:
+
+        with StageTimer() as timer:
+            number_list.parse_numbers(text, "hex", "unsigned")
+        timer.stop()
+
+    The timer may be entered on another thread once it is no longer active on the first one.
+    """
+    __slots__ = ('stages', 'tokens', 'start', 'total', '_previous')
+
+    def __init__(self):
+        """
+        Initialize the timer, the total time is measured from here until stop()
+        """
+        # Seconds spent in each stage, in the order the stages were first entered
+        self.stages = {}
+        self.tokens = 0
+        self.start = time.perf_counter()
+        self.total = None
+        self._previous = None
+
+    def __enter__(self):
+        self._previous = getattr(_local, 'timer', None)
+        _local.timer = self
+        return self
+
+    def __exit__(self, *exc_info):
+        _local.timer = self._previous
+        self._previous = None
+
+    def add(self, stage_name, seconds):
+        """
+        Add time to a stage
+        :param stage_name: Name of the stage
+        :param seconds: Time spent in the stage
+        """
+        self.stages[stage_name] = self.stages.get(stage_name, 0.0) + seconds
+
+    def stop(self):
+        """
+        Stop measuring the total time
+        :return: Total time in seconds
+        """
+        self.total = time.perf_counter() - self.start
+        return self.total
+
+    def summary(self):
+        """
+        Get a one line breakdown of the time spent, for a status bar or standard error
+        :return: Summary string
+        """
+        total = self.total if self.total is not None else time.perf_counter() - self.start
+        stages = ', '.join(f"{stage_name} {seconds * 1e3:.1f} ms" for stage_name, seconds in self.stages.items())
+        return f"{self.tokens:,} numbers in {total * 1e3:.1f} ms" + (f": {stages}" if stages else "")
+
+    def to_json(self, **fields):
+        """
+        Get the timings as one line of JSON
+        :param fields: Extra fields to include, such as the source format
+        :return: JSON string without a trailing newline
+        """
+        record = dict(fields)
+        record.update(tokens=self.tokens, total=self.total, stages=self.stages)
+        return json.dumps(record)
+
+    def write_json_line(self, path, **fields):
+        """
+        Append the timings to a JSON lines file
+        :param path: Path of the file
+        :param fields: Extra fields to include, such as the source format
+        """
+        with open(path, 'a') as f:
+            f.write(self.to_json(**fields) + '\n')
+
+
+class _Stage:
+    """
+    Context manager adding the time spent inside it to a stage of a timer
+    """
+    __slots__ = ('timer', 'stage_name', 'start')
+
+    def __init__(self, timer, stage_name):
+        self.timer = timer
+        self.stage_name = stage_name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.timer.add(self.stage_name, time.perf_counter() - self.start)
+
+
+class _NoStage:
+    """
+    Context manager doing nothing, used when no timer is active
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_no_stage = _NoStage()
+
+
+def stage(stage_name):
+    """
+    Time a stage of the conversion running on this thread, if a timer is active
+    :param stage_name: Name of the stage
+    :return: Context manager timing the code inside it
+    """
+    timer = getattr(_local, 'timer', None)
+    if timer is None:
+        return _no_stage
+    return _Stage(timer, stage_name)
+
+
+def count_tokens(count):
+    """
+    Count numbers found by the conversion running on this thread, if a timer is active
+    :param count: Number of numbers
+    """
+    timer = getattr(_local, 'timer', None)
+    if timer is not None:
+        timer.tokens += count
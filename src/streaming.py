@@ -0,0 +1,451 @@
+"""
+Functions to convert text streams and files too large to hold in memory at once
+"""
+
+import codecs
+import mmap
+import os
+import traceback
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+
+from number_list import NumberList, parse_codes
+from stage_timer import stage
+from tokenizer import delimiters, span_strings
+
+# Number of characters read from the stream at a time
+chunk_size = 1 << 20
+
+# Delimiters as single bytes, for searching memory mapped files
+_delimiter_bytes = [delimiter.encode('ascii') for delimiter in delimiters]
+
+# Encodings whose ASCII characters are single bytes that are never part of another character
+_ascii_compatible = {'ascii', 'utf-8'}
+
+# Tokens longer than this are passed through unconverted, so memory stays bounded
+max_token_length = 1 << 16
+
+
+def is_ascii_compatible(encoding):
+    """
+    Check whether text in an encoding can be converted byte by byte, as convert_file does
+    :param encoding: Name of the text encoding
+    :return: True if ASCII characters are single bytes that never occur inside other characters
+    """
+    try:
+        name = codecs.lookup(encoding).name
+    except LookupError:
+        return False
+    if name in _ascii_compatible:
+        return True
+
+    # Otherwise only single byte encodings that keep ASCII as is, such as latin-1 and the Windows code pages
+    ascii_bytes = bytes(range(128))
+    try:
+        if ascii_bytes.decode('ascii').encode(name) != ascii_bytes:
+            return False
+        return len(bytes(range(256)).decode(name, errors='replace')) == 256
+    except (LookupError, UnicodeError):
+        # Codecs that are not text encodings, such as hex_codec
+        return False
+
+
+def iter_chunks(stream, size=chunk_size):
+    """
+    Read a text stream in chunks that end on a delimiter, so no number is split between chunks.
+    :param stream: Text stream to read
+    :param size: Number of characters to read at a time
+    :return: Iterator of (offset, text, convert) tuples, convert is False for oversized tokens passed through as is
+    """
+    offset = 0
+    carry = ""
+    skipping = False
+
+    while True:
+        block = stream.read(size)
+        if not block:
+            break
+
+        # Pass through the rest of an oversized token
+        if skipping:
+            cut = min((index for index in map(block.find, delimiters) if index >= 0), default=-1)
+            if cut < 0:
+                yield offset, block, False
+                offset += len(block)
+                continue
+            yield offset, block[:cut], False
+            offset += cut
+            block = block[cut:]
+            skipping = False
+
+        text = carry + block
+        cut = max(map(text.rfind, delimiters)) + 1
+        if cut:
+            for start, end, convert in _split_long_tokens(text, 0, cut):
+                yield offset + start, text[start:end], convert
+            offset += cut
+            carry = text[cut:]
+        else:
+            carry = text
+
+        # No delimiter in sight, the token is too long to be converted
+        if len(carry) > max_token_length:
+            yield offset, carry, False
+            offset += len(carry)
+            carry = ""
+            skipping = True
+
+    if carry:
+        yield offset, carry, True
+
+
+def iter_windows(buffer, size=chunk_size):
+    """
+    Split a bytes-like buffer into windows that end on a delimiter, so no number is split between windows.
+    :param buffer: Bytes-like object supporting find and rfind, such as a memory map
+    :param size: Target number of bytes per window
+    :return: Iterator of (start, end, convert) tuples, convert is False for oversized tokens passed through as is
+    """
+    length = len(buffer)
+    start = 0
+
+    while start < length:
+        end = min(start + size, length)
+        if end < length:
+            end = max(buffer.rfind(delimiter, start, end) for delimiter in _delimiter_bytes) + 1
+
+            # No delimiter in the window, the token continues up to the next delimiter
+            if end <= start:
+                end = min((index for index in (buffer.find(delimiter, start) for delimiter in _delimiter_bytes)
+                           if index >= 0), default=length)
+                if end - start > max_token_length:
+                    yield start, end, False
+                    start = end
+                    continue
+
+        yield from _split_long_tokens(buffer, start, end)
+        start = end
+
+
+def _split_long_tokens(text, start, end):
+    """
+    Split a span that starts and ends on token boundaries around the tokens longer than max_token_length
+    :param text: String, or bytes-like buffer such as a memory map
+    :param start: Start of the span
+    :param end: End of the span
+    :return: Iterator of (start, end, convert) tuples, convert is False for the oversized tokens
+    """
+    chars = delimiters if isinstance(text, str) else _delimiter_bytes
+
+    # A longer token covers a whole block of this size, and a block holding a delimiter is found at its first one
+    block = max_token_length // 2 + 1
+    position = start
+    while position + block <= end:
+        if any(text.find(char, position, position + block) >= 0 for char in chars):
+            position += block
+            continue
+
+        token_start = max(max(text.rfind(char, start, position) for char in chars) + 1, start)
+        token_end = min((index for index in (text.find(char, position + block, end) for char in chars)
+                         if index >= 0), default=end)
+        if token_end - token_start > max_token_length:
+            if token_start > start:
+                yield start, token_start, True
+            yield token_start, token_end, False
+            start = token_end
+        position = max(token_end, position + block)
+
+    if end > start:
+        yield start, end, True
+
+
+def render(number_list, number_format, pad=False, show_prefix=False):
+    """
+    Replace all numbers in the input string of a NumberList with one format.
+    :param number_list: NumberList holding parsed numbers
+    :param number_format: Format to convert to (hex, dec, bin)
+    :param pad: Whether to pad the hex and binary strings to a power of 2
+    :param show_prefix: Whether to show the '0x' and '0b' prefixes
+    :return: Converted string
+    """
+    if number_format == "hex":
+        return number_list.to_hex_string(pad=pad, show_0x=show_prefix)
+    elif number_format == "dec":
+        return number_list.to_dec_string()
+    elif number_format == "bin":
+        return number_list.to_bin_string(pad=pad, show_0b=show_prefix)
+    raise ValueError("Invalid number format")
+
+
+def render_strings(batch, number_format, pad=False, show_prefix=False):
+    """
+    Convert all numbers of a BatchFormat to one format.
+    :param batch: BatchFormat holding parsed numbers
+    :param number_format: Format to convert to (hex, dec, bin)
+    :param pad: Whether to pad the hex and binary strings to a power of 2
+    :param show_prefix: Whether to show the '0x' and '0b' prefixes
+    :return: List of converted strings
+    """
+    if number_format == "hex":
+        return batch.to_hex_strings(pad=pad, show_0x=show_prefix)
+    elif number_format == "dec":
+        return batch.to_dec_strings()
+    elif number_format == "bin":
+        return batch.to_bin_strings(pad=pad, show_0b=show_prefix)
+    raise ValueError("Invalid number format")
+
+
+def convert_text(text, from_format, to_format, value_type, endianness='big', pad=False, show_prefix=False,
+                 cache=None):
+    """
+    Convert all numbers of a piece of text.
+    :param text: Text to convert
+    :param from_format: Format of the input numbers (hex, dec, bin), or auto to detect each number's format
+    :param to_format: Format to convert to (hex, dec, bin)
+    :param value_type: Type of the numbers (unsigned, signed, floating)
+    :param endianness: Endianness of the numbers (big, little)
+    :param pad: Whether to pad the hex and binary strings to a power of 2
+    :param show_prefix: Whether to show the '0x' and '0b' prefixes
+    :param cache: TokenCache used to convert repeated tokens once, None to convert every number
+    :return: Tuple of (converted text, list of (position, token, ValueError) for numbers that could not be parsed)
+    """
+    number_list = NumberList(cache)
+    number_list.parse_numbers(text, from_format, value_type, endianness)
+    return render(number_list, to_format, pad, show_prefix), number_list.errors
+
+
+def convert_stream(source, destination, from_format, to_format, value_type, endianness='big',
+                   pad=False, show_prefix=False, on_error=None, workers=1, cache=None, encoding='utf-8'):
+    """
+    Convert all numbers of a text stream, writing the converted text as it goes.
+    :param source: Text stream to read
+    :param destination: Text stream to write
+    :param from_format: Format of the input numbers (hex, dec, bin), or auto to detect each number's format
+    :param to_format: Format to convert to (hex, dec, bin)
+    :param value_type: Type of the numbers (unsigned, signed, floating)
+    :param endianness: Endianness of the numbers (big, little)
+    :param pad: Whether to pad the hex and binary strings to a power of 2
+    :param show_prefix: Whether to show the '0x' and '0b' prefixes
+    :param on_error: Function called with (offset, token, error) for each number that could not be parsed
+    :param workers: Number of processes converting chunks in parallel
+    :param cache: TokenCache used to convert repeated tokens once, only used when converting in one process
+    :return: Number of numbers that could not be parsed
+    """
+    options = (from_format, to_format, value_type, endianness, pad, show_prefix)
+
+    if workers <= 1 and cache is not None:
+        results = ((offset, *convert_text(text, *options, cache=cache)) if convert else (offset, text, [])
+                   for offset, text, convert in iter_chunks(source))
+        return _write_results(results, destination, on_error)
+
+    jobs = ((offset, text, convert, options) for offset, text, convert in iter_chunks(source))
+    return _write_results(_run_ordered(_convert_text_job, jobs, workers), destination, on_error)
+
+
+def convert_file(source_path, destination_path, from_format, to_format, value_type, endianness='big',
+                 pad=False, show_prefix=False, on_error=None, workers=1, cache=None, encoding='utf-8'):
+    """
+    Convert all numbers of a file into another file. The source is memory mapped and tokenized in place,
+    only one window of it is processed at a time and output is written as each window is converted.
+    The text must use an ASCII compatible encoding such as UTF-8 (see is_ascii_compatible), error offsets are in
+    characters as for convert_stream.
+    :param source_path: Path of the file to read
+    :param destination_path: Path of the file to write
+    :param from_format: Format of the input numbers (hex, dec, bin), or auto to detect each number's format
+    :param to_format: Format to convert to (hex, dec, bin)
+    :param value_type: Type of the numbers (unsigned, signed, floating)
+    :param endianness: Endianness of the numbers (big, little)
+    :param pad: Whether to pad the hex and binary strings to a power of 2
+    :param show_prefix: Whether to show the '0x' and '0b' prefixes
+    :param on_error: Function called with (offset, token, error) for each number that could not be parsed
+    :param workers: Number of processes converting windows in parallel, each maps the source itself
+    :param cache: TokenCache used to convert repeated tokens once, only used when converting in one process
+    :param encoding: Text encoding of the file
+    :return: Number of numbers that could not be parsed
+    """
+    if not is_ascii_compatible(encoding):
+        raise ValueError(f"Encoding {encoding} is not ASCII compatible, convert the file as a text stream")
+    options = (from_format, to_format, value_type, endianness, pad, show_prefix)
+    # Other ASCII compatible encodings have one byte per character
+    multibyte = codecs.lookup(encoding).name == 'utf-8'
+
+    with open(source_path, 'rb') as source, open(destination_path, 'wb') as destination:
+        if os.fstat(source.fileno()).st_size == 0:
+            return 0
+
+        if workers > 1:
+            with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                windows = list(iter_windows(mapped))
+            jobs = ((source_path, start, end, convert, options, multibyte) for start, end, convert in windows)
+            results = _run_ordered(_convert_file_job, jobs, workers)
+            return _write_results(_character_offsets(results), destination, on_error)
+
+        with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as mapped, _mapped_view(mapped) as view:
+            results = (_convert_window(view, start, end, convert, options, multibyte, cache)
+                       for start, end, convert in iter_windows(mapped))
+            return _write_results(_character_offsets(results), destination, on_error)
+
+
+@contextmanager
+def _mapped_view(mapped):
+    """
+    Get a memoryview of a memory map, released on leaving so the map can be closed
+    :param mapped: mmap object
+    :return: Context manager giving the memoryview
+    """
+    view = memoryview(mapped)
+    try:
+        yield view
+    except BaseException as error:
+        # The frames of the error hold the views and arrays of the map that were in use, which would keep
+        # the map from closing and hide the error behind a BufferError
+        traceback.clear_frames(error.__traceback__)
+        raise
+    finally:
+        view.release()
+
+
+def _convert_window(view, start, end, convert, options, multibyte=False, cache=None):
+    """
+    Convert one window of a memory mapped file
+    :param view: Memoryview of the whole file
+    :param start: Start of the window
+    :param end: End of the window
+    :param convert: False to pass the window through as is
+    :param options: Tuple of (from_format, to_format, value_type, endianness, pad, show_prefix)
+    :param multibyte: Whether the file is UTF-8, so error positions are counted in characters rather than bytes
+    :param cache: TokenCache used to convert repeated tokens once, None to convert every number
+    :return: Tuple of (converted bytes, errors at character positions in the window, number of characters)
+    """
+    if not convert:
+        characters = end - start
+        if multibyte:
+            characters -= np.count_nonzero(_continuation_bytes(np.frombuffer(view[start:end], dtype=np.uint8)))
+        return bytes(view[start:end]), [], characters
+
+    from_format, to_format, value_type, endianness, pad, show_prefix = options
+    codes = np.frombuffer(view[start:end], dtype=np.uint8)
+    batch, number_starts, number_ends, errors = parse_codes(codes, from_format, value_type, endianness)
+    characters = end - start
+    if multibyte:
+        continuation = _continuation_bytes(codes)
+        characters -= np.count_nonzero(continuation)
+        if errors:
+            # Bytes before each position that continue a character, the error tokens themselves are ASCII
+            continued = np.concatenate(([0], np.cumsum(continuation)))
+            errors = [(position - int(continued[position]), token, error) for position, token, error in errors]
+    with stage("render"):
+        if cache is None:
+            strings = render_strings(batch, to_format, pad, show_prefix)
+        else:
+            strings = cache.to_strings(span_strings(codes, number_starts, number_ends), batch, from_format, pad,
+                                       show_prefix, formats=(to_format,))[0]
+    del codes
+
+    # Interleave the untouched bytes between numbers with the converted numbers
+    with stage("join"):
+        number_starts = (number_starts + start).tolist()
+        number_ends = (number_ends + start).tolist()
+        segments = [None] * (2 * len(number_starts) + 1)
+        segments[0::2] = [view[gap_start:gap_end] for gap_start, gap_end in
+                          zip([start] + number_ends, number_starts + [end])]
+        segments[1::2] = [string.encode('ascii') for string in strings]
+        return b''.join(segments), errors, characters
+
+
+def _continuation_bytes(codes):
+    """
+    Find the bytes of UTF-8 text that continue a character rather than start one
+    :param codes: Numpy array of uint8 byte values
+    :return: Numpy boolean array
+    """
+    return (codes & 0xC0) == 0x80
+
+
+def _character_offsets(results):
+    """
+    Give converted windows the character offset they start at, counting the characters of the windows before
+    :param results: Iterator of (converted bytes, errors, number of characters) in order
+    :return: Iterator of (offset, converted bytes, errors)
+    """
+    offset = 0
+    for converted, errors, characters in results:
+        yield offset, converted, errors
+        offset += characters
+
+
+def _convert_text_job(job):
+    """
+    Convert one chunk of a text stream, run in a worker process when converting in parallel
+    :param job: Tuple of (offset, text, convert, options)
+    :return: Tuple of (offset, converted text, errors)
+    """
+    offset, text, convert, options = job
+    if not convert:
+        return offset, text, []
+    text, errors = convert_text(text, *options)
+    return offset, text, errors
+
+
+def _convert_file_job(job):
+    """
+    Convert one window of a file, mapping the file in the worker process so the input is never copied
+    :param job: Tuple of (path, start, end, convert, options, multibyte)
+    :return: Tuple of (converted bytes, errors, number of characters)
+    """
+    path, start, end, convert, options, multibyte = job
+    with open(path, 'rb') as source, mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as mapped, \
+            _mapped_view(mapped) as view:
+        return _convert_window(view, start, end, convert, options, multibyte)
+
+
+def _run_ordered(function, jobs, workers):
+    """
+    Run jobs, in a process pool when there is more than one worker, keeping results in submission order.
+    At most two jobs per worker are in flight, so memory stays bounded however many jobs there are.
+    :param function: Function to run on each job, must be picklable
+    :param jobs: Iterable of jobs
+    :param workers: Number of worker processes
+    :return: Iterator of results in the order of the jobs
+    """
+    if workers <= 1:
+        yield from map(function, jobs)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        try:
+            for job in jobs:
+                pending.append(executor.submit(function, job))
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # A failed job ends the conversion, the jobs after it are not run
+            for future in pending:
+                future.cancel()
+
+
+def _write_results(results, destination, on_error):
+    """
+    Write converted chunks and report their errors at global offsets
+    :param results: Iterator of (offset, converted chunk, errors) in order
+    :param destination: Stream to write
+    :param on_error: Function called with (offset, token, error) for each number that could not be parsed
+    :return: Number of numbers that could not be parsed
+    """
+    error_count = 0
+
+    for offset, converted, errors in results:
+        for position, token, error in errors:
+            error_count += 1
+            if on_error is not None:
+                on_error(offset + position, token, error)
+        with stage("write"):
+            destination.write(converted)
+
+    return error_count
@@ -0,0 +1,191 @@
+"""
+Bounded least recently used cache of converted tokens, for inputs that repeat the same values
+"""
+
+import threading
+
+import numpy as np
+
+# Default number of tokens kept
+default_size = 4096
+
+number_formats = ("hex", "dec", "bin")
+
+
+class _Entries:
+    """
+    Tokens converted with one set of options to one format, sorted so a whole batch of tokens is looked up with
+    one search
+    """
+    __slots__ = ('tokens', 'strings', 'last_used')
+
+    def __init__(self):
+        self.tokens = np.zeros(0, dtype=np.bytes_)
+        # Converted string of each token
+        self.strings = np.empty(0, dtype=object)
+        # Call in which each token was last used, the oldest are evicted first
+        self.last_used = np.zeros(0, dtype=np.int64)
+
+    def find(self, tokens):
+        """
+        Locate tokens in the entries
+        :param tokens: Array of distinct tokens
+        :return: Tuple of (index of each token in the entries, boolean mask of the tokens found)
+        """
+        indices = np.searchsorted(self.tokens, tokens)
+        found = indices < len(self.tokens)
+        found[found] = self.tokens[indices[found]] == tokens[found]
+        return indices, found
+
+
+class TokenCache:
+    """
+    Least recently used cache mapping a token and the conversion options to its hex, dec and bin strings.
+    Tokens are kept per (source format, value type, endianness, pad, prefix, target format), so a token only
+    converted to one format is only rendered in that format. The cache may be shared between threads.
+    """
+    __slots__ = ('max_size', 'hits', 'misses', 'entries', '_calls', '_lock')
+
+    def __init__(self, max_size=default_size):
+        """
+        Initialize an empty cache
+        :param max_size: Maximum number of tokens kept, counting a token once for each format it was converted
+            to. The least recently used are evicted first
+        """
+        if max_size < 1:
+            raise ValueError("Cache size must be at least 1")
+        self.max_size = max_size
+        # Number of tokens served from the cache and number converted
+        self.hits = 0
+        self.misses = 0
+        # _Entries for each set of options and target format
+        self.entries = {}
+        self._calls = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return sum(len(entries.tokens) for entries in self.entries.values())
+
+    def clear(self):
+        """
+        Remove all tokens and reset the counters
+        """
+        with self._lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def to_strings(self, tokens, batch, number_format, pad=False, show_prefix=False, formats=number_formats):
+        """
+        Convert parsed numbers to hexadecimal, decimal and binary strings, converting only tokens not in the cache.
+        Each distinct token is converted at most once per call.
+        :param tokens: Token text of each number
+        :param batch: BatchFormat holding the parsed numbers, in the same order as the tokens
+        :param number_format: Format the numbers were parsed from (hex, dec, bin)
+        :param pad: Whether to pad the hex and binary strings to a power of 2
+        :param show_prefix: Whether to show the '0x' and '0b' prefixes
+        :param formats: Formats to convert to, by default hex, dec and bin
+        :return: Tuple of lists of strings, one for each format of formats
+        """
+        options = (number_format, batch.value_type, batch.endianness, pad, show_prefix)
+
+        distinct, rows, inverse = _distinct(tokens)
+        strings = [np.empty(len(distinct), dtype=object) for _ in formats]
+        missed = []
+
+        with self._lock:
+            self._calls += 1
+            call = self._calls
+            for target, column in zip(formats, strings):
+                entries = self.entries.get(options + (target,))
+                if entries is None:
+                    missed.append(np.arange(len(distinct)))
+                    continue
+                indices, found = entries.find(distinct)
+                entries.last_used[indices[found]] = call
+                column[found] = entries.strings[indices[found]]
+                missed.append(np.flatnonzero(~found))
+
+        # Convert the missed tokens together, all formats at once when they missed the same tokens
+        if len(formats) == len(number_formats) and all(np.array_equal(missed[0], other) for other in missed[1:]):
+            if len(missed[0]):
+                converted = batch.take(rows[missed[0]]).to_strings(pad=pad, show_prefix=show_prefix)
+                for target, column in zip(formats, strings):
+                    column[missed[0]] = converted[number_formats.index(target)]
+        else:
+            for target, column, target_missed in zip(formats, strings, missed):
+                if len(target_missed):
+                    column[target_missed] = _render(batch.take(rows[target_missed]), target, pad, show_prefix)
+
+        with self._lock:
+            any_missed = np.zeros(len(distinct), dtype=bool)
+            for target, column, target_missed in zip(formats, strings, missed):
+                any_missed[target_missed] = True
+                # Only max_size tokens are kept, so the other misses are not added at all
+                added = target_missed[-self.max_size:]
+                entries = self.entries.setdefault(options + (target,), _Entries())
+                # Another thread may have added some of them meanwhile
+                added = added[~entries.find(distinct[added])[1]]
+                if len(added):
+                    self._add(entries, distinct[added], column[added], call)
+            self.misses += int(any_missed.sum())
+            self.hits += len(inverse) - int(any_missed.sum())
+
+        return tuple(column[inverse].tolist() for column in strings)
+
+    def _add(self, entries, tokens, strings, call):
+        """
+        Add tokens to the entries of one set of options and format, then evict the least recently used tokens of
+        all entries beyond max_size
+        """
+        tokens = np.concatenate((entries.tokens, tokens))
+        order = np.argsort(tokens, kind='stable')
+        entries.tokens = tokens[order]
+        entries.strings = np.concatenate((entries.strings, strings))[order]
+        entries.last_used = np.concatenate((entries.last_used, np.full(len(strings), call, dtype=np.int64)))[order]
+
+        excess = len(self) - self.max_size
+        if excess <= 0:
+            return
+        # Tokens used before the threshold call are evicted, then as many as needed of those used in it
+        last_used = np.concatenate([other.last_used for other in self.entries.values()])
+        threshold = np.partition(last_used, excess - 1)[excess - 1]
+        ties = excess - int((last_used < threshold).sum())
+        for options, other in list(self.entries.items()):
+            evict = other.last_used < threshold
+            at_threshold = np.flatnonzero(other.last_used == threshold)[:ties]
+            evict[at_threshold] = True
+            ties -= len(at_threshold)
+            keep = ~evict
+            other.tokens = other.tokens[keep]
+            other.strings = other.strings[keep]
+            other.last_used = other.last_used[keep]
+            if not len(other.tokens):
+                del self.entries[options]
+
+
+def _distinct(tokens):
+    """
+    Find the distinct tokens
+    :param tokens: Token text of each number, numbers are only made of ASCII characters
+    :return: Tuple of (array of distinct tokens as bytes, a row holding each of them, index of each token among them)
+    """
+    tokens = np.array(tokens, dtype=np.bytes_)
+    if tokens.dtype.itemsize > 8:
+        distinct, rows, inverse = np.unique(tokens, return_index=True, return_inverse=True)
+        return distinct, rows, inverse.reshape(-1)
+
+    # Tokens of up to 8 characters are compared as integers, which is much faster than comparing strings
+    keys = np.zeros(len(tokens), dtype='S8')
+    keys[:] = tokens
+    _, rows, inverse = np.unique(keys.view(np.uint64), return_index=True, return_inverse=True)
+    return tokens[rows], rows, inverse.reshape(-1)
+
+
+def _render(batch, number_format, pad, show_prefix):
+    # Strings of the numbers of a batch in one format
+    if number_format == "hex":
+        return batch.to_hex_strings(pad=pad, show_0x=show_prefix)
+    if number_format == "dec":
+        return batch.to_dec_strings()
+    return batch.to_bin_strings(pad=pad, show_0b=show_prefix)
@@ -0,0 +1,202 @@
+"""
+Single pass, table driven tokenizer locating numbers in a text string
+"""
+
+import numpy as np
+
+# Characters separating numbers from each other
+delimiters = ' ,\n\r\t;:[]{}()'
+
+# Token kinds, in order of precedence when a token fits several
+HEX_0X = 1          # 0x or 0X followed by hex digits
+HEX_DOLLAR = 2      # $ followed by hex digits
+BIN_0B = 3          # 0b or 0B followed by binary digits, also valid as bare hex digits
+BIN_PERCENT = 4     # % followed by binary digits
+BIN_DIGITS = 5      # Only 0 and 1
+DEC_DIGITS = 6      # Only decimal digits
+HEX_DIGITS = 7      # Hex digits including at least one letter
+DEC_REAL = 8        # Decimal number with a sign or a decimal point
+DEC_INVALID = 9     # Only decimal characters, but not a valid number (e.g. '1-2')
+
+# Token kinds accepted by each number format, mapped to the length of the prefix to strip
+format_kinds = {
+    "hex": {HEX_0X: 2, HEX_DOLLAR: 1, BIN_0B: 0, BIN_DIGITS: 0, DEC_DIGITS: 0, HEX_DIGITS: 0},
+    "dec": {BIN_DIGITS: 0, DEC_DIGITS: 0, DEC_REAL: 0, DEC_INVALID: 0},
+    "bin": {BIN_0B: 2, BIN_PERCENT: 1, BIN_DIGITS: 0},
+}
+
+# Format and prefix length each token kind is read as when detecting formats. Bare digits are decimal, hex
+# needs a prefix or a letter and binary a prefix
+detect_kinds = {
+    HEX_0X: ("hex", 2), HEX_DOLLAR: ("hex", 1), HEX_DIGITS: ("hex", 0),
+    BIN_0B: ("bin", 2), BIN_PERCENT: ("bin", 1),
+    BIN_DIGITS: ("dec", 0), DEC_DIGITS: ("dec", 0), DEC_REAL: ("dec", 0), DEC_INVALID: ("dec", 0),
+}
+
+# Formats in the order of the format indexes returned by detect_format
+detect_formats = ("hex", "dec", "bin")
+
+# Character classes, as bit flags so a whole token can be summarized by OR-ing its characters
+_BINARY = 1
+_DECIMAL = 2
+_HEX_LETTER = 4
+_MINUS = 8
+_DOT = 16
+_OTHER = 32
+_ALL_CLASSES = 63
+
+_HEX_CHARS = _BINARY | _DECIMAL | _HEX_LETTER
+_DEC_CHARS = _BINARY | _DECIMAL | _MINUS | _DOT
+
+
+def _build_class_table():
+    """
+    Build the character class of every ASCII code, delimiters get no class
+    :return: Array of 256 class flags
+    """
+    table = np.full(256, _OTHER, dtype=np.uint8)
+    for chars, char_class in (('01', _BINARY), ('23456789', _DECIMAL), ('abcdefABCDEF', _HEX_LETTER),
+                              ('-', _MINUS), ('.', _DOT), (delimiters, 0)):
+        table[np.frombuffer(chars.encode('ascii'), dtype=np.uint8)] = char_class
+    return table
+
+
+_CLASS_TABLE = _build_class_table()
+
+# Prefix length for every token kind in each format, -1 for kinds the format does not accept
+_PREFIX_TABLES = {}
+for _number_format, _kinds in format_kinds.items():
+    _PREFIX_TABLES[_number_format] = np.full(DEC_INVALID + 1, -1, dtype=np.int64)
+    for _kind, _prefix_length in _kinds.items():
+        _PREFIX_TABLES[_number_format][_kind] = _prefix_length
+
+# Format index and prefix length for every token kind when detecting formats
+_DETECT_FORMATS = np.zeros(DEC_INVALID + 1, dtype=np.uint8)
+_DETECT_PREFIXES = np.zeros(DEC_INVALID + 1, dtype=np.int64)
+for _kind, (_number_format, _prefix_length) in detect_kinds.items():
+    _DETECT_FORMATS[_kind] = detect_formats.index(_number_format)
+    _DETECT_PREFIXES[_kind] = _prefix_length
+
+
+def text_codes(text_string):
+    """
+    Get the character codes of a text string, indexed by character position.
+    :param text_string: Text string
+    :return: Array of uint8 codes for ASCII text, uint32 code points otherwise
+    """
+    if text_string.isascii():
+        return np.frombuffer(text_string.encode('ascii'), dtype=np.uint8)
+    return np.frombuffer(text_string.encode('utf-32-le'), dtype=np.uint32)
+
+
+def tokenize(text_string):
+    """
+    Get the tokens of a text string that may be numbers.
+    :param text_string: Text string to tokenize
+    :return: Tuple of (starts, ends, kinds) arrays, positions index the original string
+    """
+    return tokenize_codes(text_codes(text_string))
+
+
+def tokenize_codes(codes):
+    """
+    Get the tokens that may be numbers from an array of character codes.
+    :param codes: Array of character codes, see text_codes
+    :return: Tuple of (starts, ends, kinds) arrays
+    """
+    # Characters outside ASCII can only be part of unrecognized tokens
+    if codes.dtype != np.uint8:
+        codes = np.where(codes > 127, 128, codes).astype(np.uint8)
+    classes = _CLASS_TABLE[codes]
+
+    # Tokens are runs of characters that are not delimiters
+    is_delimiter = classes == 0
+    edges = np.diff(np.concatenate(([True], is_delimiter, [True])).view(np.int8))
+    starts = np.flatnonzero(edges == -1)
+    ends = np.flatnonzero(edges == 1)
+    if not len(starts):
+        return starts, ends, np.zeros(0, dtype=np.uint8)
+    lengths = ends - starts
+
+    # Union of the character classes in each token, also without its first one and two characters
+    token_classes = np.bitwise_or.reduceat(classes, starts)
+    classes[starts] = 0
+    after_first = np.bitwise_or.reduceat(classes, starts)
+    second = starts[lengths >= 2] + 1
+    classes[second] = 0
+    after_second = np.bitwise_or.reduceat(classes, starts)
+
+    first_char = codes[starts]
+    second_char = codes[np.minimum(starts + 1, len(codes) - 1)]
+    zero_prefix = (lengths >= 3) & (first_char == ord('0'))
+    one_char_prefix = lengths >= 2
+
+    # Decimal numbers allow a single leading minus sign and a single decimal point
+    minus_count = np.bincount(np.searchsorted(starts, np.flatnonzero(codes == ord('-')), 'right') - 1,
+                              minlength=len(starts))
+    dot_count = np.bincount(np.searchsorted(starts, np.flatnonzero(codes == ord('.')), 'right') - 1,
+                            minlength=len(starts))
+    valid_real = ((token_classes & (_BINARY | _DECIMAL)) != 0) & (dot_count <= 1) & \
+        ((minus_count == 0) | ((minus_count == 1) & (first_char == ord('-'))))
+
+    def only(union, allowed):
+        return (union & (_ALL_CLASSES ^ allowed)) == 0
+
+    kinds = np.select(
+        [zero_prefix & np.isin(second_char, (ord('x'), ord('X'))) & only(after_second, _HEX_CHARS),
+         one_char_prefix & (first_char == ord('$')) & only(after_first, _HEX_CHARS),
+         zero_prefix & np.isin(second_char, (ord('b'), ord('B'))) & only(after_second, _BINARY),
+         one_char_prefix & (first_char == ord('%')) & only(after_first, _BINARY),
+         only(token_classes, _BINARY),
+         only(token_classes, _BINARY | _DECIMAL),
+         only(token_classes, _HEX_CHARS),
+         only(token_classes, _DEC_CHARS) & valid_real,
+         only(token_classes, _DEC_CHARS)],
+        [HEX_0X, HEX_DOLLAR, BIN_0B, BIN_PERCENT, BIN_DIGITS, DEC_DIGITS, HEX_DIGITS, DEC_REAL, DEC_INVALID],
+        0).astype(np.uint8)
+
+    keep = kinds != 0
+    return starts[keep], ends[keep], kinds[keep]
+
+
+def select_format(starts, ends, kinds, number_format):
+    """
+    Keep the tokens of one number format and strip their prefixes.
+    :param starts: Token start positions
+    :param ends: Token end positions
+    :param kinds: Token kinds
+    :param number_format: Format of the numbers (hex, dec, bin)
+    :return: Tuple of (token starts, digit starts, ends) arrays
+    """
+    if number_format not in _PREFIX_TABLES:
+        raise ValueError("Invalid number format")
+    prefix_lengths = _PREFIX_TABLES[number_format][kinds]
+    keep = prefix_lengths >= 0
+    return starts[keep], starts[keep] + prefix_lengths[keep], ends[keep]
+
+
+def detect_format(starts, ends, kinds):
+    """
+    Classify every token as hex, dec or bin from its kind, and strip its prefix.
+    :param starts: Token start positions
+    :param ends: Token end positions
+    :param kinds: Token kinds
+    :return: Tuple of (token starts, digit starts, ends, format indexes into detect_formats) arrays
+    """
+    return starts, starts + _DETECT_PREFIXES[kinds], ends, _DETECT_FORMATS[kinds]
+
+
+def span_strings(codes, starts, ends):
+    """
+    Get the text of many spans at once.
+    :param codes: Array of character codes, see text_codes
+    :param starts: Span start positions
+    :param ends: Span end positions
+    :return: List of strings, characters outside Latin-1 are not supported
+    """
+    lengths = ends - starts
+    offsets = np.cumsum(lengths) - lengths
+    chars = codes[np.repeat(starts - offsets, lengths) + np.arange(lengths.sum())]
+    joined = chars.astype(np.uint8).tobytes().decode('latin-1')
+    return [joined[start:end] for start, end in zip(offsets.tolist(), (offsets + lengths).tolist())]
+
@@ -1,10 +1,28 @@
 import sys
-from PySide6.QtWidgets import (QMainWindow, QPushButton, QVBoxLayout, QWidget, QLabel, QRadioButton, QCheckBox,
-                             QTextEdit, QGridLayout)
-from PySide6.QtCore import Qt, QPropertyAnimation, QEasingCurve
+from contextlib import nullcontext
+
+from PySide6.QtWidgets import (QMainWindow, QPushButton, QVBoxLayout, QHBoxLayout, QWidget, QLabel, QRadioButton,
+                             QCheckBox, QTextEdit, QGridLayout, QProgressBar, QFileDialog, QInputDialog,
+                             QStackedWidget)
+from PySide6.QtCore import Qt, QPropertyAnimation, QEasingCurve, QTimer
+from PySide6.QtGui import QKeySequence, QTextCursor
 
 import handlers
+from diagnostics_panel import DiagnosticsPanel
+from history import History, QuickOptions
 from settings import Settings
+from stage_timer import StageTimer, stage
+
+# Characters a text document holds where its plain text has a newline or a space
+_PLAIN_TEXT = str.maketrans('\u2028\u2029\u00a0', '\n\n ')
+
+# Results longer than this many characters are shown in read-only views that only draw the visible lines
+large_output_length = 1 << 21
+
+
+def _same_positions(text_string):
+    """Check whether positions in a text document match positions in the string, which holds without surrogate pairs"""
+    return text_string.isascii() or max(text_string) <= '\uffff'
 
 
 class Hex2DecQt(QMainWindow):
@@ -13,7 +31,6 @@ class Hex2DecQt(QMainWindow):
 
         # Import settings
         self.settings = Settings()
-        self.settings.load_settings()
 
         self.options_visible = self.settings.get_setting(['showQuickOptions'])
         self.setWindowTitle(f"Hex2Dec Converter - {version}")
@@ -25,16 +42,42 @@ class Hex2DecQt(QMainWindow):
         self.hex_text = None
         self.dec_text = None
         self.bin_text = None
+        self.text_stacks = None
         self.pad_check = None
         self.prefix_check = None
         self.endian_check = None
         self.unsigned_radio = None
         self.signed_radio = None
         self.float_radio = None
+        self.bfloat16_radio = None
+        self.timings_check = None
         self.hex_button = None
         self.dec_button = None
         self.bin_button = None
         self.toggle_button = None
+        self.import_button = None
+        self.progress_bar = None
+        self.cancel_button = None
+
+        # Conversion running in the background, with the text edit it converts and its error title
+        self.conversion_worker = None
+        self.conversion_source = None
+        self.conversion_error_title = None
+        self.error_source = None
+
+        # Positions of the converted numbers in the text edits, and the region of the source edited since
+        self.converted_text = None
+        self.edited_region = None
+        self.applying_conversion = False
+
+        # Read-only views of each text edit for large results, created with the first large result
+        self.output_views = None
+        self.large_output = False
+        self.syncing_scroll = False
+
+        # Converted tokens shared by all conversions, repeated values are converted once. Created with the first
+        # conversion, as the conversion modules are only imported then
+        self.token_cache = None
 
         # Main container widget
         self.central_widget = QWidget()
@@ -48,7 +91,16 @@ class Hex2DecQt(QMainWindow):
         else:
             self.toggle_button = QPushButton("Show Options (o)")
         self.toggle_button.clicked.connect(self.toggle_options)
-        self.main_layout.addWidget(self.toggle_button, alignment=Qt.AlignmentFlag.AlignLeft)
+
+        # Raw binary file import button
+        self.import_button = QPushButton("Import Raw File (i)")
+        self.import_button.clicked.connect(self.import_raw_file)
+
+        top_layout = QHBoxLayout()
+        top_layout.addWidget(self.toggle_button)
+        top_layout.addWidget(self.import_button)
+        top_layout.addStretch(1)
+        self.main_layout.addLayout(top_layout)
 
         # Options frame
         self.options_frame = QWidget()
@@ -58,6 +110,11 @@ class Hex2DecQt(QMainWindow):
 
         self.load_quick_options(self.settings)
 
+        # Save the quick options in the background as they change, so they are kept even without closing
+        for option in (self.pad_check, self.prefix_check, self.endian_check, self.unsigned_radio, self.signed_radio,
+                       self.float_radio, self.bfloat16_radio, self.detect_check, self.timings_check):
+            option.toggled.connect(self.save_quick_options)
+
         if not self.options_visible:
             self.options_frame.setMaximumHeight(0)
             self.options_frame.setMinimumHeight(0)
@@ -73,16 +130,26 @@ class Hex2DecQt(QMainWindow):
         self.setup_conversion_widgets()
         self.main_layout.addWidget(self.conversion_frame)
 
+        # Progress frame, only shown when a conversion takes a while
+        self.progress_frame = QWidget()
+        self.setup_progress_widgets()
+        self.progress_frame.hide()
+        self.main_layout.addWidget(self.progress_frame)
+        self.progress_timer = QTimer(self)
+        self.progress_timer.setSingleShot(True)
+        self.progress_timer.setInterval(200)
+        self.progress_timer.timeout.connect(self.progress_frame.show)
+
+        # Panel listing the numbers that could not be converted
+        self.diagnostics_panel = DiagnosticsPanel()
+        self.diagnostics_panel.error_selected.connect(self.select_error)
+        self.main_layout.addWidget(self.diagnostics_panel)
+
         # Make conversion frame expand to fill space
         self.main_layout.setStretch(2, 1)
 
-        # Push the default state
-        self.quick_options_history = []
-        self.hex_text_history = []
-        self.dec_text_history = []
-        self.bin_text_history = []
-        self.history_index = 0
-        self.push_state()
+        # Start the undo history with the default state
+        self.history = History(self.quick_options(), ("", "", ""))
 
     def setup_options_widgets(self):
         # Checkboxes
@@ -92,6 +159,10 @@ class Hex2DecQt(QMainWindow):
         self.prefix_check.setFocusPolicy(Qt.FocusPolicy.NoFocus)
         self.endian_check = QCheckBox("Little Endian (n)")
         self.endian_check.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.detect_check = QCheckBox("Auto Detect (a)")
+        self.detect_check.setToolTip("Read 0x and $ numbers or numbers with a hex letter as hex, 0b and % numbers as "
+                                     "binary and other numbers as decimal, whichever text they are in")
+        self.detect_check.setFocusPolicy(Qt.FocusPolicy.NoFocus)
 
         # Radio buttons
         self.unsigned_radio = QRadioButton("Unsigned (u)")
@@ -100,20 +171,32 @@ class Hex2DecQt(QMainWindow):
         self.signed_radio.setFocusPolicy(Qt.FocusPolicy.NoFocus)
         self.float_radio = QRadioButton("Floating Point (l)")
         self.float_radio.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.bfloat16_radio = QRadioButton("BFloat16 (b)")
+        self.bfloat16_radio.setFocusPolicy(Qt.FocusPolicy.NoFocus)
         self.unsigned_radio.setChecked(True)
 
         # Add to layout
         self.options_frame_layout.addWidget(self.pad_check, 0, 0)
         self.options_frame_layout.addWidget(self.prefix_check, 0, 1)
         self.options_frame_layout.addWidget(self.endian_check, 0, 2)
+        self.options_frame_layout.addWidget(self.detect_check, 0, 3)
         self.options_frame_layout.addWidget(self.unsigned_radio, 1, 0)
         self.options_frame_layout.addWidget(self.signed_radio, 1, 1)
         self.options_frame_layout.addWidget(self.float_radio, 1, 2)
+        self.options_frame_layout.addWidget(self.bfloat16_radio, 1, 3)
 
         # Add label in bottom right corner indicating shift-enter for conversion
         shift_enter_label = QLabel("Press Shift+Enter to convert, Ctrl+Z/Y to undo/redo")
         shift_enter_label.setAlignment(Qt.AlignmentFlag.AlignLeft)
-        self.options_frame_layout.addWidget(shift_enter_label, 2, 0, 1, 3)
+        self.options_frame_layout.addWidget(shift_enter_label, 2, 0, 1, 2)
+
+        # Time the stages of each conversion, shown in the status bar
+        self.timings_check = QCheckBox("Show Timings (t)")
+        self.timings_check.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.timings_check.setChecked(bool(self.settings.get_setting(['timings', 'show'])))
+        self.timings_check.toggled.connect(self.statusBar().setVisible)
+        self.statusBar().setVisible(self.timings_check.isChecked())
+        self.options_frame_layout.addWidget(self.timings_check, 2, 2)
 
     def setup_conversion_widgets(self):
         layout = QGridLayout(self.conversion_frame)
@@ -142,17 +225,31 @@ class Hex2DecQt(QMainWindow):
         self.bin_button = QPushButton("Convert Binary")
         self.bin_button.clicked.connect(self.convert_bin)
 
+        # Track edits, so only the edited region needs converting
+        self.hex_text.document().contentsChange.connect(
+            lambda position, removed, added: self.track_edit("hex", position, removed, added))
+        self.dec_text.document().contentsChange.connect(
+            lambda position, removed, added: self.track_edit("dec", position, removed, added))
+        self.bin_text.document().contentsChange.connect(
+            lambda position, removed, added: self.track_edit("bin", position, removed, added))
+
+        # Each text edit is swapped for a read-only view when the results are large
+        self.text_stacks = {}
+        for text_edit in (self.hex_text, self.dec_text, self.bin_text):
+            self.text_stacks[text_edit] = QStackedWidget()
+            self.text_stacks[text_edit].addWidget(text_edit)
+
         # Add to layout
         layout.addWidget(hex_label, 0, 0)
-        layout.addWidget(self.hex_text, 1, 0)
+        layout.addWidget(self.text_stacks[self.hex_text], 1, 0)
         layout.addWidget(self.hex_button, 2, 0)
 
         layout.addWidget(dec_label, 0, 1)
-        layout.addWidget(self.dec_text, 1, 1)
+        layout.addWidget(self.text_stacks[self.dec_text], 1, 1)
         layout.addWidget(self.dec_button, 2, 1)
 
         layout.addWidget(bin_label, 0, 2)
-        layout.addWidget(self.bin_text, 1, 2)
+        layout.addWidget(self.text_stacks[self.bin_text], 1, 2)
         layout.addWidget(self.bin_button, 2, 2)
 
         # Set column stretch
@@ -163,21 +260,116 @@ class Hex2DecQt(QMainWindow):
         # Set row stretch for the text edits
         layout.setRowStretch(1, 1)
 
+    def setup_output_views(self):
+        # Imported on first use so NumPy is not loaded before the window is shown
+        from output_view import OutputView
+
+        self.output_views = {}
+        for text_edit in (self.hex_text, self.dec_text, self.bin_text):
+            view = OutputView()
+            view.setStyleSheet(text_edit.styleSheet())
+            view.installEventFilter(self)
+            view.top_line_changed.connect(self.sync_scroll)
+            self.output_views[text_edit] = view
+            self.text_stacks[text_edit].addWidget(view)
+
+    def set_texts(self, hex_string, dec_string, bin_string):
+        # Large texts are shown in the read-only views, the text edits are emptied so their documents are freed
+        texts = {self.hex_text: hex_string, self.dec_text: dec_string, self.bin_text: bin_string}
+        self.large_output = max(len(text_string) for text_string in texts.values()) > large_output_length
+        if self.large_output and self.output_views is None:
+            self.setup_output_views()
+
+        for text_edit, text_string in texts.items():
+            if self.large_output:
+                had_focus = text_edit.hasFocus()
+                self.output_views[text_edit].set_text(text_string)
+                self.text_stacks[text_edit].setCurrentWidget(self.output_views[text_edit])
+                text_edit.clear()
+                if had_focus:
+                    self.output_views[text_edit].setFocus()
+            else:
+                had_focus = self.output_views is not None and self.output_views[text_edit].hasFocus()
+                text_edit.setPlainText(text_string)
+                self.text_stacks[text_edit].setCurrentWidget(text_edit)
+                if self.output_views is not None:
+                    self.output_views[text_edit].set_text("")
+                if had_focus:
+                    text_edit.setFocus()
+
+    def pane_text(self, text_edit):
+        # Text shown for a text edit, which is held by its view for large results
+        if self.large_output:
+            return self.output_views[text_edit].toPlainText()
+        return text_edit.toPlainText()
+
+    def focus_pane(self, text_edit):
+        self.text_stacks[text_edit].currentWidget().setFocus()
+
+    def clear_large_output(self, text_edit):
+        # Leave the views for empty text edits, focusing the one given
+        self.converted_text = None
+        self.error_source = None
+        self.diagnostics_panel.show_errors([])
+        self.set_texts("", "", "")
+        text_edit.setFocus()
+
+    def sync_scroll(self, line):
+        # Keep the same line at the top of all three views
+        if self.syncing_scroll:
+            return
+        self.syncing_scroll = True
+        for view in self.output_views.values():
+            if view is not self.sender():
+                view.scroll_to_line(line)
+        self.syncing_scroll = False
+
+    def setup_progress_widgets(self):
+        layout = QHBoxLayout(self.progress_frame)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.cancel_button = QPushButton("Cancel (Esc)")
+        self.cancel_button.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.cancel_button.clicked.connect(self.cancel_conversion)
+
+        layout.addWidget(self.progress_bar, 1)
+        layout.addWidget(self.cancel_button)
+
     def load_quick_options(self, settings: Settings):
         # Load settings from the Settings object
-        self.pad_check.setChecked(settings.get_setting(['quickOptions', 'pad']))
-        self.prefix_check.setChecked(settings.get_setting(['quickOptions', 'prefix']))
-        self.endian_check.setChecked(settings.get_setting(['quickOptions', 'endianness']) == "little")
-        default_type = settings.get_setting(['quickOptions', 'defaultType'])
-        if default_type == "unsigned":
+        self.apply_quick_options(QuickOptions(
+            bool(settings.get_setting(['quickOptions', 'pad'])),
+            bool(settings.get_setting(['quickOptions', 'prefix'])),
+            settings.get_setting(['quickOptions', 'endianness']),
+            settings.get_setting(['quickOptions', 'defaultType']),
+            bool(settings.get_setting(['quickOptions', 'autoDetect']))
+        ))
+
+    def apply_quick_options(self, options: QuickOptions):
+        # Set the checkboxes and radio buttons to the given quick options
+        self.pad_check.setChecked(options.pad)
+        self.prefix_check.setChecked(options.prefix)
+        self.endian_check.setChecked(options.endianness == "little")
+        self.detect_check.setChecked(options.detect)
+        if options.value_type == "unsigned":
             self.unsigned_radio.setChecked(True)
-        elif default_type == "signed":
+        elif options.value_type == "signed":
             self.signed_radio.setChecked(True)
-        elif default_type == "floating":
+        elif options.value_type == "floating":
             self.float_radio.setChecked(True)
+        elif options.value_type == "bfloat16":
+            self.bfloat16_radio.setChecked(True)
         else:
             self.unsigned_radio.setChecked(True)
 
+    def quick_options(self):
+        # Quick options set by the checkboxes and radio buttons
+        return QuickOptions(self.pad_check.isChecked(), self.prefix_check.isChecked(),
+                            "little" if self.endian_check.isChecked() else "big", self.value_type(),
+                            self.detect_check.isChecked())
+
     def set_qick_options(self, settings):
         # Set the quick options in settings based on the current state of the checkboxes and radio buttons
         settings.set_setting(['showQuickOptions'], self.options_visible)
@@ -185,13 +377,23 @@ class Hex2DecQt(QMainWindow):
         settings.set_setting(['quickOptions', 'pad'], self.pad_check.isChecked())
         settings.set_setting(['quickOptions', 'prefix'], self.prefix_check.isChecked())
         settings.set_setting(['quickOptions', 'endianness'], "little" if self.endian_check.isChecked() else "big")
-        settings.set_setting(['quickOptions', 'defaultType'],
-                                  "unsigned" if self.unsigned_radio.isChecked() else "signed" if self.signed_radio.isChecked() else "floating")
+        settings.set_setting(['quickOptions', 'defaultType'], self.value_type())
+        settings.set_setting(['quickOptions', 'autoDetect'], self.detect_check.isChecked())
 
         settings.set_setting(['screenSize', 'width'], self.width())
         settings.set_setting(['screenSize', 'height'], self.height())
 
 
+    def save_quick_options(self):
+        self.set_qick_options(self.settings)
+        self.settings.set_setting(['timings', 'show'], self.timings_check.isChecked())
+        self.settings.save_settings()
+
+    def value_type(self):
+        # Value type selected by the type radio buttons
+        return handlers.value_type_name(self.unsigned_radio.isChecked(), self.signed_radio.isChecked(),
+                                        self.float_radio.isChecked(), self.bfloat16_radio.isChecked())
+
     def toggle_options(self):
         if not self.options_visible:
             # Show options
@@ -216,58 +418,279 @@ class Hex2DecQt(QMainWindow):
         self.options_visible = not self.options_visible
 
     def convert_hex(self):
-        hex_result, dec_result, bin_result = handlers.hex_to_other(
-            self.hex_text.toPlainText(),
-            self.pad_check.isChecked(),
-            self.prefix_check.isChecked(),
-            self.endian_check.isChecked(),
-            self.unsigned_radio.isChecked(),
-            self.signed_radio.isChecked(),
-            self.float_radio.isChecked()
-        )
-        if hex_result is not None and bin_result is not None and dec_result is not None:
-            self.hex_text.setPlainText(hex_result)
-            self.hex_text.moveCursor(self.hex_text.textCursor().MoveOperation.End)
-            self.dec_text.setPlainText(dec_result)
-            self.bin_text.setPlainText(bin_result)
-            self.push_state()
+        self.start_conversion(self.hex_text, "hex", "Invalid Hexadecimal Value")
 
     def convert_dec(self):
-        hex_result, dec_result, bin_result = handlers.dec_to_other(
-            self.dec_text.toPlainText(),
-            self.pad_check.isChecked(),
-            self.prefix_check.isChecked(),
-            self.endian_check.isChecked(),
-            self.unsigned_radio.isChecked(),
-            self.signed_radio.isChecked(),
-            self.float_radio.isChecked()
-        )
-        if hex_result is not None and bin_result is not None and dec_result is not None:
-            self.hex_text.setPlainText(hex_result)
-            self.dec_text.setPlainText(dec_result)
-            self.dec_text.moveCursor(self.dec_text.textCursor().MoveOperation.End)
-            self.bin_text.setPlainText(bin_result)
-            self.push_state()
+        self.start_conversion(self.dec_text, "dec", "Invalid Decimal Value")
 
     def convert_bin(self):
-        hex_result, dec_result, bin_result  = handlers.bin_to_other(
-            self.bin_text.toPlainText(),
+        self.start_conversion(self.bin_text, "bin", "Invalid Binary Value")
+
+    def start_conversion(self, source_text, number_format, error_title):
+        # A new conversion supersedes the one still running
+        self.cancel_conversion()
+
+        options = (
+            self.value_type(),
+            "little" if self.endian_check.isChecked() else "big",
             self.pad_check.isChecked(),
             self.prefix_check.isChecked(),
-            self.endian_check.isChecked(),
-            self.unsigned_radio.isChecked(),
-            self.signed_radio.isChecked(),
-            self.float_radio.isChecked()
+            self.detect_check.isChecked()
         )
-        if hex_result is not None and bin_result is not None and dec_result is not None:
-            self.hex_text.setPlainText(hex_result)
-            self.dec_text.setPlainText(dec_result)
-            self.bin_text.setPlainText(bin_result)
-            self.bin_text.moveCursor(self.bin_text.textCursor().MoveOperation.End)
-            self.push_state()
+
+        timer = StageTimer() if self.timings_check.isChecked() else None
+
+        # Only convert the edited region if nothing else changed since the last conversion
+        if self.converted_text is not None and self.converted_text.number_format == number_format and \
+                self.converted_text.options == options:
+            with timer or nullcontext():
+                converted = self.convert_edited_region(source_text, error_title)
+            if converted:
+                self.show_timings(timer, number_format)
+                return
+
+        from conversion_worker import ConversionWorker
+        # The token cache only pays off for texts repeating the same few values, so it is off unless set
+        from token_cache import TokenCache
+        cache_size = self.settings.get_setting(['tokenCache', 'size'])
+        if self.token_cache is None and isinstance(cache_size, int) and cache_size > 0:
+            self.token_cache = TokenCache(cache_size)
+
+        # A text edit holding a large text keeps the GUI thread busy while the worker runs, so a large source text
+        # is moved to the views before converting
+        text_string = self.pane_text(source_text)
+        if len(text_string) > large_output_length and not self.large_output:
+            self.applying_conversion = True
+            self.set_texts(*(text_string if text_edit is source_text else text_edit.toPlainText()
+                             for text_edit in (self.hex_text, self.dec_text, self.bin_text)))
+            self.applying_conversion = False
+            self.converted_text = None
+
+        worker = ConversionWorker(text_string, number_format, *options, self.token_cache, timer, self)
+        self.run_worker(worker, source_text, error_title)
+
+    def import_raw_file(self):
+        # Convert the words of a raw binary file, with the type and endianness of the quick options
+        path, _ = QFileDialog.getOpenFileName(self, "Import Raw File")
+        if not path:
+            return
+
+        word_sizes = ["8 bits", "16 bits", "32 bits", "64 bits"]
+        word_size, accepted = QInputDialog.getItem(self, "Import Raw File", "Word size:", word_sizes, 2, False)
+        if not accepted:
+            return
+        self.start_raw_import(path, int(word_size.split()[0]))
+
+    def start_raw_import(self, path, word_bits):
+        # A new import supersedes the conversion still running
+        self.cancel_conversion()
+
+        from conversion_worker import RawImportWorker
+
+        timer = StageTimer() if self.timings_check.isChecked() else None
+        worker = RawImportWorker(path, word_bits, self.value_type(),
+                                 "little" if self.endian_check.isChecked() else "big",
+                                 self.pad_check.isChecked(), self.prefix_check.isChecked(), timer, self)
+        worker.warned.connect(self.raw_import_warning)
+        self.run_worker(worker, self.hex_text, "Invalid Raw File")
+
+    def raw_import_warning(self, message):
+        if self.sender() is self.conversion_worker:
+            handlers.show_conversion_warning("Incomplete Raw File", message)
+
+    def run_worker(self, worker, source_text, error_title):
+        # Start a conversion worker, its results are shown when it is done
+        worker.progress.connect(self.conversion_progress)
+        worker.converted.connect(self.conversion_done)
+        worker.failed.connect(self.conversion_failed)
+        worker.finished.connect(worker.deleteLater)
+
+        self.conversion_worker = worker
+        self.conversion_source = source_text
+        self.conversion_error_title = error_title
+        self.progress_bar.setValue(0)
+        self.progress_timer.start()
+        worker.start()
+
+    def cancel_conversion(self):
+        # Results of an interrupted worker are discarded, it finishes on its own
+        if self.conversion_worker is not None:
+            self.conversion_worker.requestInterruption()
+        self.end_conversion()
+
+    def end_conversion(self):
+        self.conversion_worker = None
+        self.progress_timer.stop()
+        self.progress_frame.hide()
+
+    def conversion_progress(self, percent):
+        if self.sender() is self.conversion_worker:
+            self.progress_bar.setValue(percent)
+
+    def conversion_done(self, results):
+        if self.sender() is not self.conversion_worker:
+            return
+        source_text = self.conversion_source
+        self.end_conversion()
+
+        hex_result, dec_result, bin_result, converted_text = results
+        worker = self.sender()
+        timer = worker.timer
+
+        # Apply all results at once
+        self.applying_conversion = True
+        with timer or nullcontext(), stage("display"):
+            self.set_texts(hex_result, dec_result, bin_result)
+        self.applying_conversion = False
+        # Raw file imports have no source text to track, and large results cannot be edited
+        self.converted_text = converted_text if converted_text is not None and not self.large_output and \
+            _same_positions(hex_result) else None
+        self.edited_region = None
+
+        self.error_source = source_text
+        self.diagnostics_panel.show_errors(converted_text.errors if converted_text is not None else [])
+        source_text.moveCursor(source_text.textCursor().MoveOperation.End)
+        self.push_state()
+        self.show_timings(timer, worker.number_format)
+
+    def conversion_failed(self, message):
+        if self.sender() is not self.conversion_worker:
+            return
+        error_title = self.conversion_error_title
+        self.end_conversion()
+        handlers.show_conversion_error(error_title, message)
+
+    def track_edit(self, number_format, position, removed, added):
+        if self.applying_conversion or self.converted_text is None:
+            return
+
+        # Editing any other text edit means the texts no longer match
+        if number_format != self.converted_text.number_format:
+            self.converted_text = None
+            return
+
+        # Changes may count the paragraph separator after the last line, which is not part of the text. One
+        # replacing as many characters as it removes past the end only changed the format of the last line, as
+        # typing at the end does
+        text_edit = {"hex": self.hex_text, "dec": self.dec_text, "bin": self.bin_text}[number_format]
+        length = text_edit.document().characterCount() - 1
+        if removed == added and position + added > length:
+            return
+
+        # Grow the edited region to cover the change, growth is how much longer the text got
+        if self.edited_region is None:
+            self.edited_region = (position, min(position + added, length), added - removed)
+        else:
+            start, end, growth = self.edited_region
+            self.edited_region = (min(start, position), min(max(end, position + removed) + added - removed, length),
+                                  growth + added - removed)
+
+    def convert_edited_region(self, source_text, error_title):
+        # Returns False if the region is too large to convert on the GUI thread, or does not match the text
+        if self.edited_region is None:
+            source_text.moveCursor(source_text.textCursor().MoveOperation.End)
+            return True
+
+        from conversion_worker import chunk_size
+        from tokenizer import delimiters
+        token_edges = delimiters + '\u2028\u2029\u00a0'
+
+        start, end, growth = self.edited_region
+        document = source_text.document()
+        length = document.characterCount() - 1
+
+        # Convert the whole text again if the region does not fit the text as last converted
+        converted_length = self.converted_text.lengths[self.converted_text.number_format]
+        if converted_length + growth != length or not 0 <= start <= end <= length or end - growth > converted_length:
+            return False
+
+        # Widen the region to whole tokens
+        while start > 0 and document.characterAt(start - 1) not in token_edges and \
+                end - start <= chunk_size:
+            start -= 1
+        while end < length and document.characterAt(end) not in token_edges and \
+                end - start <= chunk_size:
+            end += 1
+        if end - start > chunk_size:
+            return False
+
+        cursor = QTextCursor(document)
+        cursor.setPosition(start)
+        cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+        region_text = cursor.selectedText().translate(_PLAIN_TEXT)
+        if not _same_positions(region_text):
+            return False
+
+        try:
+            replacements, _ = self.converted_text.replace(region_text, start, end - growth)
+        except ValueError as error:
+            handlers.show_conversion_error(error_title, error)
+            return True
+
+        # Patch the region in every text edit
+        self.applying_conversion = True
+        with stage("display"):
+            for number_format, text_edit in (("hex", self.hex_text), ("dec", self.dec_text),
+                                             ("bin", self.bin_text)):
+                region_start, region_end, replacement = replacements[number_format]
+                if text_edit is source_text:
+                    region_end += growth
+                cursor = QTextCursor(text_edit.document())
+                cursor.setPosition(region_start)
+                cursor.setPosition(region_end, QTextCursor.MoveMode.KeepAnchor)
+                cursor.insertText(replacement)
+        self.applying_conversion = False
+        self.edited_region = None
+
+        self.error_source = source_text
+        self.diagnostics_panel.show_errors(self.converted_text.errors)
+        source_text.moveCursor(source_text.textCursor().MoveOperation.End)
+        self.push_state()
+        return True
+
+    def show_timings(self, timer, number_format):
+        # Show how long each stage of a conversion took, and append it to the timings file if there is one
+        if timer is None:
+            return
+        timer.stop()
+        self.statusBar().showMessage(timer.summary())
+
+        timings_file = self.settings.get_setting(['timings', 'file'])
+        if timings_file:
+            try:
+                timer.write_json_line(timings_file, source=number_format)
+            except OSError as error:
+                self.statusBar().showMessage(f"{timer.summary()} (not saved: {error})")
+
+    def select_error(self, start, end):
+        # Select an invalid token in the text edit it was found in
+        if self.error_source is None:
+            return
+        if self.large_output:
+            self.output_views[self.error_source].select(start, end)
+            self.output_views[self.error_source].setFocus()
+            return
+        length = self.error_source.document().characterCount() - 1
+        cursor = self.error_source.textCursor()
+        cursor.setPosition(min(start, length))
+        cursor.setPosition(min(end, length), QTextCursor.MoveMode.KeepAnchor)
+        self.error_source.setTextCursor(cursor)
+        self.error_source.ensureCursorVisible()
+        self.error_source.setFocus()
 
     def eventFilter(self, obj, event):
         if event.type() == event.Type.KeyPress:
+            # Views of large results take the keys of their text edits, deleting or pasting over a view clears the
+            # results so new text can be entered
+            if self.output_views is not None and obj in self.output_views.values():
+                obj = next(text_edit for text_edit, view in self.output_views.items() if view is obj)
+                if event.matches(QKeySequence.StandardKey.Paste) or \
+                        event.key() in (Qt.Key.Key_Delete, Qt.Key.Key_Backspace):
+                    self.clear_large_output(obj)
+                    if event.matches(QKeySequence.StandardKey.Paste):
+                        obj.paste()
+                    return True
+
             if event.modifiers() == Qt.KeyboardModifier.ShiftModifier and event.key() == Qt.Key.Key_Return:
                 if obj == self.hex_text:
                     self.convert_hex()
@@ -278,6 +701,9 @@ class Hex2DecQt(QMainWindow):
                 elif obj == self.bin_text:
                     self.convert_bin()
                     return True
+            elif event.key() == Qt.Key.Key_Escape and self.conversion_worker is not None:
+                self.cancel_conversion()
+                return True
             elif event.modifiers() == Qt.KeyboardModifier.ControlModifier and event.key() == Qt.Key.Key_Z:
                 self.load_previous_state()
                 return True
@@ -286,23 +712,23 @@ class Hex2DecQt(QMainWindow):
                 return True
             elif event.key() == Qt.Key.Key_Backtab:
                 if obj == self.hex_text:
-                    self.bin_text.setFocus()
+                    self.focus_pane(self.bin_text)
                     return True
                 elif obj == self.dec_text:
-                    self.hex_text.setFocus()
+                    self.focus_pane(self.hex_text)
                     return True
                 elif obj == self.bin_text:
-                    self.dec_text.setFocus()
+                    self.focus_pane(self.dec_text)
                     return True
             elif event.key() == Qt.Key.Key_Tab:
                 if obj == self.hex_text:
-                    self.dec_text.setFocus()
+                    self.focus_pane(self.dec_text)
                     return True
                 elif obj == self.dec_text:
-                    self.bin_text.setFocus()
+                    self.focus_pane(self.bin_text)
                     return True
                 elif obj == self.bin_text:
-                    self.hex_text.setFocus()
+                    self.focus_pane(self.hex_text)
                     return True
             # 'o' to toggle options
             elif event.key() == Qt.Key.Key_O:
@@ -326,11 +752,20 @@ class Hex2DecQt(QMainWindow):
             elif event.key() == Qt.Key.Key_L:
                 self.float_radio.setChecked(True)
                 return True
+            elif event.key() == Qt.Key.Key_T:
+                self.timings_check.setChecked(not self.timings_check.isChecked())
+                return True
+            elif event.key() == Qt.Key.Key_I:
+                self.import_raw_file()
+                return True
 
         return super().eventFilter(obj, event)
 
     def keyPressEvent(self, event):
-        if event.modifiers() == Qt.KeyboardModifier.ControlModifier and event.key() == Qt.Key.Key_Z:
+        if event.key() == Qt.Key.Key_Escape and self.conversion_worker is not None:
+            self.cancel_conversion()
+            return
+        elif event.modifiers() == Qt.KeyboardModifier.ControlModifier and event.key() == Qt.Key.Key_Z:
             self.load_previous_state()
             return
         elif event.modifiers() == Qt.KeyboardModifier.ControlModifier and event.key() == Qt.Key.Key_Y:
@@ -357,60 +792,53 @@ class Hex2DecQt(QMainWindow):
         elif event.key() == Qt.Key.Key_L:
             self.float_radio.setChecked(True)
             return
+        elif event.key() == Qt.Key.Key_B:
+            self.bfloat16_radio.setChecked(True)
+            return
+        elif event.key() == Qt.Key.Key_A:
+            self.detect_check.setChecked(not self.detect_check.isChecked())
+            return
+        elif event.key() == Qt.Key.Key_T:
+            self.timings_check.setChecked(not self.timings_check.isChecked())
+            return
+        elif event.key() == Qt.Key.Key_I:
+            self.import_raw_file()
+            return
         super().keyPressEvent(event)
 
     def push_state(self):
-        # If not most recent state, remove all states after the current index
-        if self.history_index < len(self.quick_options_history) - 1:
-            self.quick_options_history = self.quick_options_history[:self.history_index + 1]
-            self.hex_text_history = self.hex_text_history[:self.history_index + 1]
-            self.dec_text_history = self.dec_text_history[:self.history_index + 1]
-            self.bin_text_history = self.bin_text_history[:self.history_index + 1]
-
-        # Save the current quick options and conversion text
-        settings = Settings()
-        self.set_qick_options(settings)
-        self.quick_options_history.append(settings)
-        self.hex_text_history.append(self.hex_text.toPlainText())
-        self.dec_text_history.append(self.dec_text.toPlainText())
-        self.bin_text_history.append(self.bin_text.toPlainText())
-
-        # Limit the history to the last 100 states
-        if len(self.quick_options_history) > 100:
-            self.quick_options_history.pop(0)
-            self.hex_text_history.pop(0)
-            self.dec_text_history.pop(0)
-            self.bin_text_history.pop(0)
-
-        self.history_index = len(self.quick_options_history) - 1
-
-    def load_state_by_index(self, index):
-        # Load the state at the given index
-        if len(self.quick_options_history) == 0 or index < 0 or index >= len(self.quick_options_history):
+        # Save the current quick options and conversion text, only the changed part of each text is stored
+        self.history.push(self.quick_options(), (self.pane_text(self.hex_text), self.pane_text(self.dec_text),
+                                                 self.pane_text(self.bin_text)))
+
+    def load_state(self, state):
+        # Load a state returned by the history
+        if state is None:
             return
 
-        settings = self.quick_options_history[index]
-        self.load_quick_options(settings)
-        self.hex_text.setPlainText(self.hex_text_history[index])
-        self.dec_text.setPlainText(self.dec_text_history[index])
-        self.bin_text.setPlainText(self.bin_text_history[index])
+        options, texts = state
+        self.converted_text = None
+        self.diagnostics_panel.show_errors([])
+        self.apply_quick_options(options)
+        self.set_texts(*texts)
 
     def load_previous_state(self):
         # Load the previous state if it exists
-        if self.history_index > 0:
-            self.history_index -= 1
-            self.load_state_by_index(self.history_index)
+        self.load_state(self.history.undo())
 
     def load_next_state(self):
         # Load the next state if it exists
-        if self.history_index < len(self.quick_options_history) - 1:
-            self.history_index += 1
-            self.load_state_by_index(self.history_index)
+        self.load_state(self.history.redo())
 
     def closeEvent(self, event):
-        # Save settings
-        self.set_qick_options(self.settings)
-
-        self.settings.save_settings()
+        # Stop any running conversion
+        worker = self.conversion_worker
+        self.cancel_conversion()
+        if worker is not None:
+            worker.wait()
+
+        # Save settings now rather than after the save delay
+        self.save_quick_options()
+        self.settings.flush()
         super().closeEvent(event)
 
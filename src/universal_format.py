@@ -2,22 +2,149 @@
 Universal base class for number formats
 """
 
-import numpy as np
 import struct
 
 # Define the padding values for hexadecimal representation
-pad_nibble_values = np.array([2, 4, 8, 16])
+pad_nibble_values = (2, 4, 8, 16)
 
 # Define the padding values for binary representation
-pad_bit_values = np.array([8, 16, 32, 64, 128])
+pad_bit_values = (8, 16, 32, 64, 128)
 
 # Allowed bit values for floating point
-float_bit_values = np.array([32])
+float_bit_values = (16, 32, 64)
+
+# Floating point types, bfloat16 reads and writes 16-bit values as bfloat16 instead of IEEE half precision
+float_types = ('floating', 'bfloat16')
+
+# Struct formats of the IEEE floating point and unsigned integer of each width
+_FLOAT_FORMATS = {16: ('!e', '!H'), 32: ('!f', '!I'), 64: ('!d', '!Q')}
+
+# Two hexadecimal and eight binary digits for every byte value
+byte_hex = tuple(f'{byte:02x}' for byte in range(256))
+byte_bits = tuple(f'{byte:08b}' for byte in range(256))
+
+
+def bytes_to_hex(data):
+    """
+    Render bytes as hexadecimal digits, two per byte
+    :param data: Bytes-like object
+    :return: Hexadecimal string
+    """
+    return ''.join(map(byte_hex.__getitem__, data))
+
+
+def bytes_to_bin(data):
+    """
+    Render bytes as binary digits, eight per byte
+    :param data: Bytes-like object
+    :return: Binary string
+    """
+    return ''.join(map(byte_bits.__getitem__, data))
+
+
+def swap_bytes(digits, digits_per_byte):
+    """
+    Reverse the byte order of a digit string. Digits are grouped into bytes from the left, so a shorter
+    trailing group becomes the first one.
+    :param digits: Hexadecimal or binary digits
+    :param digits_per_byte: 2 for hexadecimal, 8 for binary
+    :return: Digit string with the bytes in reverse order
+    """
+    whole = len(digits) - len(digits) % digits_per_byte
+    head = digits[:whole]
+
+    # Swap whole bytes in a bytes buffer, hex digit pairs are reversed and then put back in order
+    if digits_per_byte == 2 and head.isascii():
+        swapped = bytearray(head.encode('ascii'))
+        swapped.reverse()
+        swapped[0::2], swapped[1::2] = swapped[1::2], swapped[0::2]
+        return digits[whole:] + swapped.decode('ascii')
+    if digits_per_byte == 8 and not head.strip('01'):
+        data = int(head, 2).to_bytes(whole // 8, 'big') if head else b''
+        return digits[whole:] + bytes_to_bin(data[::-1])
+
+    return ''.join([digits[i:i + digits_per_byte] for i in range(0, len(digits), digits_per_byte)][::-1])
+
+
+def pad_width(width, values):
+    """
+    Get the smallest padding width that holds a width
+    :param width: Number of digits or bits
+    :param values: Ascending padding widths, such as pad_nibble_values
+    :return: Padding width
+    """
+    for value in values:
+        if value >= width:
+            return value
+    raise ValueError("Value too wide to pad")
+
+
+def default_float_bits(value_type):
+    """
+    Get the width of floating point values whose width is not given by their input, such as decimal values
+    :param value_type: Floating point type (floating, bfloat16)
+    :return: Number of bits
+    """
+    return 16 if value_type == 'bfloat16' else 32
+
+
+def float_from_bits(pattern, bits, value_type='floating'):
+    """
+    Decode a floating point value from its bits
+    :param pattern: Bits of the value as a non-negative integer
+    :param bits: Width of the value, one of float_bit_values
+    :param value_type: Floating point type (floating, bfloat16)
+    :return: Float value
+    """
+    if bits == 16 and value_type == 'bfloat16':
+        return struct.unpack('!f', (pattern << 16).to_bytes(4, 'big'))[0]
+    if bits == 16 and pattern & 0x7c00 == 0x7c00 and pattern & 0x3ff:
+        # Half precision NaN, keeping its sign and payload as NumPy does
+        double = (pattern & 0x8000) << 48 | 0x7ff << 52 | (pattern & 0x3ff) << 42
+        return struct.unpack('!d', double.to_bytes(8, 'big'))[0]
+    float_format, _ = _FLOAT_FORMATS[bits]
+    return struct.unpack(float_format, pattern.to_bytes(bits // 8, 'big'))[0]
+
+
+def float_to_bits(value, bits, value_type='floating'):
+    """
+    Encode a floating point value as bits, rounding to the nearest value of the width
+    :param value: Float value
+    :param bits: Width of the value, one of float_bit_values
+    :param value_type: Floating point type (floating, bfloat16)
+    :return: Bits of the value as a non-negative integer
+    """
+    if bits == 16 and value_type == 'bfloat16':
+        single = struct.unpack('!I', struct.pack('!f', value))[0]
+        # Keep NaN a NaN when its payload is in the dropped bits
+        if value != value:
+            return (single >> 16) | 0x40
+        return (single + 0x7FFF + ((single >> 16) & 1)) >> 16
+    if bits == 16 and value != value:
+        # Half precision NaN, keeping its sign and payload as NumPy does
+        double = struct.unpack('!Q', struct.pack('!d', value))[0]
+        return (double >> 48) & 0x8000 | 0x7c00 | ((double >> 42) & 0x3ff or 1)
+    float_format, int_format = _FLOAT_FORMATS[bits]
+    return struct.unpack(int_format, struct.pack(float_format, value))[0]
+
+
+def min_signed_bits(value):
+    """
+    Get the smallest padding width whose two's complement range holds a signed value
+    :param value: Signed integer value
+    :return: Number of bits
+    """
+    for bits in pad_bit_values:
+        if -(1 << (bits - 1)) <= value < (1 << (bits - 1)):
+            return bits
+    raise ValueError("Value too large for signed representation")
+
 
 class UniversalFormat:
     """
     Universal base class for number formats
     """
+    __slots__ = ('value', 'value_type', 'min_bits', 'endianness')
 
     def __init__(self):
         """
@@ -31,7 +158,7 @@ class UniversalFormat:
     def set_type(self, type):
         """
         Set the type of the number
-        :param type: Type of number (signed, unsigned, floating)
+        :param type: Type of number (signed, unsigned, floating, bfloat16)
         """
         self.value_type = type
 
@@ -59,7 +186,7 @@ class UniversalFormat:
 
         # Re-order bytes if endianness is little
         if self.endianness == 'little':
-            hex_string = ''.join([hex_string[i:i + 2] for i in range(0, len(hex_string), 2)][::-1])
+            hex_string = swap_bytes(hex_string, 2)
 
         self.min_bits = len(hex_string) * 4
 
@@ -72,11 +199,11 @@ class UniversalFormat:
             self.value = int(hex_string, 16)
             if self.value >= 2 ** (4 * len(hex_string) - 1):
                 self.value -= 2 ** (4 * len(hex_string))
-        elif self.value_type == "floating":
+        elif self.value_type in float_types:
             if len(hex_string) * 4 not in float_bit_values:
                 raise ValueError("Unsupported length for floating point value")
-            # Convert to floating point number
-            self.value = struct.unpack('!f', bytes.fromhex(hex_string))[0]
+            # Convert to floating point number of the width of the string
+            self.value = float_from_bits(int(hex_string, 16), self.min_bits, self.value_type)
 
         return self.value
 
@@ -97,7 +224,7 @@ class UniversalFormat:
         elif self.value_type == "signed":
             dec_string = str(int(float(dec_string)))    # Convert to integer
             self.value = int(dec_string)
-        elif self.value_type == "floating":
+        elif self.value_type in float_types:
             # Convert to floating point number
             self.value = float(dec_string)
 
@@ -118,7 +245,7 @@ class UniversalFormat:
 
         # Re-order bytes if endianness is little
         if self.endianness == 'little':
-            bin_string = ''.join([bin_string[i:i + 8] for i in range(0, len(bin_string), 8)][::-1])
+            bin_string = swap_bytes(bin_string, 8)
 
         self.min_bits = len(bin_string)
 
@@ -131,11 +258,11 @@ class UniversalFormat:
             self.value = int(bin_string, 2)
             if self.value >= 2 ** (len(bin_string) - 1):
                 self.value -= 2 ** len(bin_string)
-        elif self.value_type == "floating":
-            # Convert to floating point number
+        elif self.value_type in float_types:
+            # Convert to floating point number of the width of the string
             if len(bin_string) not in float_bit_values:
                 raise ValueError("Unsupported length for floating point value")
-            self.value = struct.unpack('!f', int(bin_string, 2).to_bytes(4, byteorder='big'))[0]
+            self.value = float_from_bits(int(bin_string, 2), self.min_bits, self.value_type)
 
         return self.value
 
@@ -148,40 +275,30 @@ class UniversalFormat:
         """
         self._check_value()
 
-        if self.value_type == "unsigned":
-            hex_string = hex(self.value)
-        elif self.value_type == "signed":
-            if self.value >= 0:
-                min_bits_signed = np.min(pad_bit_values[pad_bit_values >= np.log2((np.abs(self.value) + 1) * 2)])
-                self.min_bits = max(self.min_bits, min_bits_signed) if self.min_bits is not None else min_bits_signed
-                hex_string = hex(self.value)
-            else:
-                min_bits_signed = np.min(pad_bit_values[pad_bit_values >= np.log2(np.abs(self.value) * 2)])
-                hex_string = hex(2**min_bits_signed + self.value)
-        elif self.value_type == "floating":
-            hex_string = hex(struct.unpack('<I', struct.pack('<f', self.value))[0])[2:]
-
-        # Remove '0x' and '-0x' prefixes
-        if hex_string.startswith("-0x"):
-            hex_string = hex_string[3:]
-        elif hex_string.startswith("0x"):
-            hex_string = hex_string[2:]
-
-        pad_val = '0' if self.value >= 0 else 'f'
+        pattern = self._bit_pattern()
+        num_digits = max((pattern.bit_length() + 3) // 4, 1)
+        width = num_digits
 
         # Pad to minimum nibbles
-        if self.min_bits is not None and self.min_bits > len(hex_string) * 4:
-            num_pad = self.min_bits // 4 - len(hex_string)
-            hex_string = pad_val * num_pad + hex_string
+        if self.min_bits is not None and self.min_bits > num_digits * 4:
+            width = self.min_bits // 4
 
         # Pad the string if desired
         if pad:
-            num_pad = np.min(pad_nibble_values[pad_nibble_values >= len(hex_string)]) - len(hex_string)
-            hex_string = pad_val * num_pad + hex_string
+            width = pad_width(width, pad_nibble_values)
 
-        # Re-order bytes if endianness is little
-        if self.endianness == 'little':
-            hex_string = ''.join([hex_string[i:i + 2] for i in range(0, len(hex_string), 2)][::-1])
+        # Negative values are padded with f
+        if not self.value >= 0:
+            pattern |= (1 << (4 * width)) - (1 << (4 * num_digits))
+
+        # Render whole bytes from a buffer, re-ordered if endianness is little
+        if width % 2 == 0:
+            data = pattern.to_bytes(width // 2, 'big')
+            hex_string = bytes_to_hex(data[::-1] if self.endianness == 'little' else data)
+        else:
+            hex_string = bytes_to_hex(pattern.to_bytes(width // 2 + 1, 'big'))[1:]
+            if self.endianness == 'little':
+                hex_string = swap_bytes(hex_string, 2)
 
         # Add 0x prefix if desired
         if show_0x:
@@ -207,44 +324,35 @@ class UniversalFormat:
         :return:
         """
         self._check_value()
-        if self.value_type == "unsigned":
-            bin_string = bin(self.value)
-        elif self.value_type == "signed":
-            if self.value >= 0:
-                min_bits_signed = np.min(pad_bit_values[pad_bit_values >= np.log2((np.abs(self.value) + 1) * 2)])
-                self.min_bits = max(self.min_bits, min_bits_signed) if self.min_bits is not None else min_bits_signed
-                bin_string = bin(self.value)
-            else:
-                min_bits_signed = np.min(pad_bit_values[pad_bit_values >= np.log2(np.abs(self.value) * 2)])
-                bin_string = bin(2**min_bits_signed + self.value)
-        elif self.value_type == "floating":
-            bin_string = bin(struct.unpack('!I', struct.pack('!f', self.value))[0])[2:]
-            # Pad to nearest value in float_bit_values
-            if len(bin_string) < np.max(float_bit_values):
-                pad_num = np.min(float_bit_values[float_bit_values >= len(bin_string)]) - len(bin_string)
-                bin_string = '0' * pad_num + bin_string
-
-        # Remove '0b' and '-0b' prefixes
-        if bin_string.startswith("-0b"):
-            bin_string = bin_string[3:]
-        elif bin_string.startswith("0b"):
-            bin_string = bin_string[2:]
+
+        pattern = self._bit_pattern()
+        num_bits = max(pattern.bit_length(), 1)
+
+        # Pad to the width of the floating point value
+        if self.value_type in float_types:
+            num_bits = max(num_bits, self._float_bits())
+        width = num_bits
 
         # Pad to minimum bits
-        pad_val = '0' if self.value >= 0 else '1'
-        if self.min_bits is not None and self.min_bits > len(bin_string):
-            num_pad = self.min_bits - len(bin_string)
-            # Pad with zeros or ones based on sign
-            bin_string = pad_val * num_pad + bin_string
+        if self.min_bits is not None and self.min_bits > num_bits:
+            width = self.min_bits
 
         # Pad the string if desired
         if pad:
-            num_pad = np.min(pad_bit_values[pad_bit_values >= len(bin_string)]) - len(bin_string)
-            bin_string = pad_val * num_pad + bin_string
+            width = pad_width(width, pad_bit_values)
 
-        # Re-order bytes if endianness is little
-        if self.endianness == 'little':
-            bin_string = ''.join([bin_string[i:i + 8] for i in range(0, len(bin_string), 8)][::-1])
+        # Negative values are padded with ones
+        if not self.value >= 0:
+            pattern |= (1 << width) - (1 << num_bits)
+
+        # Render whole bytes from a buffer, re-ordered if endianness is little
+        if width % 8 == 0:
+            data = pattern.to_bytes(width // 8, 'big')
+            bin_string = bytes_to_bin(data[::-1] if self.endianness == 'little' else data)
+        else:
+            bin_string = bytes_to_bin(pattern.to_bytes(width // 8 + 1, 'big'))[8 - width % 8:]
+            if self.endianness == 'little':
+                bin_string = swap_bytes(bin_string, 8)
 
         # Add 0b prefix if desired
         if show_0b:
@@ -252,6 +360,31 @@ class UniversalFormat:
 
         return bin_string
 
+    def _bit_pattern(self):
+        """
+        Get the bits to render for the value, updating the minimum width of positive signed values
+        :return: Non-negative integer, negative signed values in two's complement of their smallest width
+        """
+        if self.value_type in float_types:
+            return float_to_bits(self.value, self._float_bits(), self.value_type)
+
+        if self.value_type == "signed":
+            min_bits_signed = min_signed_bits(self.value)
+            if self.value < 0:
+                return (1 << min_bits_signed) + self.value
+            self.min_bits = max(self.min_bits, min_bits_signed) if self.min_bits is not None else min_bits_signed
+
+        return abs(self.value)
+
+    def _float_bits(self):
+        """
+        Get the width of the floating point value, that of its input string if it had one
+        :return: Number of bits
+        """
+        if self.min_bits in float_bit_values:
+            return self.min_bits
+        return default_float_bits(self.value_type)
+
     def _clean_string(self, string):
         """
         Clean the string by removing leading and trailing whitespace
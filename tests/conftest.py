@@ -0,0 +1,8 @@
+"""
+Test configuration, the modules in src are imported by name as the application does
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
@@ -0,0 +1,162 @@
+"""
+Tests that the vectorized BatchFormat converts numbers exactly as UniversalFormat does one at a time
+"""
+
+import random
+
+import numpy as np
+import pytest
+
+from batch_format import BatchFormat
+from universal_format import UniversalFormat
+
+value_types = ("unsigned", "signed", "floating", "bfloat16")
+
+# Digits of each source format, and the lengths that cover 8 to 64 bits, odd widths and numbers wider than 64 bits
+_DIGITS = {"hex": "0123456789abcdefABCDEF", "bin": "01", "dec": "0123456789"}
+_LENGTHS = {"hex": (1, 2, 3, 4, 5, 8, 12, 16, 17, 24, 32), "bin": (1, 7, 8, 9, 16, 31, 32, 33, 64, 65, 80),
+            "dec": (1, 2, 3, 5, 10, 19, 20, 25)}
+
+# Outputs of the original UniversalFormat, as (format, token, type, endianness) -> (hex, dec, bin) without and with
+# padding and prefixes
+_BASELINE = {
+    ("hex", "ff", "unsigned", "big"): (("ff", "255", "11111111"), ("0xff", "255", "0b11111111")),
+    ("hex", "ff", "signed", "big"): (("ff", "-1", "11111111"), ("0xff", "-1", "0b11111111")),
+    ("hex", "8000", "signed", "little"): (("8000", "128", "1000000000000000"),
+                                          ("0x8000", "128", "0b1000000000000000")),
+    ("hex", "3f800000", "floating", "big"): (("3f800000", "1.0", "00111111100000000000000000000000"),
+                                             ("0x3f800000", "1.0", "0b00111111100000000000000000000000")),
+    ("hex", "0000803f", "floating", "little"): (("0000803f", "1.0", "00000000000000001000000000111111"),
+                                                ("0x0000803f", "1.0", "0b00000000000000001000000000111111")),
+    ("hex", "123", "unsigned", "little"): (("231", "786", "001000110001"), ("0x1203", "786", "0b0001001000000011")),
+    ("dec", "-1", "signed", "big"): (("ff", "-1", "11111111"), ("0xff", "-1", "0b11111111")),
+    ("dec", "1.5", "floating", "big"): (("3fc00000", "1.5", "00111111110000000000000000000000"),
+                                        ("0x3fc00000", "1.5", "0b00111111110000000000000000000000")),
+    ("dec", "300", "unsigned", "little"): (("c12", "300", "010010110"), ("0x2c01", "300", "0b0010110000000001")),
+    ("dec", "-300", "unsigned", "big"): (("12c", "300", "100101100"), ("0x012c", "300", "0b0000000100101100")),
+    ("bin", "101", "unsigned", "big"): (("5", "5", "101"), ("0x05", "5", "0b00000101")),
+    ("bin", "11111111", "signed", "big"): (("ff", "-1", "11111111"), ("0xff", "-1", "0b11111111")),
+    ("bin", "000000011000000000000000", "signed", "little"): (
+        ("01800000", "32769", "00000001100000000000000000000000"),
+        ("0x01800000", "32769", "0b00000001100000000000000000000000")),
+}
+
+
+def _tokens(number_format, count, generator):
+    tokens = []
+    for _ in range(count):
+        token = "".join(generator.choice(_DIGITS[number_format])
+                        for _ in range(generator.choice(_LENGTHS[number_format])))
+        if number_format == "dec":
+            token = generator.choice(["", "-"]) + token + generator.choice(["", "", ".5", ".125"])
+        tokens.append(token)
+    # Values at the edges of each width
+    if number_format == "hex":
+        tokens += ["00", "7f", "80", "ff", "7fff", "8000", "ffff", "7f800000", "ff800000", "7fc00000",
+                   "ffffffffffffffff", "8000000000000000", "7ff0000000000001"]
+    elif number_format == "bin":
+        tokens += ["0", "1", "10000000", "1" * 16, "0" + "1" * 31, "1" + "0" * 63]
+    else:
+        tokens += ["0", "-0", "1e3", "255", "-128", "65504", "3.4028235e38", "1e39", "18446744073709551615",
+                   "-9223372036854775808"]
+    return tokens
+
+
+def _reference(tokens, number_format, value_type, endianness, pad, show_prefix):
+    # Convert each token with its own UniversalFormat, an exception standing for its result
+    results = []
+    for token in tokens:
+        number = UniversalFormat()
+        number.set_type(value_type)
+        number.set_endianness(endianness)
+        try:
+            getattr(number, f"from_{number_format}_string")(token)
+        except (ValueError, OverflowError):
+            results.append(None)
+            continue
+        try:
+            results.append((number.to_hex_string(pad=pad, show_0x=show_prefix), number.to_dec_string(),
+                            number.to_bin_string(pad=pad, show_0b=show_prefix)))
+        except OverflowError:
+            # Decimal numbers too large for their float width, which the batch reports when parsing
+            results.append(None)
+        except ValueError as error:
+            results.append(error)
+    return results
+
+
+@pytest.mark.parametrize("number_format", ["hex", "dec", "bin"])
+@pytest.mark.parametrize("value_type", value_types)
+@pytest.mark.parametrize("endianness", ["big", "little"])
+def test_batch_matches_universal_format(number_format, value_type, endianness):
+    generator = random.Random(f"{number_format} {value_type} {endianness}")
+    tokens = _tokens(number_format, 300, generator)
+
+    for pad in (False, True):
+        for show_prefix in (False, True):
+            expected = _reference(tokens, number_format, value_type, endianness, pad, show_prefix)
+
+            batch = BatchFormat(value_type, endianness)
+            errors = getattr(batch, f"from_{number_format}_strings")(tokens)
+            assert [index for index, _ in errors] == [index for index, result in enumerate(expected)
+                                                      if result is None]
+
+            # A number that cannot be rendered fails its whole batch, the others are compared without it
+            parsed = [result for result in expected if result is not None]
+            failed = [row for row, result in enumerate(parsed) if isinstance(result, ValueError)]
+            if failed:
+                with pytest.raises(ValueError):
+                    batch.to_strings(pad=pad, show_prefix=show_prefix)
+                rows = [row for row in range(len(parsed)) if row not in failed]
+                batch = batch.take(rows)
+                parsed = [parsed[row] for row in rows]
+
+            strings = batch.to_strings(pad=pad, show_prefix=show_prefix)
+            assert list(zip(*strings)) == parsed
+            assert (batch.to_hex_strings(pad=pad, show_0x=show_prefix), batch.to_dec_strings(),
+                    batch.to_bin_strings(pad=pad, show_0b=show_prefix)) == strings
+
+
+@pytest.mark.parametrize("case", sorted(_BASELINE))
+def test_batch_matches_baseline_output(case):
+    number_format, token, value_type, endianness = case
+    for pad, expected in zip((False, True), _BASELINE[case]):
+        batch = BatchFormat(value_type, endianness)
+        assert getattr(batch, f"from_{number_format}_strings")([token]) == []
+        assert tuple(strings[0] for strings in batch.to_strings(pad=pad, show_prefix=pad)) == expected
+
+
+def _float_value(pattern, value_type, bits, endianness):
+    # Decode a bit pattern of one float width with NumPy, as the reference for the batch
+    if endianness == "little":
+        pattern = int.from_bytes(pattern.to_bytes(bits // 8, "big"), "little")
+    if value_type == "bfloat16":
+        return np.array([pattern << 16], dtype=np.uint32).view(np.float32)[0]
+    return np.array([pattern], dtype=f"u{bits // 8}").view({16: np.float16, 32: np.float32, 64: np.float64}[bits])[0]
+
+
+@pytest.mark.parametrize("value_type, bits", [("floating", 16), ("bfloat16", 16), ("floating", 32), ("floating", 64)])
+@pytest.mark.parametrize("endianness", ["big", "little"])
+def test_float_widths_round_trip(value_type, bits, endianness):
+    generator = random.Random(f"{value_type} {bits} {endianness}")
+    patterns = [generator.getrandbits(bits) for _ in range(500)] + [0, 1 << (bits - 1)]
+    # Signaling NaNs come back quiet, as they do through NumPy and struct
+    values = [_float_value(pattern, value_type, bits, endianness) for pattern in patterns]
+    hex_strings = [format(pattern, f"0{bits // 4}x") for pattern, value in zip(patterns, values)
+                   if not np.isnan(value)]
+    values = [value for value in values if not np.isnan(value)]
+
+    batch = BatchFormat(value_type, endianness)
+    assert batch.from_hex_strings(hex_strings) == []
+    assert batch.to_hex_strings(pad=True) == hex_strings
+    bin_strings = batch.to_bin_strings(pad=True)
+    assert bin_strings == [format(int(string, 16), f"0{bits}b") for string in hex_strings]
+
+    binary = BatchFormat(value_type, endianness)
+    assert binary.from_bin_strings(bin_strings) == []
+    assert binary.to_hex_strings(pad=True) == hex_strings
+
+    # The decimal output reads back as the same value, signed zeros and infinities included
+    dec_values = [float(string) for string in batch.to_dec_strings()]
+    assert dec_values == values
+    assert [np.signbit(value) for value in dec_values] == [np.signbit(value) for value in values]
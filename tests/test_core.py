@@ -0,0 +1,25 @@
+"""
+Tests of the Qt-free conversion API
+"""
+
+import pytest
+
+from core import Converted, convert
+
+
+def test_iterable_fails_only_at_the_text_that_cannot_be_converted():
+    texts = ["ff 10", "zz 1", "f" * 40, "7"]
+    with pytest.raises(ValueError, match="Value too wide to pad"):
+        convert(texts[2], "hex", "hex", pad=True)
+
+    results = convert(iter(texts), "hex", "hex", pad=True)
+    assert next(results) == Converted("ff 10", [])
+    assert next(results) == Converted("zz 01", [])
+    with pytest.raises(ValueError, match="Value too wide to pad"):
+        next(results)
+
+
+def test_iterable_matches_converting_each_text():
+    texts = ["ff 10", "", "0x7fffffff\nz 12", "1.2.3 ff"]
+    assert list(convert(texts, "hex", "dec", value_type="signed")) == \
+        [convert(text_string, "hex", "dec", value_type="signed") for text_string in texts]
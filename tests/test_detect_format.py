@@ -0,0 +1,47 @@
+"""
+Tests of detecting the format of each number in mixed-format text
+"""
+
+import random
+
+import pytest
+
+from core import convert
+from tokenizer import detect_format, detect_formats, text_codes, tokenize_codes
+
+
+@pytest.mark.parametrize("token, digits, number_format", [
+    ("0x1f", "1f", "hex"), ("0XfF", "fF", "hex"), ("$ff", "ff", "hex"),
+    ("1f", "1f", "hex"), ("ab", "ab", "hex"), ("0b101", "101", "bin"), ("0B11", "11", "bin"), ("%11", "11", "bin"),
+    ("12", "12", "dec"), ("101", "101", "dec"), ("-5", "-5", "dec"), ("1.5", "1.5", "dec"),
+])
+def test_format_is_detected_from_prefix_and_digits(token, digits, number_format):
+    text = f"zz {token}\n"
+    starts, digit_starts, ends, formats = detect_format(*tokenize_codes(text_codes(text)))
+    assert [(text[start:end], text[digit_start:end], detect_formats[index])
+            for start, digit_start, end, index in zip(starts, digit_starts, ends, formats)] == \
+        [(token, digits, number_format)]
+
+
+@pytest.mark.parametrize("token", ["zz", "0x", "0bz", "g1", "$", "%2"])
+def test_words_are_not_numbers(token):
+    assert len(detect_format(*tokenize_codes(text_codes(f"{token} ")))[0]) == 0
+
+
+@pytest.mark.parametrize("value_type", ["unsigned", "signed", "floating"])
+def test_mixed_numbers_keep_their_order(value_type):
+    # Each number converts as it would in text of its own format, wherever the others of its format are
+    generator = random.Random(value_type)
+    samples = {"hex": ["0x1f", "$ff", "ab", "0x80000000", "3f800000", "0xffff"],
+               "bin": ["0b101", "%11111111", "0b1" + "0" * 15],
+               "dec": ["12", "-7", "65535", "1.5", "1.2.3"]}
+    tokens = [(token, number_format) for number_format, format_tokens in samples.items() for token in format_tokens]
+    tokens = [generator.choice(tokens) for _ in range(200)]
+
+    converted = convert(" ".join(token for token, _ in tokens), "auto", "hex", value_type=value_type)
+    expected = [convert(token, number_format, "hex", value_type=value_type) for token, number_format in tokens]
+    assert converted.text.split(" ") == [result.text for result in expected]
+
+    positions = [sum(len(token) + 1 for token, _ in tokens[:index]) for index in range(len(tokens))]
+    assert [(error.position, error.token) for error in converted.errors] == \
+        [(position, token) for position, (token, _), result in zip(positions, tokens, expected) if result.errors]
@@ -0,0 +1,118 @@
+"""
+Tests of converting only the edited region of a text, replaying edits in the GUI without showing it on a screen
+"""
+
+import os
+import random
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtCore = pytest.importorskip("PySide6.QtCore")
+QtTest = pytest.importorskip("PySide6.QtTest")
+QtWidgets = pytest.importorskip("PySide6.QtWidgets")
+from PySide6.QtCore import QEventLoop, Qt, QTimer
+from PySide6.QtGui import QTextCursor
+from PySide6.QtTest import QTest
+from PySide6.QtWidgets import QApplication
+
+from number_list import NumberList
+
+
+@pytest.fixture
+def window(tmp_path, monkeypatch):
+    app = QApplication.instance() or QApplication([])
+    monkeypatch.setenv("LOCALAPPDATA", str(tmp_path))
+    monkeypatch.setattr("settings.settings_file", str(tmp_path / "settings.json"))
+    import handlers
+    import ui
+    monkeypatch.setattr(handlers, "show_conversion_error", lambda *args: None)
+    window = ui.Hex2DecQt()
+    window.show()
+    yield window
+    window.cancel_conversion()
+    window.close()
+    app.processEvents()
+
+
+def convert(window):
+    # Convert the hex text as Shift+Enter does, waiting for a full conversion if one is started
+    QTest.keyClick(window.hex_text, Qt.Key.Key_Return, Qt.KeyboardModifier.ShiftModifier)
+    loop = QEventLoop()
+    timer = QTimer()
+    timer.timeout.connect(lambda: loop.quit() if window.conversion_worker is None else None)
+    timer.start(5)
+    QTimer.singleShot(10000, loop.quit)
+    loop.exec()
+
+
+def expected(text_string):
+    number_list = NumberList()
+    number_list.parse_numbers(text_string, "hex", "unsigned")
+    return number_list.to_strings()
+
+
+def panes(window):
+    return window.hex_text.toPlainText(), window.dec_text.toPlainText(), window.bin_text.toPlainText()
+
+
+def move_to(window, position):
+    cursor = window.hex_text.textCursor()
+    cursor.setPosition(position)
+    window.hex_text.setTextCursor(cursor)
+
+
+def test_delete_lines_then_new_line(window):
+    window.hex_text.setPlainText("ff 10\n20 zz 0x30")
+    convert(window)
+    assert panes(window) == ("ff 10\n20 zz 30", "255 16\n32 zz 48", "11111111 00010000\n00100000 zz 00110000")
+
+    move_to(window, len(window.hex_text.toPlainText()))
+    for _ in range(len("20 zz 30")):
+        QTest.keyClick(window.hex_text, Qt.Key.Key_Backspace)
+    QTest.keyClick(window.hex_text, Qt.Key.Key_Return)
+    source = window.hex_text.toPlainText()
+    convert(window)
+    assert panes(window) == expected(source)
+
+
+def test_set_text_after_conversion(window):
+    window.hex_text.setPlainText("ff 10 20")
+    convert(window)
+    window.hex_text.setPlainText("1 2\n3")
+    convert(window)
+    assert panes(window) == expected("1 2\n3")
+
+
+def test_replayed_edits_match_full_conversion(window):
+    rng = random.Random(0)
+    tokens = ["ff", "10", "0x30", "zz", "a", "1f2e", "$7", "0b1", "\n", " ", "  "]
+    window.hex_text.setPlainText(" ".join(rng.choice(tokens) for _ in range(20)))
+    convert(window)
+
+    for _ in range(60):
+        length = len(window.hex_text.toPlainText())
+        action = rng.random()
+        if action < 0.3:
+            # Type at a random position, or at the end
+            move_to(window, rng.choice([rng.randint(0, length), length]))
+            QTest.keyClicks(window.hex_text, rng.choice(tokens).replace("\n", " "))
+        elif action < 0.45:
+            move_to(window, rng.choice([rng.randint(0, length), length]))
+            QTest.keyClick(window.hex_text, Qt.Key.Key_Return)
+        elif action < 0.7:
+            move_to(window, rng.choice([rng.randint(0, length), length]))
+            for _ in range(rng.randint(1, 4)):
+                QTest.keyClick(window.hex_text, Qt.Key.Key_Backspace)
+        else:
+            # Replace a selection
+            start = rng.randint(0, length)
+            cursor = window.hex_text.textCursor()
+            cursor.setPosition(start)
+            cursor.setPosition(rng.randint(start, length), QTextCursor.MoveMode.KeepAnchor)
+            cursor.insertText(rng.choice(tokens))
+
+        if rng.random() < 0.5:
+            source = window.hex_text.toPlainText()
+            convert(window)
+            assert panes(window) == expected(source)
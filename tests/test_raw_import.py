@@ -0,0 +1,36 @@
+"""
+Tests of importing raw binary files, and of reporting the bytes after the last whole word
+"""
+
+import pytest
+
+from raw_import import convert_raw, read_raw, trailing_bytes
+
+
+def test_trailing_bytes_are_returned(tmp_path):
+    path = tmp_path / "flash.bin"
+    path.write_bytes(bytes.fromhex("000000ff 00000010 abcd"))
+
+    assert convert_raw(path, 32, "unsigned") == ("000000ff 00000010", "255 16",
+                                                 "00000000000000000000000011111111 00000000000000000000000000010000",
+                                                 bytes.fromhex("abcd"))
+    batch, trailing = read_raw(path, 32, "unsigned", offset=1)
+    assert batch.to_dec_strings() == ["65280", "4267"] and trailing == bytes.fromhex("cd")
+    assert trailing_bytes(path, 16) == b""
+    assert trailing_bytes(path, 64, offset=12) == b""
+
+
+def test_raw_import_worker_warns_of_trailing_bytes(tmp_path):
+    pytest.importorskip("PySide6.QtCore")
+    from conversion_worker import RawImportWorker
+
+    path = tmp_path / "flash.bin"
+    path.write_bytes(bytes.fromhex("00ff 01"))
+    worker = RawImportWorker(str(path), 16, "unsigned")
+    events = []
+    worker.warned.connect(lambda message: events.append(("warned", message)))
+    worker.converted.connect(lambda results: events.append(("converted", results[1])))
+    worker.convert()
+
+    assert events == [("warned", "Bytes after the last whole 16 bit word were not imported: 01"),
+                      ("converted", "255")]
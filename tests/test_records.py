@@ -0,0 +1,69 @@
+"""
+Tests of decoding packed records
+"""
+
+import struct
+
+import numpy as np
+
+from cli import main
+from records import convert_records, decode_records, record_dtype
+
+
+def _errors(errors):
+    return [(position, token) for position, token, _ in errors]
+
+
+def test_invalid_token_is_reported():
+    (_, dec_text, _), errors = convert_records("01 zz 02", "<H")
+
+    assert dec_text == "513"
+    assert _errors(errors) == [(3, "zz")]
+    assert "Not a hex number" in str(errors[0][2])
+
+
+def test_partial_bytes_are_reported_without_shifting():
+    (_, dec_text, _), errors = convert_records("1 2 03 04", "<H")
+
+    assert dec_text == "1027"
+    assert _errors(errors) == [(0, "1"), (2, "2")]
+    assert "whole number of bytes" in str(errors[0][2])
+
+    (_, dec_text, _), errors = convert_records("0b00000001 101 %00000010", "<H", "bin")
+    assert dec_text == "513"
+    assert _errors(errors) == [(11, "101")]
+
+
+def test_trailing_bytes_are_reported():
+    records, errors = decode_records("0102 0304 05", ">I")
+
+    assert records.tolist() == [(0x01020304,)]
+    assert _errors(errors) == [(10, "05")]
+    assert "1 of 4 bytes" in str(errors[0][2])
+
+
+def test_native_alignment_padding():
+    dtype = record_dtype("@bId?")
+    values = (-2, 70000, 1.5, True)
+    data = struct.pack("@bId?", *values)
+
+    assert dtype.itemsize == struct.calcsize("@bId?") == len(data)
+    assert [dtype.fields[name][1] for name in dtype.names] == [0, 4, 8, 16]
+
+    records, errors = decode_records(data.hex(" "), "@bId?")
+    assert errors == []
+    assert records.tolist() == [values]
+    assert np.array_equal(records["f1"], [70000])
+
+
+def test_cli_record_errors_exit_non_zero(tmp_path, capsys):
+    source = tmp_path / "dump.txt"
+    source.write_text("01 zz 02 03\n")
+
+    assert main(["--from", "hex", "--to", "dec", "--record", "<H", str(source)]) == 1
+    err = capsys.readouterr().err
+    assert f"{source}:3: Invalid Value: zz" in err
+    assert f"{source}:9: Invalid Value: 03" in err
+
+    source.write_text("01 02\n")
+    assert main(["--from", "hex", "--to", "dec", "--record", "<H", str(source)]) == 0
@@ -0,0 +1,18 @@
+"""
+Tests of the conversion service's request batching
+"""
+
+from service import ConversionService
+
+
+def test_bad_request_does_not_fail_its_batch():
+    options = {"src": "hex", "dst": "hex", "pad": True}
+    requests = [{"id": 1, "text": "ff 10", **options}, {"id": 2, "text": "f" * 40, **options},
+                {"id": 3, "text": "1 zz", **options}, {"id": 4, "text": "10", "src": "hex", "dst": "dec"}]
+
+    assert ConversionService().convert_batch(requests) == [
+        {"id": 1, "text": "ff 10", "errors": []},
+        {"id": 2, "error": "Value too wide to pad"},
+        {"id": 3, "text": "01 zz", "errors": []},
+        {"id": 4, "text": "16", "errors": []},
+    ]
@@ -0,0 +1,113 @@
+"""
+Tests of converting text streams and memory mapped files
+"""
+
+import io
+import multiprocessing
+
+import pytest
+
+from cli import main
+from streaming import chunk_size, convert_file, convert_stream, max_token_length
+
+
+def test_convert_file_with_invalid_token(tmp_path):
+    source = tmp_path / "in.txt"
+    source.write_text("12 1.2.3 7\n")
+    errors = []
+
+    count = convert_file(source, tmp_path / "out.txt", "dec", "hex", "unsigned",
+                         on_error=lambda *error: errors.append(error))
+
+    assert count == 1
+    assert [(offset, token) for offset, token, _ in errors] == [(3, "1.2.3")]
+    assert (tmp_path / "out.txt").read_text() == "c 1.2.3 7\n"
+
+
+def test_convert_file_error_is_not_hidden(tmp_path):
+    source = tmp_path / "in.txt"
+    source.write_text("12 7\n")
+
+    with pytest.raises(ValueError, match="Invalid number format"):
+        convert_file(source, tmp_path / "out.txt", "oct", "hex", "unsigned")
+
+
+def test_cli_mapped_file_with_invalid_token(tmp_path, capsys):
+    source = tmp_path / "in.txt"
+    source.write_text("12 1.2.3 7\n")
+
+    assert main(["--from", "dec", "--to", "hex", str(source), "-o", str(tmp_path / "out.txt")]) == 1
+    assert "1.2.3" in capsys.readouterr().err
+    assert (tmp_path / "out.txt").read_text() == "c 1.2.3 7\n"
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_cli_output_file_reports_character_offsets(tmp_path, capsys, jobs):
+    source = tmp_path / "in.txt"
+    source.write_text("größe 12\n" + "µ zz\n" * (chunk_size // 4) + "1.2.3 7\n", encoding="utf-8")
+
+    assert main(["--from", "dec", "--to", "hex", str(source)]) == 1
+    stream_errors = capsys.readouterr().err
+    assert main(["--from", "dec", "--to", "hex", "-j", jobs, str(source), "-o", str(tmp_path / "out.txt")]) == 1
+    assert capsys.readouterr().err == stream_errors
+    assert f"{source}:{source.read_text(encoding='utf-8').index('1.2.3')}:" in stream_errors
+
+
+def test_cli_output_file_in_utf16(tmp_path, capsys):
+    source = tmp_path / "in.txt"
+    source.write_text("ff 10 zz\n", encoding="utf-16")
+
+    assert main(["--from", "hex", "--to", "dec", "--encoding", "utf-16", str(source), "-o",
+                 str(tmp_path / "out.txt")]) == 0
+    assert (tmp_path / "out.txt").read_text(encoding="utf-16") == "255 16 zz\n"
+
+
+def test_convert_file_rejects_encoding_that_is_not_ascii_compatible(tmp_path):
+    source = tmp_path / "in.txt"
+    source.write_text("ff\n", encoding="utf-16")
+
+    with pytest.raises(ValueError, match="not ASCII compatible"):
+        convert_file(source, tmp_path / "out.txt", "hex", "dec", "unsigned", encoding="utf-16")
+
+
+def test_cli_parallel_file_with_invalid_token(tmp_path, capsys):
+    source = tmp_path / "in.txt"
+    source.write_text("12 1.2.3 7\n" * 1000)
+
+    assert main(["--from", "dec", "--to", "hex", "-j", "2", str(source), "-o", str(tmp_path / "out.txt")]) == 1
+    assert capsys.readouterr().err.count("Invalid Value: 1.2.3") == 1000
+    assert (tmp_path / "out.txt").read_text() == "c 1.2.3 7\n" * 1000
+
+
+def test_cli_parallel_failure_exit_code(tmp_path, capsys, monkeypatch):
+    source = tmp_path / "in.txt"
+    source.write_text("12 7\n")
+
+    def fail(*args, **kwargs):
+        raise BufferError("worker failed")
+
+    # Forked worker processes convert with the replaced function
+    if multiprocessing.get_start_method() != "fork":
+        pytest.skip("worker processes are not forked")
+    monkeypatch.setattr("streaming._convert_window", fail)
+    assert main(["--from", "dec", "--to", "hex", "-j", "2", str(source), "-o", str(tmp_path / "out.txt")]) == 1
+    assert "Conversion Error: worker failed" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("offset", [10, chunk_size * 2 // 3, chunk_size - 100])
+def test_long_token_is_passed_through_at_any_offset(tmp_path, offset):
+    # The token may start in the first chunk, at its end or in the next one, words around it are not numbers
+    filler = "z" * 63 + "\n"
+    token = "f" * (max_token_length * 2)
+    before = "ff 10\n" + filler * ((offset - 6) // len(filler))
+    after = "\n" + filler * (chunk_size // len(filler)) + "ff 10\n"
+    source = tmp_path / "in.txt"
+    source.write_text(before + token + after)
+
+    output = io.StringIO()
+    assert convert_stream(io.StringIO(before + token + after), output, "hex", "dec", "unsigned") == 0
+    assert convert_file(source, tmp_path / "out.txt", "hex", "dec", "unsigned") == 0
+
+    expected = (before + token + after).replace("ff 10", "255 16")
+    assert output.getvalue() == expected
+    assert (tmp_path / "out.txt").read_text() == expected
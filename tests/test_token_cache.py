@@ -0,0 +1,43 @@
+"""
+Tests of converting through the token cache
+"""
+
+import random
+
+from number_list import NumberList
+from token_cache import TokenCache
+
+
+def _strings(text, cache, number_format="hex", value_type="unsigned"):
+    numbers = NumberList(cache)
+    numbers.parse_numbers(text, number_format, value_type)
+    return numbers.to_hex_string(), numbers.to_dec_string(), numbers.to_bin_string(), numbers.to_strings()
+
+
+def test_cached_conversion_matches_uncached():
+    generator = random.Random(3)
+    cache = TokenCache(8)
+    for _ in range(20):
+        text = " ".join(generator.choice(["1", "ff", "10", "7f", "abcd", "0", "12345678", "deadbeefcafe"])
+                        for _ in range(generator.randrange(1, 40)))
+        assert _strings(text, cache) == _strings(text, None)
+    assert len(cache) <= 8
+    assert cache.hits and cache.misses
+
+
+def test_cache_evicts_least_recently_used():
+    cache = TokenCache(2)
+
+    def convert(text):
+        numbers = NumberList()
+        numbers.parse_numbers(text, "hex", "unsigned")
+        return cache.to_strings(numbers.tokens(), numbers.numbers, "hex", formats=("dec",))[0]
+
+    assert convert("1 2") == ["1", "2"]
+    assert convert("3") == ["3"]
+    # '1' was used least recently, so it was evicted to make room for '3'
+    assert (cache.hits, cache.misses) == (0, 3)
+    assert convert("2 3 2") == ["2", "3", "2"]
+    assert (cache.hits, cache.misses) == (3, 3)
+    assert convert("1") == ["1"]
+    assert (cache.hits, cache.misses) == (3, 4)